@@ -1,50 +1,175 @@
-from fastapi import APIRouter, Depends, Query
-from typing import Annotated, List
+import datetime
+import anyio
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import Annotated, List, Literal
 
 from app.utils.codes_names import get_codes_names
-from app.utils.actual_rates import get_actual_rates_data
-from app.exceptions.currency import InvalidCurrencyCodeException
-from app.api.schemas.currency import Converter
-from app.dependencies.dependencies import get_current_user
-from app.database.models import User as UserModel
+from app.utils.actual_rates import RatesSnapshot, get_rates_snapshot
+from app.utils.rates_history import get_history_snapshot
+from app.utils.cross_rates import get_cross_rates
+from app.utils.fixed_point import RoundingMode
+from app.utils.http_cache import cache_headers, encoded_body, is_not_modified
+from app.exceptions.currency import (
+    InvalidCurrencyCodeException,
+    RatesUnavailableException,
+    HistoricalRatesNotFoundException,
+    RatesNotModifiedException,
+    UnsupportedMediaTypeException,
+)
+from app.api.schemas.currency import (
+    Converter,
+    BatchConverter,
+    BatchConversionResult,
+)
+from app.services.currency import CurrencyService
+from app.dependencies.dependencies import get_access_token_payload, get_request_user
+from app.utils.user_cache import AuthenticatedUser
+from app.core.config import get_settings
+
+settings = get_settings()
 
 
 router = APIRouter(prefix="/currency", tags=["Currency"])
 
+NDJSON = "application/x-ndjson"
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    Streaming response produced while the request body is still being read.
+    The body iterator owns `receive` (Request.stream() stops on a disconnect),
+    so the disconnect listener must not consume request messages.
+    """
+
+    async def listen_for_disconnect(self, receive):
+        await anyio.sleep_forever()
+
+
+AtQuery = Annotated[
+    datetime.datetime | None,
+    Query(description="Point in time (ISO 8601 or Unix time, UTC if naive)"),
+]
+PrecisionQuery = Annotated[
+    Literal["float", "exact"],
+    Query(description="exact: scaled-integer arithmetic, results as decimal strings"),
+]
+DecimalsQuery = Annotated[
+    int,
+    Query(
+        ge=0,
+        le=settings.CONVERTER_MAX_DECIMALS,
+        description="Decimal places of exact results",
+    ),
+]
+RoundingQuery = Annotated[
+    RoundingMode, Query(description="Rounding mode of exact results")
+]
+
+
+def resolve_snapshot(at: datetime.datetime | None = None) -> RatesSnapshot:
+    """
+    Current rates, or the rates that were in effect at the given moment.
+    """
+    snapshot = get_rates_snapshot()
+
+    if at is None:
+        if snapshot is None:
+            raise RatesUnavailableException()
+        return snapshot
+
+    if at.tzinfo is None:
+        at = at.replace(tzinfo=datetime.UTC)
+    timestamp = int(at.timestamp())
+
+    historical = get_history_snapshot(timestamp)
+
+    # The current rates may not have reached the history yet
+    if snapshot is not None and snapshot.updated <= timestamp:
+        if historical is None or historical.updated < snapshot.updated:
+            return snapshot
+
+    if historical is None:
+        raise HistoricalRatesNotFoundException(at=at.isoformat())
+
+    return historical
+
+
+# Checked before a conditional rates request is answered with 304
+not_modified_auth = (
+    get_access_token_payload
+    if settings.RATES_NOT_MODIFIED_BEFORE_USER_LOOKUP
+    else get_request_user
+)
+
+
+async def conditional_snapshot(
+    request: Request,
+    at: AtQuery = None,
+    _=Depends(not_modified_auth),
+) -> RatesSnapshot:
+    """
+    Pins the snapshot of a rates response. If the client already has it
+    (If-None-Match / If-Modified-Since), answers 304 before the user lookup
+    and any serialization.
+    """
+    snapshot = resolve_snapshot(at)
+
+    if is_not_modified(request.headers, snapshot):
+        raise RatesNotModifiedException(headers=cache_headers(snapshot))
+
+    return snapshot
+
+
+async def conditional_current_snapshot(
+    request: Request, _=Depends(not_modified_auth)
+) -> RatesSnapshot:
+    """conditional_snapshot for the current rates only."""
+    return await conditional_snapshot(request)
+
 
 @router.get("/list")
 async def get_currencies_list(
+    response: Response,
     code: Annotated[List[str] | None, Query()] = None,
-    current_user: UserModel = Depends(get_current_user),
-) -> dict:
+    snapshot: RatesSnapshot = Depends(conditional_current_snapshot),
+    current_user: AuthenticatedUser = Depends(get_request_user),
+):
     """
     Retrieving a list of available currenices. \n
     **Query parameter**: ISO currency code (upper or lower case). \n
+    Responses carry an ETag: send it back in If-None-Match to get
+    *304 Not Modified* until the rates change. \n
     **Protected endpoint**: a valid access token in the Authorization header required.
     """
-    full_names_map = get_codes_names()
-    del full_names_map["updated"]
+    full_names_map = get_codes_names(snapshot)
 
     if not code:
-        return {
-            "message": "Available currencies for conversion",
-            "currencies": full_names_map,
-        }
+        body = encoded_body(
+            snapshot,
+            ("list",),
+            lambda: {
+                "message": "Available currencies for conversion",
+                "currencies": dict(full_names_map),
+            },
+        )
+        return Response(
+            body, media_type="application/json", headers=cache_headers(snapshot)
+        )
+
+    response.headers.update(cache_headers(snapshot))
 
-    codes_list = list(full_names_map.keys())
     codes_query = [c.upper() for c in code]
 
     invalid_codes = []
     for _ in codes_query:
-        if _ not in codes_list:
+        if _ not in full_names_map:
             invalid_codes.append(_)
 
     if invalid_codes:
         raise InvalidCurrencyCodeException(invalid_codes=invalid_codes)
 
-    specified_currencies = {
-        c: full_names_map[c] for c in codes_query if c in full_names_map
-    }
+    specified_currencies = {c: full_names_map[c] for c in codes_query}
 
     return {
         "message": "Available currencies for conversion",
@@ -54,45 +179,73 @@ async def get_currencies_list(
 
 @router.get("/actual_rates")
 async def get_actual_rates(
+    response: Response,
     code: Annotated[List[str] | None, Query()] = None,
-    current_user: UserModel = Depends(get_current_user),
+    base: str = "USD",
+    snapshot: RatesSnapshot = Depends(conditional_snapshot),
+    current_user: AuthenticatedUser = Depends(get_request_user),
 ):
     """
     Retrieving current exchange rates against the US dollar. \n
     **Query parameter**: ISO currency code (upper or lower case). \n
+    **base**: ISO code of another base currency (US dollar by default). \n
+    **at**: rates that were in effect at this moment instead of the current ones. \n
+    Responses carry an ETag: send it back in If-None-Match to get
+    *304 Not Modified* until the rates change. \n
     **Protected endpoint**: a valid access token in the Authorization header required.
     """
-    rates_data = get_actual_rates_data()
+    base = base.upper()
+
+    if base == "USD":
+        rates_data = snapshot.rates
+    elif base in snapshot.index:
+        rates_data = get_cross_rates(snapshot).against(base)
+    else:
+        raise InvalidCurrencyCodeException(invalid_codes=[base])
 
     if not code:
-        return {
-            "message": "Actual currencies rates. Base currency: 💵 USD (1 USD = value [Currency])",
-            "rates": rates_data,
-        }
+        base_label = "💵 USD" if base == "USD" else base
+        body = encoded_body(
+            snapshot,
+            ("actual_rates", base),
+            lambda: {
+                "message": f"Actual currencies rates. Base currency: {base_label} (1 {base} = value [Currency])",
+                "rates": {"updated": snapshot.updated_msk} | rates_data,
+            },
+        )
+        return Response(
+            body, media_type="application/json", headers=cache_headers(snapshot)
+        )
+
+    response.headers.update(cache_headers(snapshot))
 
-    codes_list = list(rates_data.keys())
     codes_query = [c.upper() for c in code]
 
     invalid_codes = []
     for _ in codes_query:
-        if _ not in codes_list:
+        if _ not in rates_data:
             invalid_codes.append(_)
 
     if invalid_codes:
         raise InvalidCurrencyCodeException(invalid_codes=invalid_codes)
 
-    specified_rates = {c: rates_data[c] for c in codes_query if c in rates_data}
-    last_update = {"updated": rates_data["updated"]}
+    specified_rates = {c: rates_data[c] for c in codes_query}
+    last_update = {"updated": snapshot.updated_msk}
 
     return {
-        "message": f"Current {codes_query} to USD exchange rate",
+        "message": f"Current {codes_query} to {base} exchange rate",
         "rate": last_update | specified_rates,
     }
 
 
 @router.post("/converter")
 async def currency_converter(
-    data: Converter, current_user: UserModel = Depends(get_current_user)
+    data: Converter,
+    at: AtQuery = None,
+    precision: PrecisionQuery = "float",
+    decimals: DecimalsQuery = 3,
+    rounding: RoundingQuery = "half_even",
+    current_user: AuthenticatedUser = Depends(get_request_user),
 ):
     """
     Converting one currency to another. Parameters: \n
@@ -100,14 +253,16 @@ async def currency_converter(
     **code_2**: name of the currency to find out the price of
     the first currency in; \n
     **k**: amount of the first currency.\n
+    **at** (query): convert with the rates that were in effect at this moment.\n
+    **precision** (query): *exact* for scaled-integer arithmetic instead of floats,
+    rounded to **decimals** places with the **rounding** mode.\n
 
     **Protected endpoint**: a valid access token in the Authorization header required.
     """
 
-    rates_data = get_actual_rates_data()
-    del rates_data["updated"]
+    snapshot = resolve_snapshot(at)
 
-    codes_list = list(rates_data.keys())
+    rates_data = snapshot.rates
 
     # lowercase letters proccessing
     code_1 = data.code_1.upper()
@@ -118,15 +273,84 @@ async def currency_converter(
     codes = [code_1, code_2]
 
     for code in codes:
-        if code not in codes_list:
+        if code not in rates_data:
             invalid_codes.append(code)
 
     if invalid_codes:
         raise InvalidCurrencyCodeException(invalid_codes=invalid_codes)
 
-    x = rates_data[code_1]
-    y = rates_data[code_2]
+    if precision == "exact":
+        result = CurrencyService.convert_exact(
+            snapshot, code_1, code_2, k, decimals, rounding
+        )
+        # Thousands separators without going through float
+        whole, dot, fraction = result.partition(".")
+        result_label = f"{int(whole):,}{dot}{fraction}"
+    else:
+        result = CurrencyService.convert(snapshot, code_1, code_2, k)
+        result_label = f"{result:,}"
+
+    if at is not None:
+        return {
+            "message": f"{k} {code_1} - {result_label} {code_2}",
+            "updated": snapshot.updated_msk,
+        }
+
+    return {"message": f"{k} {code_1} - {result_label} {code_2}"}
+
+
+@router.post("/converter/batch", response_model=BatchConversionResult)
+async def currency_converter_batch(
+    data: BatchConverter,
+    at: AtQuery = None,
+    precision: PrecisionQuery = "float",
+    decimals: DecimalsQuery = 3,
+    rounding: RoundingQuery = "half_even",
+    current_user: AuthenticatedUser = Depends(get_request_user),
+):
+    """
+    Converting many currency pairs in one request. \n
+    **items**: list of conversions with the same fields as in /currency/converter. \n
+    **at** (query): convert with the rates that were in effect at this moment. \n
+    Returns numeric results in the order of items; items with invalid codes
+    get *null* as a result and are listed in **errors**. \n
+    **precision**, **decimals**, **rounding** (query): as in /currency/converter,
+    exact results are decimal strings. \n
+
+    **Protected endpoint**: a valid access token in the Authorization header required.
+    """
+    snapshot = resolve_snapshot(at)
+
+    return CurrencyService.convert_batch(
+        snapshot, data.items, precision == "exact", decimals, rounding
+    )
+
+
+@router.post("/converter/stream", response_class=DuplexStreamingResponse)
+async def currency_converter_stream(
+    request: Request,
+    at: AtQuery = None,
+    current_user: AuthenticatedUser = Depends(get_request_user),
+):
+    """
+    Converting a stream of currency pairs. \n
+    **Body**: NDJSON (application/x-ndjson), one object per line with the same
+    fields as in /currency/converter. \n
+    **at** (query): convert with the rates that were in effect at this moment. \n
+    Results are streamed back as NDJSON while the body is still being read:
+    one line per input line with its **line** number and either **result**
+    or **error_code** and **message**. The whole stream uses the same rates. \n
+
+    **Protected endpoint**: a valid access token in the Authorization header required.
+    """
+    media_type = request.headers.get("content-type", "").split(";")[0].strip()
+
+    if media_type != NDJSON:
+        raise UnsupportedMediaTypeException(media_type=media_type, expected=NDJSON)
 
-    ratio = y / x
+    snapshot = resolve_snapshot(at)
 
-    return {"message": f"{k} {code_1} - {round(k * ratio, 3):,} {code_2}"}
+    return DuplexStreamingResponse(
+        CurrencyService.convert_stream(snapshot, request.stream()),
+        media_type=NDJSON,
+    )
@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends
+
+from app.database.database import engine
+from app.database.pool import pool_metrics
+from app.dependencies.dependencies import admin_required
+from app.utils.password_pool import import_pool, password_pool
+from app.utils.revoked_tokens import revoked_tokens
+from app.utils.token_cache import decoded_tokens
+from app.utils.user_cache import AuthenticatedUser, user_cache
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+@router.get("")
+async def get_metrics(admin: AuthenticatedUser = Depends(admin_required)) -> dict:
+    """
+    Counters of the in-process caches and pools of this worker. \n
+    **Protected** endpoint with strict access rights: only available to the admin.
+    """
+    return {
+        "user_cache": user_cache.stats(),
+        "revoked_tokens": revoked_tokens.stats(),
+        "password_pool": password_pool.stats(),
+        "password_import_pool": import_pool.stats(),
+        "decoded_tokens": decoded_tokens.stats(),
+        "db_pool": pool_metrics.stats(engine.sync_engine.pool),
+    }
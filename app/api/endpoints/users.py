@@ -1,17 +1,33 @@
-from fastapi import APIRouter, Depends
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import get_settings
+
 from app.database.database import get_db_connection
-from app.database.models import User as UserModel
-from app.api.schemas.users import User as UserSchema
+from app.utils.user_cache import AuthenticatedUser
+from app.api.schemas.users import AdminFlag, User as UserSchema, UserImportResult
+from app.exceptions.currency import UnsupportedMediaTypeException
 from app.services.user import UserService
 from app.dependencies.dependencies import admin_required, get_current_user
 
+settings = get_settings()
+
 router = APIRouter(prefix="/users", tags=["Users"])
 
+NDJSON = "application/x-ndjson"
+
+AfterIdQuery = Annotated[
+    int | None, Query(ge=0, description="Users with a greater id (keyset cursor)")
+]
+
 
 @router.get("/user_info", response_model=UserSchema)
-async def get_current_user_info(current_user: UserModel = Depends(get_current_user)):
+async def get_current_user_info(
+    current_user: AuthenticatedUser = Depends(get_current_user),
+):
     """
     Getting information about the current authenticated user.  \n
     **Protected endpoint**: a valid access token in the Authorization header required.
@@ -21,20 +37,91 @@ async def get_current_user_info(current_user: UserModel = Depends(get_current_us
 
 @router.get("/list", response_model=list[UserSchema])
 async def get_users(
+    after_id: AfterIdQuery = None,
+    limit: Annotated[
+        int,
+        Query(ge=1, le=settings.USERS_PAGE_MAX, description="Users per page"),
+    ] = settings.USERS_PAGE_DEFAULT,
+    session: AsyncSession = Depends(get_db_connection),
+    admin: AuthenticatedUser = Depends(admin_required),
+):
+    """
+    Getting a page of registered users, ordered by id.  \n
+    The id of the last user is returned in the X-Next-Cursor header
+    if there may be more: pass it as `after_id` to get the next page. \n
+    **Protected** endpoint with strict access rights: only available to the admin.
+    """
+    users = await UserService.get_users(session, after_id, limit)
+
+    headers = {"X-Next-Cursor": str(users[-1][0])} if len(users) == limit else None
+
+    return Response(
+        UserService.dump_users(users), media_type="application/json", headers=headers
+    )
+
+
+@router.get("/stream")
+async def stream_users(
+    after_id: AfterIdQuery = None,
+    session: AsyncSession = Depends(get_db_connection),
+    admin: AuthenticatedUser = Depends(admin_required),
+):
+    """
+    Getting all registered users (after `after_id`) as NDJSON, ordered by id:
+    rows are sent while they are read from the database.  \n
+    **Protected** endpoint with strict access rights: only available to the admin.
+    """
+    return StreamingResponse(
+        UserService.stream_users(session, after_id), media_type=NDJSON
+    )
+
+
+@router.post("/import", response_model=UserImportResult)
+async def import_users(
+    request: Request,
+    session: AsyncSession = Depends(get_db_connection),
+    admin: AuthenticatedUser = Depends(admin_required),
+):
+    """
+    Creating users in bulk.  \n
+    **Body**: NDJSON (application/x-ndjson), one object per line with the same
+    fields as in /auth/register (at most USERS_IMPORT_MAX_ROWS lines). \n
+    Every line is reported with its **line** number and either the **id**
+    of the created user or **error_code** and **message**
+    (VALIDATION_ERROR, CONFLICT). \n
+    **Protected** endpoint with strict access rights: only available to the admin.
+    """
+    media_type = request.headers.get("content-type", "").split(";")[0].strip()
+
+    if media_type != NDJSON:
+        raise UnsupportedMediaTypeException(media_type=media_type, expected=NDJSON)
+
+    # Read as it arrives: an oversized import is rejected without buffering it
+    lines = await UserService.read_import(request.stream())
+
+    return await UserService.import_users(lines, session)
+
+
+@router.patch("/{user_id}/admin", response_model=UserSchema)
+async def set_admin(
+    user_id: int,
+    data: AdminFlag,
+    admin: AuthenticatedUser = Depends(admin_required),
     session: AsyncSession = Depends(get_db_connection),
-    admin: UserModel = Depends(admin_required),
 ):
     """
-    Getting a list of all registered users.  \n
+    Granting or revoking admin rights of a specific user. \n
+    Takes effect at once: the cached user is dropped in every worker and
+    access tokens issued with the previous flag are rejected. \n
     **Protected** endpoint with strict access rights: only available to the admin.
     """
-    return await UserService.get_users(session)
+    return await UserService.set_admin(user_id, data.is_admin, session)
 
 
 @router.delete("/{user_id}")
 async def delete_user(
     user_id: int,
-    admin: UserModel = Depends(admin_required),
+    admin: AuthenticatedUser = Depends(admin_required),
     session: AsyncSession = Depends(get_db_connection),
 ):
     """
@@ -1,14 +1,49 @@
 from pydantic import BaseModel, Field, ConfigDict
 
+from app.core.config import get_settings
+
+settings = get_settings()
+
 
 # Example for documentation
 def example_query(schema: dict) -> None:
     schema["example"] = {"code_1": "eur", "code_2": "rub", "k": 10.5}
 
 
+def example_batch_query(schema: dict) -> None:
+    schema["example"] = {
+        "items": [
+            {"code_1": "eur", "code_2": "rub", "k": 10.5},
+            {"code_1": "USD", "code_2": "JPY", "k": 250},
+        ]
+    }
+
+
 class Converter(BaseModel):
     code_1: str
     code_2: str
-    k: float = Field(default=1, gt=0)  # Only positive float numbers
+    # Only positive finite numbers ("inf" is a valid JSON float for pydantic)
+    k: float = Field(default=1, gt=0, allow_inf_nan=False)
 
     model_config = ConfigDict(json_schema_extra=example_query)
+
+
+class BatchConverter(BaseModel):
+    items: list[Converter] = Field(
+        min_length=1, max_length=settings.CONVERTER_BATCH_MAX_ITEMS
+    )
+
+    model_config = ConfigDict(json_schema_extra=example_batch_query)
+
+
+class BatchItemError(BaseModel):
+    index: int  # Position of the item in the request
+    error_code: str
+    message: str
+
+
+class BatchConversionResult(BaseModel):
+    updated: str
+    count: int
+    results: list[float | str | None]  # Decimal strings with precision=exact
+    errors: list[BatchItemError]
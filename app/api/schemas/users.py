@@ -42,6 +42,24 @@ class User(UserBase):
     model_config = ConfigDict(from_attributes=True, json_schema_extra=example_user_out)
 
 
+class AdminFlag(BaseModel):
+    is_admin: bool
+
+
 class UserLogin(BaseModel):
     username: str
     password: str
+
+
+class UserImportRow(BaseModel):
+    line: int
+    username: str | None = None
+    id: int | None = None  # Created users
+    error_code: str | None = None  # Rejected rows
+    message: str | None = None
+
+
+class UserImportResult(BaseModel):
+    created: int
+    failed: int
+    results: list[UserImportRow]
@@ -1,4 +1,6 @@
 from functools import lru_cache
+from typing import Literal
+from pydantic import model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -6,19 +8,77 @@ class Settings(BaseSettings):
     # Database
     DATABASE_URL: str
     TEST_DATABASE_URL: str | None = None
+    DB_POOL_SIZE: int = 5  # Connections kept open
+    DB_MAX_OVERFLOW: int = 10  # Extra connections under load
+    DB_POOL_TIMEOUT: float = 30.0  # Seconds to wait for a connection
+    DB_POOL_RECYCLE: int = -1  # Seconds before a connection is replaced, -1: never
+    DB_POOL_PRE_PING: bool = False  # Test connections on checkout
+    DB_STATEMENT_CACHE_SIZE: int = 100  # asyncpg prepared statements per connection
 
     # JWT | Security
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    # Access tokens carry uid/adm/ver claims, currency endpoints skip the DB
+    ACCESS_TOKEN_CLAIMS: bool = False
+    # Bloom filter of the in-process revoked refresh tokens index
+    REVOKED_TOKENS_FILTER_CAPACITY: int = 1_000_000
+    REVOKED_TOKENS_FILTER_ERROR_RATE: float = 0.01
+    # Revoked refresh tokens: table + nightly cleanup, or Redis keys with TTL
+    REVOCATION_BACKEND: Literal["sql", "redis"] = "sql"
+    REVOCATION_REDIS_PREFIX: str = "revoked:"
+    # Expired revoked tokens deleted per transaction, pause between them (s)
+    REVOKED_TOKENS_CLEANUP_BATCH: int = 5_000
+    REVOKED_TOKENS_CLEANUP_PAUSE: float = 0.05
+    # Verified JWT payloads kept until their exp (0 disables the cache)
+    JWT_CACHE_SIZE: int = 10_000
+    # bcrypt threads and calls allowed to wait for them (then 429)
+    PASSWORD_POOL_WORKERS: int = 4
+    PASSWORD_POOL_QUEUE: int = 64
+    PASSWORD_IMPORT_WORKERS: int | None = None  # Bulk import, all CPUs if None
 
     # External API
     API_KEY: str
     EXTERNAL_API_URL: str = "https://currencyapi.net/api/v1/rates"
+    EXTERNAL_API_TIMEOUT: float = 10.0  # Seconds
+    EXTERNAL_API_RETRIES: int = 3  # After timeouts, connection errors, 429 and 5xx
+    EXTERNAL_API_BACKOFF: float = 1.0  # Seconds, doubled per retry (with jitter)
+    EXTERNAL_API_MAX_BYTES: int = 1_048_576  # Larger responses are rejected
+    # Update the rates from the API process itself (without Celery beat)
+    RATES_SCHEDULER_ENABLED: bool = False
+    RATES_UPDATE_INTERVAL: float = 7_200  # Seconds
+    # Redis pub/sub channel announcing new rates to the API workers
+    RATES_UPDATES_CHANNEL: str | None = None
+
+    # Currency
+    CONVERTER_BATCH_MAX_ITEMS: int = 10_000
+    CONVERTER_MAX_DECIMALS: int = 18  # Decimal places of exact conversions
+    RATES_SHARED_SEGMENT: bool = True  # Memory-mapped rates shared by workers
+    RATES_STORAGE_FORMAT: Literal["json", "binary"] = "json"
+    RATES_HISTORY_ENABLED: bool = True  # Keep every fetched snapshot
+    # 304 Not Modified after the token check, without the user lookup
+    RATES_NOT_MODIFIED_BEFORE_USER_LOOKUP: bool = True
+
+    # Authenticated users cache
+    USER_CACHE_SIZE: int = 10_000  # 0 disables the cache
+    USER_CACHE_TTL: float = 60.0  # Seconds
+    USER_CACHE_NEGATIVE_TTL: float = 5.0  # Seconds, for unknown usernames
+    USER_CACHE_INVALIDATION_CHANNEL: str | None = None  # Redis pub/sub channel
+    USER_CACHE_PUBLISH_RETRIES: int = (
+        2  # Before the change is reported as not propagated
+    )
+
+    # Users list (admin)
+    USERS_PAGE_DEFAULT: int = 100
+    USERS_PAGE_MAX: int = 1_000
+    USERS_STREAM_BATCH: int = 5_000  # Rows per server-side cursor fetch
+    USERS_IMPORT_MAX_ROWS: int = 200_000
+    USERS_IMPORT_INSERT_BATCH: int = 5_000  # Rows per multi-row INSERT
 
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
+    CELERY_DB_POOL_SIZE: int = 2  # Connections per Celery worker process
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -26,6 +86,16 @@ class Settings(BaseSettings):
         extra="ignore",  # For extra env variable (Docker-specific)
     )
 
+    @model_validator(mode="after")
+    def claims_need_invalidation_channel(self) -> "Settings":
+        # Without the channel, a deletion or role change would only reject
+        # old claims tokens in the worker that handled it
+        if self.ACCESS_TOKEN_CLAIMS and self.USER_CACHE_INVALIDATION_CHANNEL is None:
+            raise ValueError(
+                "ACCESS_TOKEN_CLAIMS requires USER_CACHE_INVALIDATION_CHANNEL"
+            )
+        return self
+
 
 @lru_cache
 def get_settings():
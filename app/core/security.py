@@ -7,6 +7,7 @@ from fastapi.security import OAuth2PasswordBearer
 
 from app.exceptions.tokens import TokenExpiredException, InvalidTokenException
 from app.core.config import get_settings
+from app.utils.token_cache import decoded_tokens
 
 settings = get_settings()
 
@@ -55,12 +56,18 @@ def create_refresh_token(data: dict):
     )
 
 
-def decode_jwt_token(token: str = Depends(oauth2_scheme)) -> dict:
+async def decode_jwt_token(token: str = Depends(oauth2_scheme)) -> dict:
     """
-    Extracts user information from the access token.
+    Extracts user information from the access token
+    (verified once per token, see app.utils.token_cache).
     """
+    payload = decoded_tokens.get(token)
+    if payload is not None:
+        return payload
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        decoded_tokens.set(token, payload)
         return payload
     except jwt.exceptions.ExpiredSignatureError:
         raise TokenExpiredException()
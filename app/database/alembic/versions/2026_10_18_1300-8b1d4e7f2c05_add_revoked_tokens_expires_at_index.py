@@ -0,0 +1,43 @@
+"""Add revoked_tokens.expires_at index
+
+Revision ID: 8b1d4e7f2c05
+Revises: 3f6c2a9d1b7e
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8b1d4e7f2c05"
+down_revision: Union[str, Sequence[str], None] = "3f6c2a9d1b7e"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Built without locking out the refresh traffic (outside a transaction)
+    with op.get_context().autocommit_block():
+        op.create_index(
+            op.f("ix_revoked_tokens_expires_at"),
+            "revoked_tokens",
+            ["expires_at"],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            op.f("ix_revoked_tokens_expires_at"),
+            table_name="revoked_tokens",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,41 @@
+"""Add deleted_users
+
+Revision ID: 5c7e9a2f4d18
+Revises: 8b1d4e7f2c05
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5c7e9a2f4d18"
+down_revision: Union[str, Sequence[str], None] = "8b1d4e7f2c05"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "deleted_users",
+        sa.Column("id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("deleted_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_deleted_users_deleted_at"),
+        "deleted_users",
+        ["deleted_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_deleted_users_deleted_at"), table_name="deleted_users")
+    op.drop_table("deleted_users")
@@ -1,14 +1,91 @@
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+import time
+
+from fastapi import Request
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from app.core.config import get_settings
+from app.database.pool import InstrumentedPool, pool_metrics
 
 settings = get_settings()
 
 
-engine = create_async_engine(settings.DATABASE_URL)
-AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+def make_engine(**kwargs) -> AsyncEngine:
+    """Engine of DATABASE_URL with the DB_POOL_* settings (kwargs override them)."""
+    options = {
+        "poolclass": InstrumentedPool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "connect_args": {
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE
+        },
+    }
+    return create_async_engine(settings.DATABASE_URL, **(options | kwargs))
+
+
+engine = make_engine()
+pool_metrics.listen(engine)
+
+
+class AccountedSession(Session):
+    """Session adding up how long it held a connection in info["held"]."""
+
+
+@event.listens_for(AccountedSession, "after_begin")
+def connection_acquired(session, transaction, connection):
+    session.info.setdefault("acquired_at", time.perf_counter())
+
 
+@event.listens_for(AccountedSession, "after_transaction_end")
+def connection_released(session, transaction):
+    if transaction.parent is None and "acquired_at" in session.info:
+        acquired_at = session.info.pop("acquired_at")
+        session.info["held"] = session.info.get("held", 0.0) + (
+            time.perf_counter() - acquired_at
+        )
 
-async def get_db_connection():
+
+def make_sessionmaker(engine: AsyncEngine) -> sessionmaker:
+    return sessionmaker(
+        engine,
+        class_=AsyncSession,
+        sync_session_class=AccountedSession,
+        expire_on_commit=False,
+    )
+
+
+AsyncSessionLocal = make_sessionmaker(engine)
+
+
+async def get_db_connection(request: Request):
+    """
+    Session of the request. A connection is checked out on its first
+    statement only and returned when the unit of work ends (commit,
+    rollback or release_connection), not necessarily with the request.
+    """
     async with AsyncSessionLocal() as session:
-        yield session
+        try:
+            yield session
+        finally:
+            await session.close()
+
+            # Per-request accounting (per connection: GET /metrics)
+            held = session.sync_session.info.get("held")
+            if held is not None:
+                logger.debug(
+                    f"{request.method} {request.url.path}: "
+                    f"database connection held {held * 1000:.1f} ms"
+                )
+
+
+async def release_connection(session: AsyncSession):
+    """
+    Ends the unit of work (read-only so far) and returns the connection
+    to the pool; the session opens a new one if it is used again.
+    """
+    if session.in_transaction():
+        await session.close()
@@ -19,6 +19,23 @@ class User(Base):
     is_admin: Mapped[bool] = mapped_column(
         default=False, server_default="false", nullable=False
     )  # Configured in the DB
+    token_version: Mapped[int] = mapped_column(
+        default=0, server_default="0", nullable=False
+    )  # Incremented to invalidate access tokens with claims
+
+
+class DeletedUser(Base):
+    """
+    Ids of recently deleted users: access tokens with their claims stay
+    rejected after a restart. Kept for the access token lifetime.
+    """
+
+    __tablename__ = "deleted_users"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)  # users.id
+    deleted_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, index=True
+    )
 
 
 class RevokedToken(Base):
@@ -34,5 +51,5 @@ class RevokedToken(Base):
         unique=True, nullable=False, index=True
     )  # JTI (JWT ID) is a unique identifier for the toke
     expires_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), nullable=False
-    )
+        DateTime(timezone=True), nullable=False, index=True
+    )  # Indexed for the cleanup of expired tokens
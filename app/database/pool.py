@@ -0,0 +1,134 @@
+"""
+Instrumented connection pool of the database engine.
+
+Connection churn (connects, closes, invalidations), checkouts and how
+long connections stay checked out are taken from SQLAlchemy pool events;
+the time spent waiting for a connection (queue wait, new connection,
+pre-ping) and pool timeouts are measured around Pool.connect().
+See GET /metrics.
+"""
+
+import bisect
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)  # Seconds
+
+
+def cumulative(counts: list[int]) -> dict[str, int]:
+    """Counts up to each bound (in seconds), as in Prometheus histograms."""
+    histogram, total = {}, 0
+    for bound, count in zip([*map(str, LATENCY_BUCKETS), "+Inf"], counts):
+        total += count
+        histogram[bound] = total
+    return histogram
+
+
+def average_ms(total: float, count: int) -> float:
+    return round(total / count * 1000, 3) if count else 0.0
+
+
+class PoolMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waits = [0] * (len(LATENCY_BUCKETS) + 1)  # Last one: above all buckets
+        self._holds = [0] * (len(LATENCY_BUCKETS) + 1)  # Checkout to checkin
+        self.wait_total = 0.0
+        self.hold_total = 0.0
+        self.timeouts = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.closes = 0
+        self.invalidations = 0
+
+    def observe_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self._waits[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            self.wait_total += seconds
+            self.timeouts += timed_out
+
+    def observe_hold(self, seconds: float):
+        with self._lock:
+            self._holds[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            self.hold_total += seconds
+
+    def _on_checkout(self, dbapi_connection, connection_record, proxy):
+        connection_record.info["checked_out_at"] = time.perf_counter()
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        checked_out_at = connection_record.info.pop("checked_out_at", None)
+        if checked_out_at is not None:
+            self.observe_hold(time.perf_counter() - checked_out_at)
+
+    def listen(self, engine: AsyncEngine):
+        """Counts the pool events of the engine (kept when the pool is recreated)."""
+        target = engine.sync_engine
+
+        def count(name: str):
+            def listener(*args):
+                with self._lock:
+                    setattr(self, name, getattr(self, name) + 1)
+
+            return listener
+
+        event.listen(target, "connect", count("connects"))
+        event.listen(target, "close", count("closes"))
+        event.listen(target, "close_detached", count("closes"))
+        event.listen(target, "invalidate", count("invalidations"))
+        event.listen(target, "checkout", count("checkouts"))
+        event.listen(target, "checkin", count("checkins"))
+        event.listen(target, "checkout", self._on_checkout)
+        event.listen(target, "checkin", self._on_checkin)
+
+    def stats(self, pool) -> dict:
+        with self._lock:
+            waits, holds = list(self._waits), list(self._holds)
+            wait_total, hold_total = self.wait_total, self.hold_total
+            counters = {
+                "timeouts": self.timeouts,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "closes": self.closes,
+                "invalidations": self.invalidations,
+            }
+
+        waits, holds = cumulative(waits), cumulative(holds)
+
+        return {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "wait_histogram": waits,
+            "wait_avg_ms": average_ms(wait_total, waits["+Inf"]),
+            "hold_histogram": holds,
+            "hold_avg_ms": average_ms(hold_total, holds["+Inf"]),
+            **counters,
+        }
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool timing every checkout into `metrics`."""
+
+    metrics = pool_metrics
+
+    def connect(self):
+        start = time.perf_counter()
+
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.metrics.observe_wait(time.perf_counter() - start, timed_out=True)
+            raise
+
+        self.metrics.observe_wait(time.perf_counter() - start)
+        return connection
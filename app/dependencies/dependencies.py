@@ -7,35 +7,91 @@ from app.exceptions.users import (
     UserNotFoundException,
     AdminAccessRequired,
 )
-from app.exceptions.tokens import InvalidTokenTypeException
+from app.exceptions.tokens import (
+    InvalidTokenException,
+    InvalidTokenTypeException,
+    TokenRevokedException,
+)
 from app.database.models import User as UserModel
-from app.database.database import get_db_connection
+from app.database.database import get_db_connection, release_connection
+from app.core.config import get_settings
+from app.utils.user_cache import AuthenticatedUser, user_cache
+
+settings = get_settings()
+
+
+async def get_access_token_payload(payload: dict = Depends(decode_jwt_token)):
+    """
+    Payload of a valid Access Token from the Authorization header
+    (signature and expiry checked, no database access).
+    """
+    if payload.get("token_type") != "access":
+        raise InvalidTokenTypeException(expected_type="access")
+
+    return payload
 
 
 async def get_current_user(
-    payload: dict = Depends(decode_jwt_token),
+    payload: dict = Depends(get_access_token_payload),
     session: AsyncSession = Depends(get_db_connection),
 ):
     """
-    Retrieves the profile of the current user by decoding JWT token.
+    Retrieves the profile of the current user by decoding JWT token
+    (from the user cache when possible).
     Only accessible with a valid Access Token in the Authorization header.
     """
-    if payload.get("token_type") != "access":
-        raise InvalidTokenTypeException(expected_type="access")
-
     username: str = payload.get("sub")
 
-    query = select(UserModel).where(UserModel.username == username)
-    result = await session.execute(query)
-    user_in_db = result.scalars().first()
+    found, user = user_cache.get(username)
+
+    if not found:
+        epoch = user_cache.epoch
 
-    if not user_in_db:
+        query = select(UserModel).where(UserModel.username == username)
+        result = await session.execute(query)
+        user_in_db = result.scalars().first()
+
+        user = AuthenticatedUser.from_model(user_in_db) if user_in_db else None
+        user_cache.set(username, user, epoch)
+
+        # Not held while the endpoint runs (e.g. a conversion)
+        await release_connection(session)
+
+    if user is None:
         raise UserNotFoundException()
 
-    return user_in_db
+    return user
+
+
+async def get_claims_user(payload: dict = Depends(get_access_token_payload)):
+    """
+    The current user from the uid/adm/ver claims of the access token,
+    without the database. Tokens issued before the user was deleted
+    or changed are rejected.
+    """
+    try:
+        user = AuthenticatedUser(
+            id=int(payload["uid"]),
+            username=payload["sub"],
+            is_admin=bool(payload["adm"]),
+        )
+        token_version = int(payload["ver"])
+    except (KeyError, TypeError, ValueError):
+        raise InvalidTokenException()  # A token without claims: refresh it
+
+    if not user_cache.token_version_ok(user.id, token_version):
+        raise TokenRevokedException()
+
+    return user
 
 
-async def admin_required(current_user: UserModel = Depends(get_current_user)):
+# The current user of the hot (currency) endpoints
+get_request_user = get_claims_user if settings.ACCESS_TOKEN_CLAIMS else get_current_user
+
+
+async def admin_required(
+    current_user: AuthenticatedUser = Depends(get_current_user),
+):
     """
     Check if the authenticated user has the 'is_admin' flag set to True.
     """
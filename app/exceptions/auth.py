@@ -8,3 +8,12 @@ class InvalidCredentialsException(AppException):
             message="Invalid credentials",
             error_code="INVALID_CREDENTIALS",
         )
+
+
+class PasswordPoolBusyException(AppException):
+    def __init__(self):
+        super().__init__(
+            status_code=429,
+            message="Too many authentication requests, try again later",
+            error_code="TOO_MANY_REQUESTS",
+        )
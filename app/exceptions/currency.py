@@ -8,3 +8,40 @@ class InvalidCurrencyCodeException(AppException):
             message=f"Invalid currency code provided: {', '.join(invalid_codes)}",
             error_code="INVALID_CODE",
         )
+
+
+class RatesUnavailableException(AppException):
+    def __init__(self):
+        super().__init__(
+            status_code=503,
+            message="Exchange rates are temporarily unavailable",
+            error_code="RATES_UNAVAILABLE",
+        )
+
+
+class HistoricalRatesNotFoundException(AppException):
+    def __init__(self, at: str):
+        super().__init__(
+            status_code=404,
+            message=f"No exchange rates recorded at or before {at}",
+            error_code="RATES_NOT_FOUND",
+        )
+
+
+class UnsupportedMediaTypeException(AppException):
+    def __init__(self, media_type: str, expected: str):
+        super().__init__(
+            status_code=415,
+            message=f"Unsupported media type: {media_type or 'none'}, expected {expected}",
+            error_code="UNSUPPORTED_MEDIA_TYPE",
+        )
+
+
+class RatesNotModifiedException(AppException):
+    def __init__(self, headers: dict[str, str]):
+        super().__init__(
+            status_code=304,
+            message="Exchange rates have not changed",
+            error_code="NOT_MODIFIED",
+        )
+        self.headers = headers
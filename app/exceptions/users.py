@@ -22,3 +22,30 @@ class AdminAccessRequired(AppException):
             message="Forbidden: admin access required",
             error_code="FORBIDDEN",
         )
+
+
+class ImportTooLargeException(AppException):
+    def __init__(self, max_rows: int):
+        super().__init__(
+            status_code=413,
+            message=f"Too many rows: at most {max_rows} users per import",
+            error_code="PAYLOAD_TOO_LARGE",
+        )
+
+
+class ImportLineTooLongException(AppException):
+    def __init__(self, line: int, max_bytes: int):
+        super().__init__(
+            status_code=413,
+            message=f"Line {line} exceeds {max_bytes} bytes",
+            error_code="PAYLOAD_TOO_LARGE",
+        )
+
+
+class CacheInvalidationException(AppException):
+    def __init__(self):
+        super().__init__(
+            status_code=503,
+            message="The change is saved, but other workers could not be notified",
+            error_code="SERVICE_UNAVAILABLE",
+        )
@@ -1,6 +1,7 @@
 from fastapi import Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from app.exceptions.base import AppException
+from app.exceptions.currency import RatesNotModifiedException
 from app.api.schemas.errors import ErrorResponse
 
 
@@ -15,3 +16,10 @@ async def app_exception_handler(request: Request, exc: AppException):
     return JSONResponse(
         status_code=exc.status_code, content=error_response.model_dump()
     )
+
+
+async def not_modified_handler(request: Request, exc: RatesNotModifiedException):
+    """
+    304 Not Modified: no body, only the validators of the cached response.
+    """
+    return Response(status_code=exc.status_code, headers=exc.headers)
@@ -1,13 +1,26 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import httpx
 from fastapi import FastAPI, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.templating import Jinja2Templates
 from starlette.responses import HTMLResponse
 
-from app.api.endpoints import users, currency, auth
+from app.api.endpoints import users, currency, auth, metrics
+from app.core.config import get_settings
+from app.database.database import AsyncSessionLocal
 from app.exceptions.base import AppException
-from app.handlers.exceptions import app_exception_handler
+from app.exceptions.currency import RatesNotModifiedException
+from app.handlers.exceptions import app_exception_handler, not_modified_handler
 from app.handlers.validation_errors import validation_exception_handler
 from app.middlewares.logs import loguru_middleware
+from app.services.auth import AuthService
+from app.services.user import UserService
+from app.utils.actual_rates import rates_store
+from app.utils.rates_fetcher import run_scheduler
+from app.utils.revoked_tokens import revoked_tokens
+from app.utils.user_cache import user_cache
 from loguru import logger
 import sys
 
@@ -48,9 +61,60 @@ logger.add(
     format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {message}",
 )
 
+settings = get_settings()
+
+
+async def read_token_versions() -> dict[int, int]:
+    """Token versions of changed users, in a session of their own."""
+    async with AsyncSessionLocal() as session:
+        return await UserService.get_token_versions(session)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup state and background tasks of every worker."""
+    tasks = []
+    http_client = None
+
+    async with AsyncSessionLocal() as session:
+        async for jti, expires_at in AuthService.get_revoked_tokens(session):
+            revoked_tokens.add(jti, expires_at)
+
+    if settings.ACCESS_TOKEN_CLAIMS:
+        user_cache.load_token_versions(await read_token_versions())
+
+    if settings.USER_CACHE_INVALIDATION_CHANNEL is not None:
+        channel = settings.USER_CACHE_INVALIDATION_CHANNEL
+        # Versions changed while the channel was down are read again
+        loader = read_token_versions if settings.ACCESS_TOKEN_CLAIMS else None
+        tasks.append(asyncio.create_task(user_cache.listen(channel, loader)))
+
+    if settings.RATES_UPDATES_CHANNEL is not None:
+        channel = settings.RATES_UPDATES_CHANNEL
+        tasks.append(asyncio.create_task(rates_store.listen(channel)))
+
+    # Every worker polls the API: meant for a single-worker deployment
+    if settings.RATES_SCHEDULER_ENABLED:
+        http_client = httpx.AsyncClient(timeout=settings.EXTERNAL_API_TIMEOUT)
+        tasks.append(
+            asyncio.create_task(
+                run_scheduler(http_client, settings.RATES_UPDATE_INTERVAL)
+            )
+        )
+
+    yield
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    if http_client is not None:
+        await http_client.aclose()
+
 
 app = FastAPI(
     title="Currency Converter API",
+    lifespan=lifespan,
     swagger_ui_parameters={
         "defaultModelsExpandDepth": -1,  # Hide models section by default
         "docExpansion": "none",  # Collapse all sections by default,
@@ -64,11 +128,13 @@ templates = Jinja2Templates(directory="app/templates")
 
 app.middleware("http")(loguru_middleware)
 app.add_exception_handler(AppException, app_exception_handler)
+app.add_exception_handler(RatesNotModifiedException, not_modified_handler)
 app.add_exception_handler(RequestValidationError, validation_exception_handler)
 
 app.include_router(users.router)
 app.include_router(currency.router)
 app.include_router(auth.router)
+app.include_router(metrics.router)
 
 
 @app.get(
@@ -1,11 +1,11 @@
 import jwt
 from jwt import PyJWTError
-import bcrypt
-import datetime
+from typing import AsyncIterator
+
 from sqlalchemy import select
 
 from app.core.security import create_access_token, create_refresh_token
-from app.database.models import User, RevokedToken
+from app.database.models import User
 from app.exceptions.users import UserAlreadyExistsException, UserNotFoundException
 from app.exceptions.auth import InvalidCredentialsException
 from app.exceptions.tokens import (
@@ -14,6 +14,10 @@ from app.exceptions.tokens import (
     TokenRevokedException,
 )
 from app.core.config import get_settings
+from app.utils.password_pool import password_pool
+from app.utils.revocation import revocation_backend
+from app.utils.revoked_tokens import revoked_tokens
+from app.utils.user_cache import user_cache
 
 settings = get_settings()
 
@@ -22,6 +26,20 @@ ALGORITHM = settings.ALGORITHM
 
 
 class AuthService:
+    @staticmethod
+    def access_token_data(user: User) -> dict:
+        """Access token payload: the username, plus claims if enabled."""
+        data = {"sub": user.username}
+
+        if settings.ACCESS_TOKEN_CLAIMS:
+            data |= {
+                "uid": user.id,
+                "adm": user.is_admin,
+                "ver": user.token_version,
+            }
+
+        return data
+
     @staticmethod
     async def register(user, session):
         query = select(User).where(User.username == user.username)
@@ -31,14 +49,16 @@ class AuthService:
         if user_in_db:
             raise UserAlreadyExistsException()
 
-        password_bytes = bytes(user.password, "utf-8")
-        hashed = bcrypt.hashpw(password_bytes, bcrypt.gensalt())
+        hashed = await password_pool.hash(user.password)
 
-        new_user = User(username=user.username, hashed_password=hashed.decode("utf-8"))
+        new_user = User(username=user.username, hashed_password=hashed)
 
         session.add(new_user)
         await session.commit()
 
+        # The username may be cached as unknown
+        await user_cache.invalidate(user.username)
+
     @staticmethod
     async def login(user_in, session) -> dict:
         query = select(User).where(User.username == user_in.username)
@@ -48,12 +68,10 @@ class AuthService:
         if not user_in_db:
             raise UserNotFoundException()
 
-        if not bcrypt.checkpw(
-            user_in.password.encode("utf-8"), user_in_db.hashed_password.encode("utf-8")
-        ):
+        if not await password_pool.check(user_in.password, user_in_db.hashed_password):
             raise InvalidCredentialsException()
 
-        access_token = create_access_token({"sub": user_in.username})
+        access_token = create_access_token(AuthService.access_token_data(user_in_db))
         refresh_token = create_refresh_token({"sub": user_in.username})
 
         return {
@@ -73,33 +91,39 @@ class AuthService:
         if payload.get("token_type") != "refresh":
             raise InvalidTokenTypeException(expected_type="refresh")
 
-            # Check the unique token ID in the revoked token database
+        # Check the unique token ID in the in-process index (no query)
         jti = payload.get("jti")
 
-        query = select(RevokedToken).where(RevokedToken.jti == jti)
-        result = await session.execute(query)
-        is_revoked = result.scalars().first()
-
-        if is_revoked:
+        if revoked_tokens.is_revoked(jti):
             raise TokenRevokedException()
 
-        # Revoke the current refresh token and add it to the database
+        # Revoke the current refresh token: fails if another request did
         expire_timestamp = payload.get("exp")
-        revoked_entry = RevokedToken(
-            jti=jti,
-            expires_at=datetime.datetime.fromtimestamp(
-                expire_timestamp, tz=datetime.UTC
-            ),
-        )
 
-        session.add(revoked_entry)
+        if not await revocation_backend.revoke(jti, expire_timestamp, session):
+            revoked_tokens.add(jti, expire_timestamp)
+            raise TokenRevokedException()
 
         # Generate a new pair of tokens
         email = payload.get("sub")
-        new_access = create_access_token({"sub": email})
+        access_data = {"sub": email}
+
+        if settings.ACCESS_TOKEN_CLAIMS:
+            # Current claims: the role may have changed since the login
+            query = select(User).where(User.username == email)
+            result = await session.execute(query)
+            user_in_db = result.scalars().first()
+
+            if not user_in_db:
+                raise UserNotFoundException()
+
+            access_data = AuthService.access_token_data(user_in_db)
+
+        new_access = create_access_token(access_data)
         new_refresh = create_refresh_token({"sub": email})
 
         await session.commit()
+        revoked_tokens.add(jti, expire_timestamp)
 
         return {
             "access_token": new_access,
@@ -115,12 +139,15 @@ class AuthService:
             jti = payload.get("jti")
             exp = payload.get("exp")
 
-            session.add(
-                RevokedToken(
-                    jti=jti,
-                    expires_at=datetime.datetime.fromtimestamp(exp, tz=datetime.UTC),
-                )
-            )
+            if not await revocation_backend.revoke(jti, exp, session):
+                raise TokenRevokedException()
+
             await session.commit()
+            revoked_tokens.add(jti, exp)
         except:
             raise InvalidTokenException()
+
+    @staticmethod
+    def get_revoked_tokens(session) -> AsyncIterator[tuple[str, float]]:
+        """(jti, expiration timestamp) of revoked tokens that have not expired."""
+        return revocation_backend.revoked(session)
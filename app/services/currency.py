@@ -0,0 +1,227 @@
+import json
+from itertools import repeat
+from typing import AsyncIterator
+
+import numpy as np
+from pydantic import ValidationError
+
+from app.api.schemas.currency import Converter
+from app.utils.actual_rates import RatesSnapshot
+from app.utils.cross_rates import get_cross_rates
+from app.utils.fixed_point import RoundingMode, format_scaled, get_fixed_point_rates
+
+MAX_LINE_BYTES = 64 * 1024  # Longest accepted NDJSON line
+
+
+class CurrencyService:
+    @staticmethod
+    def convert(snapshot: RatesSnapshot, code_1: str, code_2: str, k: float) -> float:
+        """Converts k units of code_1 to code_2 (rounded to 3 decimal places)."""
+        return round(k * get_cross_rates(snapshot).rate(code_1, code_2), 3)
+
+    @staticmethod
+    def convert_exact(
+        snapshot: RatesSnapshot,
+        code_1: str,
+        code_2: str,
+        k: float,
+        decimals: int = 3,
+        rounding: RoundingMode = "half_even",
+    ) -> str:
+        """
+        Converts k units of code_1 to code_2 in scaled-integer arithmetic.
+        Returns the exact result rounded to `decimals` as a decimal string.
+        """
+        result = get_fixed_point_rates(snapshot).convert(
+            code_1, code_2, k, decimals, rounding
+        )
+        return format_scaled(result, decimals)
+
+    @staticmethod
+    def convert_batch(
+        snapshot: RatesSnapshot,
+        items,
+        exact: bool = False,
+        decimals: int = 3,
+        rounding: RoundingMode = "half_even",
+    ) -> dict:
+        """
+        Converts many (code_1, code_2, k) items against one rates snapshot.
+        Codes are resolved once per distinct code, ratios are gathered
+        from the cross-rate matrix in a single NumPy operation.
+        With `exact`, results are decimal strings computed as in convert_exact.
+        """
+        count = len(items)
+
+        codes = np.array(
+            [item.code_1.upper() for item in items]
+            + [item.code_2.upper() for item in items]
+        )
+        amounts = np.fromiter((item.k for item in items), dtype=np.float64, count=count)
+
+        # Validate every code in one pass: dict lookups only for distinct codes
+        unique_codes, inverse = np.unique(codes, return_inverse=True)
+        unique_index = np.fromiter(
+            (snapshot.index.get(code, -1) for code in unique_codes.tolist()),
+            dtype=np.intp,
+            count=len(unique_codes),
+        )
+        positions = unique_index[inverse]
+        idx_1, idx_2 = positions[:count], positions[count:]
+
+        valid = (idx_1 >= 0) & (idx_2 >= 0)
+
+        errors = []
+        for i in np.flatnonzero(~valid).tolist():
+            invalid_codes = [str(codes[j]) for j in (i, count + i) if positions[j] < 0]
+            errors.append(
+                {
+                    "index": i,
+                    "error_code": "INVALID_CODE",
+                    "message": f"Invalid currency code provided: {', '.join(invalid_codes)}",
+                }
+            )
+
+        if exact:
+            results = get_fixed_point_rates(snapshot).convert_many(
+                idx_1[valid], idx_2[valid], amounts[valid], decimals, rounding
+            )
+            converted = iter(map(format_scaled, results, repeat(decimals)))
+            results = [next(converted) if ok else None for ok in valid.tolist()]
+        else:
+            ratios = get_cross_rates(snapshot).ratios(
+                np.where(valid, idx_1, 0), np.where(valid, idx_2, 0)
+            )
+            with np.errstate(over="ignore"):
+                products = amounts * ratios
+
+            # Finite inputs can still overflow (1e308 USD in IRR): not JSON-encodable
+            overflow = valid & ~np.isfinite(products)
+            for i in np.flatnonzero(overflow).tolist():
+                errors.append(
+                    {
+                        "index": i,
+                        "error_code": "RESULT_OUT_OF_RANGE",
+                        "message": "Conversion result is out of range",
+                    }
+                )
+            errors.sort(key=lambda error: error["index"])
+
+            results = [
+                round(result, 3) if ok else None
+                for result, ok in zip(products.tolist(), (valid & ~overflow).tolist())
+            ]
+
+        return {
+            "updated": snapshot.updated_msk,
+            "count": count,
+            "results": results,
+            "errors": errors,
+        }
+
+    @staticmethod
+    def line_too_long(number: int) -> dict:
+        return {
+            "line": number,
+            "error_code": "LINE_TOO_LONG",
+            "message": f"Line exceeds {MAX_LINE_BYTES} bytes",
+        }
+
+    @staticmethod
+    def convert_lines(snapshot: RatesSnapshot, lines: list[bytes], first: int) -> bytes:
+        """
+        Converts NDJSON lines (numbered from `first`) as one batch and
+        returns NDJSON results in the same order. Blank lines are skipped.
+        """
+        records: list[dict | None] = []
+        items, positions = [], []
+
+        for number, line in enumerate(lines, start=first):
+            if not line.strip():
+                continue
+
+            if len(line) > MAX_LINE_BYTES:
+                records.append(CurrencyService.line_too_long(number))
+                continue
+
+            try:
+                items.append(Converter.model_validate_json(line))
+                positions.append(len(records))
+                records.append(None)
+            except ValidationError as e:
+                message = "; ".join(
+                    f"Field: {error['loc']}, Error: {error['msg']}"
+                    for error in e.errors()
+                )
+                records.append(
+                    {
+                        "line": number,
+                        "error_code": "VALIDATION_ERROR",
+                        "message": message,
+                    }
+                )
+
+        if items:
+            batch = CurrencyService.convert_batch(snapshot, items)
+            errors = {error["index"]: error for error in batch["errors"]}
+
+            for i, (item, result) in enumerate(zip(items, batch["results"])):
+                record = {"code_1": item.code_1.upper(), "code_2": item.code_2.upper()}
+                if i in errors:
+                    record |= {
+                        "error_code": errors[i]["error_code"],
+                        "message": errors[i]["message"],
+                    }
+                else:
+                    record |= {"k": item.k, "result": result}
+                records[positions[i]] = record
+
+        # Line numbers of successful items follow from their position
+        numbers = [n for n, line in enumerate(lines, start=first) if line.strip()]
+
+        # Overflowing results are RESULT_OUT_OF_RANGE errors of the batch:
+        # Infinity/NaN would not be valid JSON
+        return b"".join(
+            json.dumps(
+                {"line": number} | record, ensure_ascii=False, allow_nan=False
+            ).encode("utf-8")
+            + b"\n"
+            for number, record in zip(numbers, records)
+        )
+
+    @staticmethod
+    async def convert_stream(
+        snapshot: RatesSnapshot, chunks: AsyncIterator[bytes]
+    ) -> AsyncIterator[bytes]:
+        """
+        Converts an NDJSON stream against one pinned rates snapshot.
+        Every received chunk is converted as a batch and sent back right away,
+        so memory use depends on the chunk size, not on the stream length.
+        """
+        buffer = b""
+        number = 1  # Number of the next line
+        skipping = False  # Inside a line longer than MAX_LINE_BYTES
+
+        async for chunk in chunks:
+            lines = chunk.split(b"\n")
+            lines[0] = buffer + lines[0]
+            buffer = lines.pop()
+
+            if skipping and lines:
+                lines.pop(0)  # The end of the oversized line
+                skipping = False
+
+            if lines:
+                yield CurrencyService.convert_lines(snapshot, lines, number)
+                number += len(lines)
+
+            if len(buffer) > MAX_LINE_BYTES:
+                if not skipping:
+                    error = CurrencyService.line_too_long(number)
+                    yield json.dumps(error).encode("utf-8") + b"\n"
+                    number += 1
+                skipping = True
+                buffer = b""
+
+        if buffer and not skipping:
+            yield CurrencyService.convert_lines(snapshot, [buffer], number)
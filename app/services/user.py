@@ -1,15 +1,101 @@
-from sqlalchemy import select
-from app.database.models import User
-from app.exceptions.users import UserNotFoundException
+import json
+from datetime import UTC, datetime, timedelta
+from typing import AsyncIterator
+
+from pydantic import ValidationError
+from sqlalchemy import String, any_, bindparam, delete, select
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+
+from app.api.schemas.users import UserCreate
+from app.core.config import get_settings
+from app.database.database import release_connection
+from app.database.models import DeletedUser, User
+from app.exceptions.users import (
+    ImportLineTooLongException,
+    ImportTooLargeException,
+    UserNotFoundException,
+)
+from app.utils.password_pool import import_pool
+from app.utils.user_cache import REVOKED, user_cache
+
+settings = get_settings()
+
+MAX_IMPORT_LINE_BYTES = 64 * 1024  # A UserCreate record is far shorter
+
+
+def user_json(user_id: int, username: str, is_admin: bool) -> str:
+    """The users schema as compact JSON, without building a model per row."""
+    username = json.dumps(username, ensure_ascii=False)
+    is_admin = "true" if is_admin else "false"
+    return f'{{"username":{username},"id":{user_id},"is_admin":{is_admin}}}'
 
 
 class UserService:
     @staticmethod
-    async def get_users(session):
-        query = select(User)
+    def users_query(after_id: int | None):
+        """Users ordered by id (keyset pagination: after the given id)."""
+        query = select(User.id, User.username, User.is_admin).order_by(User.id)
+
+        if after_id is not None:
+            query = query.where(User.id > after_id)
+
+        return query
+
+    @staticmethod
+    async def get_users(
+        session, after_id: int | None = None, limit: int | None = None
+    ) -> list[tuple[int, str, bool]]:
+        """(id, username, is_admin) of a page of users."""
+        query = UserService.users_query(after_id)
+
+        if limit is not None:
+            query = query.limit(limit)
+
         result = await session.execute(query)
 
-        return result.scalars().all()
+        return [tuple(row) for row in result]
+
+    @staticmethod
+    def dump_users(users: list[tuple[int, str, bool]]) -> bytes:
+        return f"[{','.join(user_json(*user) for user in users)}]".encode("utf-8")
+
+    @staticmethod
+    async def stream_users(
+        session, after_id: int | None = None
+    ) -> AsyncIterator[bytes]:
+        """Users as NDJSON, a chunk per batch fetched from a server-side cursor."""
+        query = UserService.users_query(after_id).execution_options(
+            yield_per=settings.USERS_STREAM_BATCH
+        )
+        result = await session.stream(query)
+
+        async for users in result.partitions():
+            yield "".join(f"{user_json(*user)}\n" for user in users).encode("utf-8")
+
+    @staticmethod
+    def deleted_users_cutoff() -> datetime:
+        """Users deleted before it have no unexpired access tokens left."""
+        return datetime.now(UTC) - timedelta(
+            minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
+        )
+
+    @staticmethod
+    async def get_token_versions(session) -> dict[int, int]:
+        """
+        Token versions of users whose access tokens were invalidated,
+        REVOKED for recently deleted users.
+        """
+        query = select(User.id, User.token_version).where(User.token_version > 0)
+        result = await session.execute(query)
+        versions = dict(result.all())
+
+        query = select(DeletedUser.id).where(
+            DeletedUser.deleted_at >= UserService.deleted_users_cutoff()
+        )
+        result = await session.execute(query)
+        versions |= dict.fromkeys(result.scalars(), REVOKED)
+
+        return versions
 
     @staticmethod
     async def delete_user(user_id: int, admin, session):
@@ -21,4 +107,203 @@ class UserService:
             raise UserNotFoundException()
 
         await session.delete(user_in_db)
+        # Persisted for the other workers' and restarts' startup load;
+        # older entries match no unexpired access token anymore
+        session.add(DeletedUser(id=user_id, deleted_at=datetime.now(UTC)))
+        await session.execute(
+            delete(DeletedUser).where(
+                DeletedUser.deleted_at < UserService.deleted_users_cutoff()
+            )
+        )
+        await session.commit()
+
+        await user_cache.invalidate(user_in_db.username, user_id, REVOKED)
+
+    @staticmethod
+    async def set_admin(user_id: int, is_admin: bool, session):
+        """
+        Changes the admin flag. Cached users and access tokens
+        with the previous flag are invalidated.
+        """
+        query = select(User).where(User.id == user_id)
+        result = await session.execute(query)
+        user_in_db = result.scalars().first()
+
+        if not user_in_db:
+            raise UserNotFoundException()
+
+        user_in_db.is_admin = is_admin
+        user_in_db.token_version += 1
         await session.commit()
+
+        await user_cache.invalidate(
+            user_in_db.username, user_id, user_in_db.token_version
+        )
+
+        return user_in_db
+
+    @staticmethod
+    def parse_import(
+        lines: list[bytes],
+    ) -> tuple[list[dict], list[tuple[int, UserCreate]]]:
+        """Per-line errors and the valid (line, user) records of an NDJSON import."""
+        errors, users, seen = [], [], set()
+        max_length = User.username.type.length
+
+        for number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+
+            try:
+                user = UserCreate.model_validate_json(line)
+            except ValidationError as e:
+                message = "; ".join(
+                    f"Field: {error['loc']}, Error: {error['msg']}"
+                    for error in e.errors()
+                )
+                errors.append(
+                    {
+                        "line": number,
+                        "error_code": "VALIDATION_ERROR",
+                        "message": message,
+                    }
+                )
+                continue
+
+            if len(user.username) > max_length:
+                errors.append(
+                    {
+                        "line": number,
+                        "username": user.username,
+                        "error_code": "VALIDATION_ERROR",
+                        "message": f"Username longer than {max_length} characters",
+                    }
+                )
+            elif user.username in seen:
+                errors.append(
+                    {
+                        "line": number,
+                        "username": user.username,
+                        "error_code": "CONFLICT",
+                        "message": "Duplicate username in the import",
+                    }
+                )
+            else:
+                seen.add(user.username)
+                users.append((number, user))
+
+        return errors, users
+
+    @staticmethod
+    async def read_import(chunks: AsyncIterator[bytes]) -> list[bytes]:
+        """
+        Lines of a streamed NDJSON import. Stops reading as soon as the body
+        has more than USERS_IMPORT_MAX_ROWS lines or an oversized line.
+        """
+        max_rows = settings.USERS_IMPORT_MAX_ROWS
+        lines: list[bytes] = []
+        buffer = b""
+
+        async for chunk in chunks:
+            parts = chunk.split(b"\n")
+            parts[0] = buffer + parts[0]
+            buffer = parts.pop()
+            lines.extend(parts)
+
+            if len(lines) > max_rows:
+                raise ImportTooLargeException(max_rows)
+            if len(buffer) > MAX_IMPORT_LINE_BYTES:
+                raise ImportLineTooLongException(len(lines) + 1, MAX_IMPORT_LINE_BYTES)
+
+        if buffer:
+            lines.append(buffer)
+        if len(lines) > max_rows:
+            raise ImportTooLargeException(max_rows)
+
+        return lines
+
+    @staticmethod
+    async def import_users(lines: list[bytes], session) -> dict:
+        """
+        Creates users from NDJSON lines of UserCreate records: existing
+        usernames are found with one query, passwords hashed in parallel
+        and rows inserted with multi-row INSERTs. Reports every line.
+        """
+        if len(lines) > settings.USERS_IMPORT_MAX_ROWS:
+            raise ImportTooLargeException(settings.USERS_IMPORT_MAX_ROWS)
+
+        results, users = UserService.parse_import(lines)
+
+        # One parameter (an array) whatever the number of usernames
+        query = select(User.username).where(
+            User.username == any_(bindparam("usernames", type_=ARRAY(String)))
+        )
+        existing = set(
+            (
+                await session.execute(
+                    query, {"usernames": [user.username for _, user in users]}
+                )
+            ).scalars()
+        )
+        # No connection idle in a transaction while the passwords are hashed
+        # (minutes for a large import): the inserts check out a new one
+        await release_connection(session)
+
+        conflict = {"error_code": "CONFLICT", "message": "User already exists"}
+        new_users = []
+
+        for number, user in users:
+            if user.username in existing:
+                results.append({"line": number, "username": user.username} | conflict)
+            else:
+                new_users.append((number, user))
+
+        hashed = await import_pool.hash_many([user.password for _, user in new_users])
+
+        batch_size = settings.USERS_IMPORT_INSERT_BATCH
+        created = 0
+
+        for start in range(0, len(new_users), batch_size):
+            batch = new_users[start : start + batch_size]
+            query = (
+                insert(User)
+                .values(
+                    [
+                        {"username": user.username, "hashed_password": password}
+                        for (_, user), password in zip(
+                            batch, hashed[start : start + batch_size]
+                        )
+                    ]
+                )
+                # Registered meanwhile
+                .on_conflict_do_nothing(index_elements=[User.username])
+                .returning(User.username, User.id)
+            )
+            ids = dict((await session.execute(query)).all())
+
+            for number, user in batch:
+                user_id = ids.get(user.username)
+
+                if user_id is None:
+                    results.append(
+                        {"line": number, "username": user.username} | conflict
+                    )
+                else:
+                    results.append(
+                        {"line": number, "username": user.username, "id": user_id}
+                    )
+                    created += 1
+
+        await session.commit()
+
+        # New usernames may be cached as unknown here (other workers: negative TTL)
+        for _, user in new_users:
+            user_cache.discard(user.username)
+
+        results.sort(key=lambda result: result["line"])
+
+        return {
+            "created": created,
+            "failed": len(results) - created,
+            "results": results,
+        }
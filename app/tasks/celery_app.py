@@ -4,6 +4,7 @@ from celery import Celery
 from celery.schedules import crontab
 from .revoked_token_tasks import cleanup_expired_tokens
 from .exchange_rate_api import get_actual_rates
+from . import runtime  # noqa: F401 (worker process signals)
 from app.core.config import get_settings
 
 settings = get_settings()
@@ -18,14 +19,11 @@ celery_app = Celery("worker", broker=settings.REDIS_URL, backend=settings.REDIS_
 
 celery_app.autodiscover_tasks(["app.tasks"])
 celery_app.conf.timezone = "UTC"
+# Nothing reads task results: never write them to Redis
+celery_app.conf.task_ignore_result = True
 
 # Setting for Celery beat
 celery_app.conf.beat_schedule = {
-    "cleanup-tokens-every-day": {
-        "task": cleanup_expired_tokens.name,
-        # "schedule": crontab(minute='*')  Launch every minute (for testing)
-        "schedule": crontab(hour=0, minute=0),  # Launch every midnight (UTC)
-    },
     "exchange_rate_api": {
         "task": get_actual_rates.name,
         # "schedule": crontab(minute='*/5'),  # Launch every 2 minutes (for testing)
@@ -35,6 +33,14 @@ celery_app.conf.beat_schedule = {
     },
 }
 
+# Redis drops revoked tokens by itself (REVOCATION_BACKEND=redis)
+if settings.REVOCATION_BACKEND == "sql":
+    celery_app.conf.beat_schedule["cleanup-tokens-every-day"] = {
+        "task": cleanup_expired_tokens.name,
+        # "schedule": crontab(minute='*')  Launch every minute (for testing)
+        "schedule": crontab(hour=0, minute=0),  # Launch every midnight (UTC)
+    }
+
 # Launch in two terminals
 # celery -A app.tasks.celery_app.celery_app worker --loglevel=info
 # celery -A app.tasks.celery_app.celery_app beat --loglevel=info
@@ -1,32 +1,83 @@
 import asyncio
 import datetime
+import time
+
 from celery import shared_task
-from sqlalchemy import delete
-from app.database.database import AsyncSessionLocal
+from loguru import logger
+from sqlalchemy import delete, select
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import get_settings
 from app.database.models import RevokedToken
+from app.tasks.runtime import get_runtime
 
+settings = get_settings()
 
-async def sql_request():
+
+async def delete_expired_batch(session, now: datetime.datetime, size: int) -> int:
+    """
+    Deletes at most `size` expired tokens (found with the expires_at index)
+    in one short transaction. Rows locked by another transaction are skipped.
     """
-    Asynchronous function to perform sql-delete operation.
+    expired = (
+        select(RevokedToken.id)
+        .where(RevokedToken.expires_at < now)
+        .limit(size)
+        .with_for_update(skip_locked=True)
+    )
+    query = delete(RevokedToken).where(RevokedToken.id.in_(expired.scalar_subquery()))
+
+    result = await session.execute(query)
+    await session.commit()
+
+    return result.rowcount
+
+
+async def sql_request(
+    sessions: sessionmaker, batch_size: int | None = None, pause: float | None = None
+) -> int:
     """
+    Asynchronous function to delete expired tokens in bounded batches,
+    so that no long transaction blocks the refresh traffic.
+    """
+    batch_size = batch_size or settings.REVOKED_TOKENS_CLEANUP_BATCH
+    pause = settings.REVOKED_TOKENS_CLEANUP_PAUSE if pause is None else pause
+
+    now = datetime.datetime.now(datetime.UTC)
+    deleted, batches, start = 0, 0, time.perf_counter()
+
+    async with sessions() as session:
+        while True:
+            try:
+                count = await delete_expired_batch(session, now, batch_size)
+            except Exception as e:
+                await session.rollback()
+                logger.error(f"Error during cleanup after {deleted} tokens: {e}")
+                break
+
+            deleted += count
+            batches += 1
+
+            if count < batch_size:
+                break
+
+            if batches % 10 == 0:
+                logger.info(f"Cleanup: {deleted} expired tokens deleted so far")
+
+            await asyncio.sleep(pause)  # Let other transactions through
 
-    async with AsyncSessionLocal() as session:
-        try:
-            now = datetime.datetime.now(datetime.UTC)
-            query = delete(RevokedToken).where(RevokedToken.expires_at < now)
-            await session.execute(query)
-            await session.commit()
-        except Exception as e:
-            await session.rollback()
-            print(f"Error during cleanup: {e}")
+    logger.info(
+        f"Cleanup: {deleted} expired tokens deleted in {batches} batches, "
+        f"{time.perf_counter() - start:.2f}s"
+    )
+    return deleted
 
 
-@shared_task(ignore_results=True)
+@shared_task(ignore_result=True)
 def cleanup_expired_tokens():
     """
     Periodic task to remove expired JWT tokens from the database.
     Triggered daily by Celery Beat.
     """
-    loop = asyncio.get_event_loop()
-    loop.run_until_complete(sql_request())
+    runtime = get_runtime()
+    runtime.run(sql_request(runtime.sessions))
@@ -0,0 +1,86 @@
+"""
+Per-process runtime of the Celery worker.
+
+Each worker process gets one event loop, one database engine (with its
+connection pool) and one pooled HTTP client, created when the process
+starts (worker_process_init) and closed when it stops. Tasks run their
+coroutines on this loop instead of creating a loop, engine connections
+and HTTP connections on every run.
+
+The engine is not the one of app.database.database: asyncpg connections
+belong to the loop that opened them and must not cross a fork.
+"""
+
+import asyncio
+from typing import Awaitable, TypeVar
+
+import httpx
+from celery.signals import worker_process_init, worker_process_shutdown, worker_shutdown
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import get_settings
+from app.database.database import make_engine, make_sessionmaker
+
+settings = get_settings()
+
+T = TypeVar("T")
+
+
+class WorkerRuntime:
+    def __init__(self, engine: AsyncEngine, http: httpx.AsyncClient):
+        self.loop = asyncio.new_event_loop()
+        self.engine = engine
+        self.sessions: sessionmaker = make_sessionmaker(engine)
+        self.http = http
+
+    @classmethod
+    def create(cls) -> "WorkerRuntime":
+        # A task at a time per process: a small pool is enough
+        engine = make_engine(pool_size=settings.CELERY_DB_POOL_SIZE, max_overflow=0)
+        http = httpx.AsyncClient(timeout=settings.EXTERNAL_API_TIMEOUT)
+        return cls(engine, http)
+
+    def run(self, awaitable: Awaitable[T]) -> T:
+        return self.loop.run_until_complete(awaitable)
+
+    def close(self):
+        try:
+            self.run(self.http.aclose())
+            self.run(self.engine.dispose())
+        finally:
+            self.loop.close()
+
+
+_runtime: WorkerRuntime | None = None
+
+
+def get_runtime() -> WorkerRuntime:
+    """Runtime of this process, created on first use (e.g. solo pool, eager tasks)."""
+    global _runtime
+
+    if _runtime is None:
+        _runtime = WorkerRuntime.create()
+
+    return _runtime
+
+
+@worker_process_init.connect
+def start_runtime(**kwargs):
+    global _runtime
+
+    # A runtime inherited from the parent process is not usable after the fork
+    _runtime = WorkerRuntime.create()
+    logger.info("Worker runtime started")
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def stop_runtime(**kwargs):
+    global _runtime
+
+    if _runtime is not None:
+        runtime, _runtime = _runtime, None
+        runtime.close()
+        logger.info("Worker runtime stopped")
@@ -1,25 +1,257 @@
+import asyncio
 import json
+import os
+import threading
+import zlib
 from pathlib import Path
+from dataclasses import dataclass
 from datetime import datetime
+from types import MappingProxyType
+from typing import Mapping
 from zoneinfo import ZoneInfo
 
+import numpy as np
+import redis.asyncio as redis
+from loguru import logger
+
+from app.core.config import get_settings
+from app.utils import rates_format
+from app.utils.shared_rates import SharedRates, SharedRatesReader
+
+settings = get_settings()
+
 current_path = Path(__file__).parent
 file_path = current_path / ".." / "json" / "rates.json"
+binary_file_path = current_path / ".." / "json" / "rates.bin"
 
+UTC = ZoneInfo("UTC")
+MSK = ZoneInfo("Europe/Moscow")
 
-def get_actual_rates_data():
-    try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except Exception as e:
-        print(f"An unexpected error occurred: {e}")
-        return None
 
-    unix_timestamp = data["updated"]
-    utc_datetime = datetime.fromtimestamp(unix_timestamp, tz=ZoneInfo("UTC"))
-    target_timezone = ZoneInfo("Europe/Moscow")
-    msk_datetime = utc_datetime.astimezone(target_timezone)
+@dataclass(frozen=True, eq=False)
+class RatesSnapshot:
+    """
+    Immutable view of one exchange rates fetch.
+    Built once per rates file version and shared by all requests.
+    """
+
+    updated: int  # Unix timestamp reported by the external API
+    updated_msk: str  # Precomputed "<datetime> (MSK)" string
+    rates: Mapping[str, float]  # Read-only {code: rate against USD}
+    data: Mapping[str, float | str]  # Read-only {"updated": ...} | rates
+    codes: tuple[str, ...]  # Currency codes in the order of `values`
+    index: Mapping[str, int]  # Read-only {code: position in `values`}
+    values: np.ndarray  # Read-only float64 array of rates against USD
+    version: str  # Id of the rates content ("<updated hex>-<crc32 hex>")
+
+    @classmethod
+    def from_payload(cls, payload: dict) -> "RatesSnapshot":
+        """Builds a snapshot from the external API response layout."""
+        updated = payload["updated"]
+        utc_datetime = datetime.fromtimestamp(updated, tz=UTC)
+        updated_msk = f"{utc_datetime.astimezone(MSK)} (MSK)"
+
+        rates = dict(payload["rates"])
+        codes = tuple(rates)
+
+        values = np.fromiter(rates.values(), dtype=np.float64, count=len(codes))
+        values.flags.writeable = False
+
+        checksum = zlib.crc32(values.tobytes(), zlib.crc32(",".join(codes).encode()))
+
+        return cls(
+            updated=updated,
+            updated_msk=updated_msk,
+            rates=MappingProxyType(rates),
+            data=MappingProxyType({"updated": updated_msk} | rates),
+            codes=codes,
+            index=MappingProxyType({code: i for i, code in enumerate(codes)}),
+            values=values,
+            version=f"{updated:x}-{checksum:08x}",
+        )
+
+    @classmethod
+    def from_shared(cls, shared: SharedRates) -> "RatesSnapshot":
+        """Builds a snapshot from a copy of the shared memory segment."""
+        return cls.from_payload(
+            {
+                "updated": shared.updated,
+                "rates": dict(zip(shared.codes, shared.values.tolist())),
+            }
+        )
+
+
+class RatesStore:
+    """
+    Process-wide holder of the current rates snapshot.
+    Rates come from the shared memory segment when the writer has published
+    one, otherwise from the rates file. The file is parsed again only when
+    its inode, mtime or size changes. While subscribed to the rates updates
+    channel (see listen), the file is re-read on announcements only and
+    requests do not stat it. The fallback file is read while the rates file
+    does not exist yet (rates.json before the first binary snapshot).
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        shared: SharedRatesReader | None = None,
+        fallback: Path | None = None,
+    ):
+        self.path = path
+        self.shared = shared
+        self.fallback = fallback
+        self._snapshot: RatesSnapshot | None = None
+        self._file_version: tuple | None = None
+        self._shared_rates: SharedRates | None = None
+        self._shared_snapshot: RatesSnapshot | None = None
+        self._lock = threading.Lock()
+        self.subscribed = False
+
+    def get(self) -> RatesSnapshot | None:
+        if self.shared is not None:
+            snapshot = self._get_shared()
+            if snapshot is not None:
+                return snapshot
+
+        if self.subscribed and self._snapshot is not None:
+            return self._snapshot
+
+        try:
+            path, stat = self._stat()
+        except OSError as e:
+            logger.error(f"Rates file is not available: {e}")
+            return self._snapshot
+
+        version = (path, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+        if version != self._file_version:
+            with self._lock:
+                if version != self._file_version:
+                    self._reload(path, version)
+
+        return self._snapshot
+
+    def _stat(self) -> tuple[Path, os.stat_result]:
+        try:
+            return self.path, os.stat(self.path)
+        except FileNotFoundError:
+            if self.fallback is None:
+                raise
+            return self.fallback, os.stat(self.fallback)
+
+    def _get_shared(self) -> RatesSnapshot | None:
+        shared = self.shared.read()
+
+        if shared is None:
+            return None
 
-    rates = {"updated": f"{msk_datetime} (MSK)"} | data["rates"]
+        # The reader returns the same object until a new version is published
+        if shared is not self._shared_rates:
+            with self._lock:
+                if shared is not self._shared_rates:
+                    self._shared_snapshot = RatesSnapshot.from_shared(shared)
+                    self._shared_rates = shared
+
+        return self._shared_snapshot
+
+    def refresh(self) -> RatesSnapshot | None:
+        """Re-reads the rates file if it changed, whether subscribed or not."""
+        try:
+            path, stat = self._stat()
+        except OSError as e:
+            logger.error(f"Rates file is not available: {e}")
+            return self._snapshot
+
+        with self._lock:
+            version = (path, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if version != self._file_version:
+                self._reload(path, version)
+
+        return self._snapshot
+
+    async def listen(self, channel: str):
+        """
+        Swaps the snapshot on every version announced by the rates writer
+        until cancelled. The file is re-read after every (re)connection, as
+        announcements may have been missed; while disconnected, requests
+        fall back to checking the file.
+        """
+        while True:
+            try:
+                async with redis.from_url(settings.REDIS_URL) as client:
+                    async with client.pubsub() as pubsub:
+                        await pubsub.subscribe(channel)
+                        await asyncio.to_thread(self.refresh)
+                        self.subscribed = True
+
+                        async for message in pubsub.listen():
+                            if message["type"] != "message":
+                                continue
+
+                            version = json.loads(message["data"])["version"]
+                            snapshot = await asyncio.to_thread(self.refresh)
+                            if snapshot is None or snapshot.version != version:
+                                logger.warning(
+                                    f"Announced rates {version} are not in {self.path}"
+                                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Rates updates channel failed: {e}")
+                await asyncio.sleep(1)
+            finally:
+                self.subscribed = False
+
+    def _reload(self, path: Path, version: tuple):
+        # A broken file is remembered too, so it is not re-parsed on every call:
+        # the next write changes the version and triggers a new attempt.
+        self._file_version = version
+
+        try:
+            payload = read_rates_file(path)
+            self._snapshot = RatesSnapshot.from_payload(payload)
+        except Exception as e:
+            logger.error(f"Failed to load rates from {path}: {e}")
+
+
+def rates_file_path() -> Path:
+    """Rates file of the configured storage format."""
+    if settings.RATES_STORAGE_FORMAT == "binary":
+        return binary_file_path
+    return file_path
+
+
+def read_rates_file(path: Path) -> dict:
+    """Reads a JSON or binary (.bin) rates file in the external API layout."""
+    if path.suffix == ".bin":
+        return rates_format.load(path)
+
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+rates_store = RatesStore(
+    rates_file_path(),
+    shared=SharedRatesReader() if settings.RATES_SHARED_SEGMENT else None,
+    # The repository ships rates.json only: served until the first fetch
+    fallback=file_path if settings.RATES_STORAGE_FORMAT == "binary" else None,
+)
+
+
+def get_rates_snapshot() -> RatesSnapshot | None:
+    """Returns the current rates snapshot (None if rates were never loaded)."""
+    return rates_store.get()
+
+
+def get_actual_rates_data() -> Mapping[str, float | str] | None:
+    """
+    Returns a read-only mapping: the "updated" key (MSK time)
+    and ISO currency codes with their rates against USD.
+    """
+    snapshot = get_rates_snapshot()
+
+    if snapshot is None:
+        return None
 
-    return rates
+    return snapshot.data
@@ -1,6 +1,11 @@
+import hashlib
+import threading
+from types import MappingProxyType
+from typing import Iterable, Mapping, NamedTuple
+
 import pycountry
 import iso4217parse
-from app.utils.actual_rates import get_actual_rates_data
+from app.utils.actual_rates import RatesSnapshot, get_rates_snapshot
 
 CORRECT_NAMES = {
     "ANG": "Netherlands Antillean Guilder",
@@ -62,29 +67,94 @@ def get_currency_name(currency_code):
     return "Undefined"
 
 
-def get_codes_names() -> dict:
+class CurrencyInfo(NamedTuple):
+    flag: str | None
+    name: str
+    display: str  # "<flag> <name>", as shown by /currency/list
+
+
+def build_currency_info(currency_code: str) -> CurrencyInfo:
     """
-    Returns a dictionary:
-    - Keys are currency codes;
-    - Values are currency names according to the ISO 4217 standard.
+    Collects the flag and the name of one currency.
+    Names from CORRECT_NAMES take precedence over ISO 4217 ones.
+    """
+    flag = get_flag_from_currency(currency_code)
+    name = CORRECT_NAMES.get(currency_code) or get_currency_name(currency_code)
+    display = f"{flag} {name}" if flag else name
+
+    return CurrencyInfo(flag=flag, name=name, display=display)
+
+
+def codes_set_key(codes: Iterable[str]) -> str:
+    """Stable hash of a set of currency codes."""
+    return hashlib.sha1(",".join(sorted(codes)).encode("utf-8")).hexdigest()
+
+
+class CurrencyRegistry:
+    """
+    Code -> (flag, name, display string) table.
+    Built once per distinct set of codes and exposed as frozen mappings.
     """
-    data = get_actual_rates_data()
-    codes_list = list(data.keys())
 
-    codes_flags = {x: get_flag_from_currency(x) for x in codes_list}
-    codes_iso = [get_currency_name(code) for code in codes_list]
+    MAX_TABLES = 4  # Distinct code sets kept in memory
+
+    def __init__(self):
+        self._tables: dict[str, tuple[Mapping, Mapping]] = {}
+        # (snapshot, table) replaced as one object: readers never pair
+        # one snapshot with the table of another
+        self._last: tuple[RatesSnapshot | None, tuple[Mapping, Mapping]] = (
+            None,
+            (MappingProxyType({}), MappingProxyType({})),
+        )
+        self._lock = threading.Lock()
 
-    full_names_map = {}
+    def _table(
+        self, snapshot: RatesSnapshot | None = None
+    ) -> tuple[Mapping[str, CurrencyInfo], Mapping[str, str]]:
+        if snapshot is None:
+            snapshot = get_rates_snapshot()
 
-    for i, key in enumerate(codes_list):
-        full_names_map[key] = f"{codes_flags[key]} {codes_iso[i]}"
+        # Same snapshot object -> same set of codes, nothing to hash
+        last_snapshot, last_table = self._last
+        if snapshot is None or snapshot is last_snapshot:
+            return last_table
 
-    for code, name in CORRECT_NAMES.items():
-        if code in full_names_map:
-            emoji = full_names_map[code].split(" ")[0]
-            if emoji == "None":
-                full_names_map[code] = name
-            else:
-                full_names_map[code] = f"{emoji} {name}"
+        with self._lock:
+            key = codes_set_key(snapshot.rates)
+            table = self._tables.get(key)
 
-    return full_names_map
+            if table is None:
+                entries = {code: build_currency_info(code) for code in snapshot.rates}
+                table = (
+                    MappingProxyType(entries),
+                    MappingProxyType({c: i.display for c, i in entries.items()}),
+                )
+
+                if len(self._tables) >= self.MAX_TABLES:
+                    self._tables.pop(next(iter(self._tables)))
+                self._tables[key] = table
+
+            self._last = (snapshot, table)
+
+        return table
+
+    def entries(
+        self, snapshot: RatesSnapshot | None = None
+    ) -> Mapping[str, CurrencyInfo]:
+        """Table of the given snapshot (the current one by default)."""
+        return self._table(snapshot)[0]
+
+    def names(self, snapshot: RatesSnapshot | None = None) -> Mapping[str, str]:
+        return self._table(snapshot)[1]
+
+
+currency_registry = CurrencyRegistry()
+
+
+def get_codes_names(snapshot: RatesSnapshot | None = None) -> Mapping[str, str]:
+    """
+    Returns a read-only mapping:
+    - Keys are currency codes;
+    - Values are flags and currency names according to the ISO 4217 standard.
+    """
+    return currency_registry.names(snapshot)
@@ -0,0 +1,138 @@
+import json
+import os
+import threading
+import weakref
+from pathlib import Path
+from types import MappingProxyType
+from typing import Mapping, TYPE_CHECKING
+
+import numpy as np
+from loguru import logger
+
+if TYPE_CHECKING:
+    from app.utils.actual_rates import RatesSnapshot
+
+current_path = Path(__file__).parent
+matrix_path = current_path / ".." / "json" / "cross_rates.npy"
+meta_path = current_path / ".." / "json" / "cross_rates.json"
+
+
+class CrossRates:
+    """
+    Dense N x N float64 cross-rate matrix of one rates snapshot:
+    matrix[i, j] is the price of 1 unit of codes[i] in codes[j].
+    """
+
+    def __init__(
+        self,
+        updated: int,
+        codes: tuple[str, ...],
+        matrix: np.ndarray,
+        version: str | None = None,
+    ):
+        self.updated = updated
+        self.version = version  # RatesSnapshot.version the matrix was built from
+        self.codes = codes
+        self.index: Mapping[str, int] = MappingProxyType(
+            {code: i for i, code in enumerate(codes)}
+        )
+        self.matrix = matrix
+
+    @classmethod
+    def from_snapshot(cls, snapshot: "RatesSnapshot") -> "CrossRates":
+        values = snapshot.values
+        matrix = values[np.newaxis, :] / values[:, np.newaxis]
+        matrix.flags.writeable = False
+
+        return cls(snapshot.updated, snapshot.codes, matrix, snapshot.version)
+
+    def rate(self, code_1: str, code_2: str) -> float:
+        """Price of 1 unit of code_1 in code_2."""
+        return self.matrix.item(self.index[code_1], self.index[code_2])
+
+    def ratios(self, idx_1: np.ndarray, idx_2: np.ndarray) -> np.ndarray:
+        """Vectorized rate() for arrays of code positions."""
+        return self.matrix[idx_1, idx_2]
+
+    def against(self, base: str) -> dict[str, float]:
+        """Rates of all currencies against the base currency (1 base = value)."""
+        return dict(zip(self.codes, self.matrix[self.index[base]].tolist()))
+
+    def save(self, path: Path = matrix_path, meta: Path = meta_path):
+        """
+        Writes the matrix as a raw .npy file plus a JSON code table,
+        so other processes can share it with np.load(mmap_mode="r").
+        Both files are replaced atomically.
+        """
+        tmp_matrix = path.with_name(f".{path.name}.tmp")
+        tmp_meta = meta.with_name(f".{meta.name}.tmp")
+
+        with open(tmp_matrix, "wb") as f:
+            np.save(f, np.ascontiguousarray(self.matrix))
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "updated": self.updated,
+                    "version": self.version,
+                    "codes": list(self.codes),
+                },
+                f,
+            )
+
+        os.replace(tmp_matrix, path)
+        os.replace(tmp_meta, meta)
+
+    @classmethod
+    def load(cls, path: Path = matrix_path, meta: Path = meta_path) -> "CrossRates":
+        """Maps a saved matrix into memory (read-only, shared page cache)."""
+        with open(meta, "r", encoding="utf-8") as f:
+            table = json.load(f)
+
+        matrix = np.load(path, mmap_mode="r")
+        codes = tuple(table["codes"])
+
+        if matrix.shape != (len(codes), len(codes)):
+            raise ValueError(f"Matrix shape {matrix.shape} does not match codes")
+
+        return cls(table["updated"], codes, matrix, table.get("version"))
+
+
+_lock = threading.Lock()
+# One matrix per live snapshot (current and recently used historical ones)
+_cache: "weakref.WeakKeyDictionary[RatesSnapshot, CrossRates]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_cross_rates(snapshot: "RatesSnapshot") -> CrossRates:
+    """
+    Returns the cross-rate matrix of the snapshot: the saved file is mapped
+    if it was built from the same rates (same version, i.e. the same
+    `updated` and rates checksum), otherwise the matrix is built in memory.
+    Done once per snapshot.
+    """
+    cross_rates = _cache.get(snapshot)
+    if cross_rates is not None:
+        return cross_rates
+
+    with _lock:
+        cross_rates = _cache.get(snapshot)
+        if cross_rates is not None:
+            return cross_rates
+
+        try:
+            saved = CrossRates.load()
+            # Rates rewritten under the same `updated` get a new version
+            if saved.version == snapshot.version and saved.codes == snapshot.codes:
+                cross_rates = saved
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Saved cross rates are not usable: {e}")
+
+        if cross_rates is None:
+            cross_rates = CrossRates.from_snapshot(snapshot)
+
+        _cache[snapshot] = cross_rates
+
+    return cross_rates
@@ -0,0 +1,226 @@
+"""
+Exact decimal conversion with scaled integers.
+
+Rates are taken as the shortest decimal literals of their float values
+(what the external API sent) and stored as Python ints over a common
+power of ten, so k * rate_2 / rate_1 is computed exactly and rounded once,
+to the requested number of decimal places.
+
+The float64 estimate of a result is off by less than FLOAT_ERROR, so it
+already gives the exact rounded value unless it lies that close to a
+rounding boundary: integers are used only for such results.
+"""
+
+import math
+import threading
+import weakref
+from typing import Literal, Mapping, TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from app.utils.actual_rates import RatesSnapshot
+
+RoundingMode = Literal[
+    "half_even", "half_up", "half_down", "up", "down", "ceiling", "floor"
+]
+
+# Bound of the relative error of the float64 estimate k * rate_2 / rate_1
+# (decimal literals to floats plus three operations, 2**-53 each), rounded up
+FLOAT_ERROR = 2.0**-50
+FLOAT_LIMIT = 2.0**52  # Larger estimates have no fractional bits left
+
+
+def to_scaled(value: float) -> tuple[int, int]:
+    """(n, scale) with value == n / 10**scale for the shortest repr of value."""
+    if not math.isfinite(value):
+        raise ValueError(f"Cannot scale a non-finite number: {value}")
+
+    mantissa, _, exponent = repr(value).partition("e")
+    whole, _, fraction = mantissa.partition(".")
+
+    n = int(whole + fraction)
+    scale = len(fraction) - int(exponent or 0)
+
+    if scale < 0:
+        return n * 10**-scale, 0
+    return n, scale
+
+
+def divide(numerator: int, denominator: int, rounding: RoundingMode) -> int:
+    """numerator / denominator rounded to an integer (denominator > 0)."""
+    q, r = divmod(numerator, denominator)  # Rounded towards -inf
+
+    if r == 0 or rounding == "floor":
+        return q
+    if rounding == "ceiling":
+        return q + 1
+
+    positive = numerator > 0
+
+    if rounding == "down":  # Towards zero
+        return q if positive else q + 1
+    if rounding == "up":  # Away from zero
+        return q + 1 if positive else q
+
+    twice = 2 * r
+    if twice != denominator:
+        return q + 1 if twice > denominator else q
+
+    # Exactly halfway
+    if rounding == "half_up":
+        return q + 1 if positive else q
+    if rounding == "half_down":
+        return q if positive else q + 1
+    return q + q % 2
+
+
+def format_scaled(value: int, decimals: int) -> str:
+    """Decimal string of value / 10**decimals (e.g. 9058140, 3 -> "9058.140")."""
+    if decimals == 0:
+        return str(value)
+
+    sign = "-" if value < 0 else ""
+    digits = str(abs(value)).zfill(decimals + 1)
+    return f"{sign}{digits[:-decimals]}.{digits[-decimals:]}"
+
+
+class FixedPointRates:
+    """Rates of one snapshot as ints over 10**scale, in the order of its codes."""
+
+    def __init__(
+        self,
+        index: Mapping[str, int],
+        values: tuple[int, ...],
+        scale: int,
+        floats: np.ndarray,
+    ):
+        self.index = index
+        self.values = values
+        self.scale = scale
+        self.floats = floats  # The same rates as float64
+
+    @classmethod
+    def from_snapshot(cls, snapshot: "RatesSnapshot") -> "FixedPointRates":
+        scaled = [to_scaled(rate) for rate in snapshot.values.tolist()]
+        scale = max((s for _, s in scaled), default=0)
+        values = tuple(n * 10 ** (scale - s) for n, s in scaled)
+
+        return cls(snapshot.index, values, scale, snapshot.values)
+
+    def exact_index(
+        self,
+        idx_1: int,
+        idx_2: int,
+        k: float,
+        decimals: int = 3,
+        rounding: RoundingMode = "half_even",
+    ) -> int:
+        """k units of codes[idx_1] in codes[idx_2], as an int over 10**decimals."""
+        k_n, k_scale = to_scaled(k)
+
+        return divide(
+            k_n * self.values[idx_2] * 10**decimals,
+            self.values[idx_1] * 10**k_scale,
+            rounding,
+        )
+
+    def convert_index(
+        self,
+        idx_1: int,
+        idx_2: int,
+        k: float,
+        decimals: int = 3,
+        rounding: RoundingMode = "half_even",
+    ) -> int:
+        """exact_index, decided by the float64 estimate when it is far enough."""
+        estimate = k * (self.floats.item(idx_2) / self.floats.item(idx_1))
+        estimate *= 10.0**decimals
+
+        if 0 < estimate < FLOAT_LIMIT:
+            floor = math.floor(estimate)
+            fraction = estimate - floor
+
+            if rounding.startswith("half_"):
+                rounded = floor + (fraction > 0.5)
+                distance = abs(fraction - 0.5)
+            else:
+                rounded = floor if rounding in ("down", "floor") else floor + 1
+                distance = min(fraction, 1.0 - fraction)
+
+            if distance > estimate * FLOAT_ERROR:
+                return rounded
+
+        return self.exact_index(idx_1, idx_2, k, decimals, rounding)
+
+    def convert(
+        self,
+        code_1: str,
+        code_2: str,
+        k: float,
+        decimals: int = 3,
+        rounding: RoundingMode = "half_even",
+    ) -> int:
+        return self.convert_index(
+            self.index[code_1], self.index[code_2], k, decimals, rounding
+        )
+
+    def convert_many(
+        self,
+        idx_1: np.ndarray,
+        idx_2: np.ndarray,
+        amounts: np.ndarray,
+        decimals: int = 3,
+        rounding: RoundingMode = "half_even",
+    ) -> list[int]:
+        """
+        Vectorized convert_index: estimates are rounded in NumPy, results
+        close to a rounding boundary are recomputed with integers.
+        """
+        estimate = amounts * (self.floats[idx_2] / self.floats[idx_1])
+        estimate *= 10.0**decimals
+        fraction = estimate - np.floor(estimate)
+
+        if rounding.startswith("half_"):
+            rounded = np.rint(estimate)
+            distance = np.abs(fraction - 0.5)
+        else:
+            towards_zero = rounding in ("down", "floor")
+            rounded = np.floor(estimate) if towards_zero else np.ceil(estimate)
+            distance = np.minimum(fraction, 1.0 - fraction)
+
+        # NaN and inf fail the comparisons and go to the integer path too
+        decided = (
+            (distance > estimate * FLOAT_ERROR)
+            & (estimate > 0)
+            & (estimate < FLOAT_LIMIT)
+        )
+        results = np.where(decided, rounded, 0).astype(np.int64).tolist()
+
+        for i in np.flatnonzero(~decided).tolist():
+            results[i] = self.exact_index(
+                int(idx_1[i]), int(idx_2[i]), float(amounts[i]), decimals, rounding
+            )
+
+        return results
+
+
+_lock = threading.Lock()
+_cache: "weakref.WeakKeyDictionary[RatesSnapshot, FixedPointRates]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_fixed_point_rates(snapshot: "RatesSnapshot") -> FixedPointRates:
+    """Scaled-integer rates of the snapshot, built once per snapshot."""
+    fixed_point_rates = _cache.get(snapshot)
+    if fixed_point_rates is not None:
+        return fixed_point_rates
+
+    with _lock:
+        fixed_point_rates = _cache.get(snapshot)
+        if fixed_point_rates is None:
+            fixed_point_rates = FixedPointRates.from_snapshot(snapshot)
+            _cache[snapshot] = fixed_point_rates
+
+    return fixed_point_rates
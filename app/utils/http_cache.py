@@ -0,0 +1,85 @@
+"""
+Conditional requests for rates responses.
+
+A rates response only changes with the rates snapshot, so the snapshot
+version is its strong ETag and the fetch time its Last-Modified date.
+Unfiltered payloads are encoded once per snapshot and reused as bytes.
+"""
+
+import threading
+import weakref
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Callable, Mapping
+
+from fastapi.responses import JSONResponse
+
+from app.utils.actual_rates import RatesSnapshot
+
+
+def etag(snapshot: RatesSnapshot) -> str:
+    return f'"{snapshot.version}"'
+
+
+def cache_headers(snapshot: RatesSnapshot) -> dict[str, str]:
+    """Validators of a response built from the snapshot."""
+    return {
+        "ETag": etag(snapshot),
+        "Last-Modified": formatdate(snapshot.updated, usegmt=True),
+        # Per-user (authorized) responses, revalidated on every use
+        "Cache-Control": "private, no-cache",
+    }
+
+
+def is_not_modified(headers: Mapping[str, str], snapshot: RatesSnapshot) -> bool:
+    """
+    True if the client copy is current: If-None-Match lists the ETag,
+    or (without If-None-Match) If-Modified-Since is not older than the rates.
+    """
+    if_none_match = headers.get("if-none-match")
+
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+
+        # Weak comparison, as required for If-None-Match
+        current = snapshot.version
+        return any(
+            tag.strip().removeprefix("W/").strip('"') == current
+            for tag in if_none_match.split(",")
+        )
+
+    if_modified_since = headers.get("if-modified-since")
+
+    if if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return since.tzinfo is not None and snapshot.updated <= since.timestamp()
+
+    return False
+
+
+_lock = threading.Lock()
+# {snapshot: {payload key: encoded JSON}}, dropped together with the snapshot
+_bodies: "weakref.WeakKeyDictionary[RatesSnapshot, dict[tuple, bytes]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def encoded_body(
+    snapshot: RatesSnapshot, key: tuple, build: Callable[[], dict]
+) -> bytes:
+    """
+    JSON body of the payload `key` of the snapshot, encoded as JSONResponse
+    does. `build` is called once per snapshot and key.
+    """
+    bodies = _bodies.get(snapshot)
+    body = bodies.get(key) if bodies is not None else None
+
+    if body is None:
+        body = JSONResponse(build()).body
+        with _lock:
+            _bodies.setdefault(snapshot, {})[key] = body
+
+    return body
@@ -0,0 +1,133 @@
+"""
+Bounded thread pool for bcrypt password hashing and verification.
+
+bcrypt releases the GIL while hashing, so threads run it in parallel
+and the event loop keeps serving other requests. At most
+`workers + max_queue` calls are in flight: further ones are rejected
+at once instead of piling up behind a login burst.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+import bcrypt
+
+from app.core.config import get_settings
+from app.exceptions.auth import PasswordPoolBusyException
+
+settings = get_settings()
+
+LATENCY_WINDOW = 1024  # Recent calls used for the latency percentiles
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def hash_chunk(passwords: list[str]) -> list[str]:
+    return [
+        bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+        for password in passwords
+    ]
+
+
+class PasswordPool:
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_pending = workers + max_queue
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="password"
+        )
+        self._pending = 0  # Queued and running calls
+        self._lock = threading.Lock()
+        self._waits: deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._runs: deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.completed = 0
+        self.rejected = 0
+
+    async def run(self, func: Callable, *args):
+        """Runs func(*args) in the pool, or raises PasswordPoolBusyException."""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise PasswordPoolBusyException()
+            self._pending += 1
+
+        future = self._executor.submit(self._call, time.perf_counter(), func, args)
+        # Released when the call is over, even if the request was cancelled
+        future.add_done_callback(self._release)
+
+        return await asyncio.wrap_future(future)
+
+    def _call(self, submitted: float, func: Callable, args: tuple):
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self._waits.append(started - submitted)
+                self._runs.append(time.perf_counter() - started)
+
+    def _release(self, future):
+        with self._lock:
+            self._pending -= 1
+            self.completed += 1
+
+    async def hash(self, password: str) -> str:
+        hashed = await self.run(
+            bcrypt.hashpw, password.encode("utf-8"), bcrypt.gensalt()
+        )
+        return hashed.decode("utf-8")
+
+    async def hash_many(self, passwords: list[str]) -> list[str]:
+        """Hashes of the passwords, in order: a contiguous chunk per worker."""
+        size = max(1, -(-len(passwords) // self.workers))
+        chunks = [passwords[i : i + size] for i in range(0, len(passwords), size)]
+
+        hashed = await asyncio.gather(
+            *(self.run(hash_chunk, chunk) for chunk in chunks)
+        )
+        return [value for chunk in hashed for value in chunk]
+
+    async def check(self, password: str, hashed: str) -> bool:
+        return await self.run(
+            bcrypt.checkpw, password.encode("utf-8"), hashed.encode("utf-8")
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            waits, runs = list(self._waits), list(self._runs)
+            pending = self._pending
+
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": pending,
+            "queued": max(0, pending - self.workers),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "wait_p50_ms": round(percentile(waits, 0.5) * 1000, 3),
+            "wait_p99_ms": round(percentile(waits, 0.99) * 1000, 3),
+            "run_p50_ms": round(percentile(runs, 0.5) * 1000, 3),
+            "run_p99_ms": round(percentile(runs, 0.99) * 1000, 3),
+        }
+
+
+password_pool = PasswordPool(
+    workers=settings.PASSWORD_POOL_WORKERS,
+    max_queue=settings.PASSWORD_POOL_QUEUE,
+)
+
+# Bulk imports: all cores, one import at a time (no queue)
+import_pool = PasswordPool(
+    workers=settings.PASSWORD_IMPORT_WORKERS or os.cpu_count() or 1,
+    max_queue=0,
+)
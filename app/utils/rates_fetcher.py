@@ -0,0 +1,156 @@
+"""
+Fetching the current rates from the external API.
+
+Requests go through a shared httpx.AsyncClient (connection reuse) and
+carry If-Modified-Since with the time of the stored rates. Timeouts,
+connection errors, 429 and 5xx responses are retried with jittered
+exponential backoff; bodies are size-limited and validated before they
+are stored, and rates with an unchanged `updated` are not written again.
+
+Used by the Celery task and, with RATES_SCHEDULER_ENABLED, by an asyncio
+task of the API process (no beat/worker needed).
+"""
+
+import asyncio
+import random
+from email.utils import formatdate
+
+import httpx
+from loguru import logger
+from pydantic import BaseModel, ValidationError
+
+from app.core.config import get_settings
+from app.utils.actual_rates import get_rates_snapshot
+from app.utils.rates_storage import save_rates
+
+settings = get_settings()
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class RatesFetchError(Exception):
+    """The external API gave no usable rates."""
+
+
+class RatesPayload(BaseModel):
+    """The fields of an external API response the service relies on."""
+
+    valid: bool
+    updated: int
+    base: str
+    rates: dict[str, float]
+
+
+async def read_limited(response: httpx.Response, max_bytes: int) -> bytes:
+    """Body of a streamed response, at most max_bytes."""
+    length = response.headers.get("content-length")
+    if length is not None and length.isdigit() and int(length) > max_bytes:
+        raise RatesFetchError(f"Response too large: {length} bytes")
+
+    body = bytearray()
+    async for chunk in response.aiter_bytes():
+        body += chunk
+        if len(body) > max_bytes:
+            raise RatesFetchError(f"Response larger than {max_bytes} bytes")
+
+    return bytes(body)
+
+
+def parse_payload(body: bytes) -> dict:
+    try:
+        payload = RatesPayload.model_validate_json(body)
+    except ValidationError as e:
+        raise RatesFetchError(f"Invalid rates response: {e.error_count()} errors")
+
+    if not payload.valid or not payload.rates:
+        raise RatesFetchError("The external API reported invalid rates")
+
+    return payload.model_dump()
+
+
+async def fetch_rates(
+    client: httpx.AsyncClient, since: int | None = None
+) -> dict | None:
+    """
+    Validated rates payload, or None if the API answered 304 Not Modified
+    for rates updated at `since` (Unix time). Raises RatesFetchError once
+    the retries are exhausted or on a non-retryable failure.
+    """
+    params = {"key": settings.API_KEY, "base": "USD", "output": "JSON"}
+    headers = {}
+    if since is not None:
+        headers["If-Modified-Since"] = formatdate(since, usegmt=True)
+
+    attempts = settings.EXTERNAL_API_RETRIES + 1
+
+    for attempt in range(attempts):
+        if attempt:
+            # Full jitter: workers retrying together do not hit the API together
+            delay = settings.EXTERNAL_API_BACKOFF * 2 ** (attempt - 1)
+            await asyncio.sleep(random.uniform(0, delay))
+
+        try:
+            async with client.stream(
+                "GET",
+                settings.EXTERNAL_API_URL,
+                params=params,
+                headers=headers,
+                timeout=settings.EXTERNAL_API_TIMEOUT,
+            ) as response:
+                if response.status_code == 304:
+                    return None
+
+                if response.status_code in RETRY_STATUSES:
+                    error = f"status code {response.status_code}"
+                elif response.status_code != 200:
+                    raise RatesFetchError(
+                        f"Request failed with status code: {response.status_code}"
+                    )
+                else:
+                    body = await read_limited(response, settings.EXTERNAL_API_MAX_BYTES)
+                    return parse_payload(body)
+        except httpx.TransportError as e:  # Timeouts and connection errors
+            error = repr(e)
+
+        logger.warning(
+            f"Rates request attempt {attempt + 1}/{attempts} failed: {error}"
+        )
+
+    raise RatesFetchError(f"Rates request failed after {attempts} attempts: {error}")
+
+
+async def update_rates(client: httpx.AsyncClient) -> bool:
+    """
+    Fetches and stores new rates. False if the stored ones are current
+    (304, or the same `updated`) or if the fetch failed.
+    """
+    snapshot = get_rates_snapshot()
+    since = snapshot.updated if snapshot is not None else None
+
+    try:
+        payload = await fetch_rates(client, since)
+    except RatesFetchError as e:
+        logger.error(str(e))
+        return False
+
+    if payload is None or payload["updated"] == since:
+        logger.info("Rates are up to date")
+        return False
+
+    # File writes and the cross-rate matrix: off the event loop
+    await asyncio.to_thread(save_rates, payload)
+    logger.info(f"Rates updated: {payload['updated']}")
+    return True
+
+
+async def run_scheduler(client: httpx.AsyncClient, interval: float):
+    """Updates the rates now and then every `interval` seconds, until cancelled."""
+    while True:
+        try:
+            await update_rates(client)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Scheduled rates update failed: {e}")
+
+        await asyncio.sleep(interval)
@@ -0,0 +1,135 @@
+"""
+Compact binary rates snapshot format.
+
+Layout (little-endian):
+    header | magic 4s | format u16 | flags u16 | count u32 | updated i64 |
+           | base 8s | crc32 u32 (of the body)
+    body   | count x CODE_SIZE bytes: sorted ASCII codes, NUL-padded
+           | count x float64: rates in the order of the codes
+
+The JSON layout of the external API (valid/updated/base/rates) can be
+converted in both directions:
+    python -m app.utils.rates_format from-json rates.json rates.bin
+    python -m app.utils.rates_format to-json rates.bin rates.json
+"""
+
+import argparse
+import json
+import os
+import struct
+import zlib
+from pathlib import Path
+
+MAGIC = b"CCRB"
+FORMAT_VERSION = 1
+CODE_SIZE = 8
+
+FLAG_VALID = 0x1
+
+HEADER = struct.Struct("<4sHHIq8sI")
+
+
+class RatesFormatError(ValueError):
+    pass
+
+
+def dumps(payload: dict) -> bytes:
+    """Encodes a payload in the external API layout."""
+    rates = payload["rates"]
+    codes = sorted(rates)
+
+    for code in codes:
+        if not (code.isascii() and code.isalnum() and len(code) <= CODE_SIZE):
+            raise RatesFormatError(f"Invalid currency code for the snapshot: {code}")
+
+    count = len(codes)
+    body = b"".join(code.encode("ascii").ljust(CODE_SIZE, b"\x00") for code in codes)
+    body += struct.pack(f"<{count}d", *(rates[code] for code in codes))
+
+    header = HEADER.pack(
+        MAGIC,
+        FORMAT_VERSION,
+        FLAG_VALID if payload.get("valid", True) else 0,
+        count,
+        payload["updated"],
+        payload.get("base", "USD").encode("ascii"),
+        zlib.crc32(body),
+    )
+
+    return header + body
+
+
+def loads(data: bytes) -> dict:
+    """Decodes a snapshot into the external API layout."""
+    if len(data) < HEADER.size:
+        raise RatesFormatError("Truncated rates snapshot header")
+
+    magic, format_version, flags, count, updated, base, crc32 = HEADER.unpack_from(data)
+
+    if magic != MAGIC:
+        raise RatesFormatError("Not a rates snapshot")
+    if format_version != FORMAT_VERSION:
+        raise RatesFormatError(f"Unsupported snapshot format {format_version}")
+
+    body = memoryview(data)[HEADER.size :]
+
+    if len(body) != count * (CODE_SIZE + 8):
+        raise RatesFormatError("Truncated rates snapshot body")
+    if zlib.crc32(body) != crc32:
+        raise RatesFormatError("Rates snapshot checksum mismatch")
+
+    # Codes are alphanumeric, so NUL padding can be split away
+    codes_table = body[: count * CODE_SIZE].tobytes().decode("ascii")
+    codes = codes_table.replace("\x00", " ").split()
+    values = struct.unpack_from(f"<{count}d", body, count * CODE_SIZE)
+
+    return {
+        "valid": bool(flags & FLAG_VALID),
+        "updated": updated,
+        "base": base.rstrip(b"\x00").decode("ascii"),
+        "rates": dict(zip(codes, values)),
+    }
+
+
+def dump(payload: dict, path: Path):
+    """Writes a snapshot file, replacing the previous one atomically."""
+    tmp_path = path.with_name(f".{path.name}.tmp")
+
+    with open(tmp_path, "wb") as f:
+        f.write(dumps(payload))
+
+    os.replace(tmp_path, path)
+
+
+def load(path: Path) -> dict:
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(
+        prog="python -m app.utils.rates_format",
+        description="Convert rates snapshots between JSON and the binary format.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    for command, help_text in (
+        ("from-json", "JSON (valid/updated/base/rates) -> binary snapshot"),
+        ("to-json", "binary snapshot -> JSON (valid/updated/base/rates)"),
+    ):
+        subparser = subparsers.add_parser(command, help=help_text)
+        subparser.add_argument("source", type=Path)
+        subparser.add_argument("target", type=Path)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "from-json":
+        with open(args.source, "r", encoding="utf-8") as f:
+            dump(json.load(f), args.target)
+    else:
+        with open(args.target, "w", encoding="utf-8") as f:
+            json.dump(load(args.source), f, indent=4, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
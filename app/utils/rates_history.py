@@ -0,0 +1,180 @@
+"""
+Append-only columnar history of fetched rates.
+
+Directory layout:
+    codes.json          | append-only list of currency codes (column order)
+    chunks.bin          | int64 first timestamp of every chunk
+    chunk_NNNNNN.ts     | int64 timestamps, one per snapshot (sorted)
+    chunk_NNNNNN.rates  | float64 rows of `width` rates, one per snapshot
+    chunk_NNNNNN.json   | {"width": number of code columns in this chunk}
+
+A point-in-time lookup bisects chunks.bin, then the timestamps of a single
+chunk, and reads one row through a memory map: the rest of the history
+is never loaded.
+"""
+
+import fcntl
+import json
+import os
+import threading
+from bisect import bisect_right
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+from app.utils.actual_rates import RatesSnapshot
+
+CHUNK_SIZE = 1024  # Snapshots per chunk
+
+current_path = Path(__file__).parent
+history_path = current_path / ".." / "json" / "history"
+
+
+class RatesHistory:
+    def __init__(self, path: Path = history_path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._codes: list[str] = []
+
+    # Files
+    def _chunk_file(self, chunk: int, suffix: str) -> Path:
+        return self.path / f"chunk_{chunk:06d}.{suffix}"
+
+    def _read_codes(self) -> list[str]:
+        try:
+            with open(self.path / "codes.json", "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+
+    def _chunk_starts(self) -> np.ndarray:
+        try:
+            return np.fromfile(self.path / "chunks.bin", dtype="<i8")
+        except FileNotFoundError:
+            return np.empty(0, dtype="<i8")
+
+    def _chunk_width(self, chunk: int) -> int:
+        with open(self._chunk_file(chunk, "json"), "r", encoding="utf-8") as f:
+            return json.load(f)["width"]
+
+    # Writing
+    def append(self, snapshot: RatesSnapshot) -> bool:
+        """
+        Appends a snapshot. Snapshots not newer than the last stored one
+        are skipped, so timestamps stay sorted. Returns True if appended.
+        """
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        with open(self.path / ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+
+            starts = self._chunk_starts()
+            chunk = len(starts) - 1
+            rows, width = 0, 0
+
+            if chunk >= 0:
+                timestamps = np.fromfile(self._chunk_file(chunk, "ts"), dtype="<i8")
+                rows, width = len(timestamps), self._chunk_width(chunk)
+
+                if rows and snapshot.updated <= timestamps[-1]:
+                    return False
+
+            codes = self._read_codes()
+            known_codes = set(codes)
+            new_codes = [code for code in snapshot.codes if code not in known_codes]
+            if new_codes:
+                codes += new_codes
+                tmp_codes = self.path / ".codes.json.tmp"
+                with open(tmp_codes, "w", encoding="utf-8") as f:
+                    json.dump(codes, f)
+                os.replace(tmp_codes, self.path / "codes.json")
+
+            # A full chunk or a wider code table starts a new chunk
+            new_chunk = chunk < 0 or rows >= CHUNK_SIZE or len(codes) > width
+            if new_chunk:
+                chunk += 1
+                width = len(codes)
+                with open(self._chunk_file(chunk, "json"), "w", encoding="utf-8") as f:
+                    json.dump({"width": width}, f)
+
+            row = np.full(width, np.nan, dtype="<f8")
+            columns = {code: i for i, code in enumerate(codes)}
+            for code, rate in snapshot.rates.items():
+                row[columns[code]] = rate
+
+            # The row goes first: the timestamps file defines the row count.
+            # A new chunk is registered in chunks.bin only once it has a row,
+            # leftovers of an interrupted append are overwritten ("wb").
+            mode = "wb" if new_chunk else "ab"
+            with open(self._chunk_file(chunk, "rates"), mode) as f:
+                f.write(row.tobytes())
+            with open(self._chunk_file(chunk, "ts"), mode) as f:
+                f.write(np.array([snapshot.updated], dtype="<i8").tobytes())
+
+            if new_chunk:
+                with open(self.path / "chunks.bin", "ab") as f:
+                    f.write(np.array([snapshot.updated], dtype="<i8").tobytes())
+
+        return True
+
+    # Reading
+    def locate(self, timestamp: int) -> tuple[int, int] | None:
+        """(chunk, row) of the last snapshot taken at or before the timestamp."""
+        starts = self._chunk_starts()
+        chunk = bisect_right(starts, timestamp) - 1
+
+        if chunk < 0:
+            return None
+
+        timestamps = np.memmap(self._chunk_file(chunk, "ts"), dtype="<i8", mode="r")
+        row = int(np.searchsorted(timestamps, timestamp, side="right")) - 1
+
+        if row < 0:
+            return None
+
+        return chunk, row
+
+    def at(self, timestamp: int) -> RatesSnapshot | None:
+        """Rates in effect at the timestamp (None if nothing was stored before)."""
+        location = self.locate(timestamp)
+
+        if location is None:
+            return None
+
+        return self._snapshot(*location)
+
+    @lru_cache(maxsize=64)
+    def _snapshot(self, chunk: int, row: int) -> RatesSnapshot:
+        width = self._chunk_width(chunk)
+
+        if len(self._codes) < width:
+            with self._lock:
+                self._codes = self._read_codes()
+
+        timestamps = np.memmap(self._chunk_file(chunk, "ts"), dtype="<i8", mode="r")
+        rates = np.memmap(
+            self._chunk_file(chunk, "rates"),
+            dtype="<f8",
+            mode="r",
+            offset=row * width * 8,
+            shape=(width,),
+        )
+
+        return RatesSnapshot.from_payload(
+            {
+                "updated": int(timestamps[row]),
+                "rates": {
+                    code: rate
+                    for code, rate in zip(self._codes[:width], rates.tolist())
+                    if rate == rate  # NaN: currency missing in this snapshot
+                },
+            }
+        )
+
+
+rates_history = RatesHistory()
+
+
+def get_history_snapshot(timestamp: int) -> RatesSnapshot | None:
+    return rates_history.at(timestamp)
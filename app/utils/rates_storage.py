@@ -0,0 +1,56 @@
+import json
+import os
+
+import redis
+from loguru import logger
+
+from app.core.config import get_settings
+from app.utils import rates_format
+from app.utils.actual_rates import RatesSnapshot, rates_file_path
+from app.utils.cross_rates import CrossRates
+from app.utils.rates_history import rates_history
+from app.utils.shared_rates import SharedRatesWriter
+
+settings = get_settings()
+
+
+def save_rates(payload: dict):
+    """
+    Stores a fresh external API response: the rates file (JSON or binary),
+    the cross-rate matrix, the shared memory segment of the API workers
+    and the rates history, then announces the new version to the workers.
+    """
+    path = rates_file_path()
+
+    if settings.RATES_STORAGE_FORMAT == "binary":
+        rates_format.dump(payload, path)
+    else:
+        # Readers see either the previous file or the complete new one
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=4, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    snapshot = RatesSnapshot.from_payload(payload)
+    CrossRates.from_snapshot(snapshot).save()
+
+    if settings.RATES_SHARED_SEGMENT:
+        SharedRatesWriter().publish(snapshot.updated, snapshot.codes, snapshot.values)
+
+    if settings.RATES_HISTORY_ENABLED:
+        rates_history.append(snapshot)
+
+    if settings.RATES_UPDATES_CHANNEL is not None:
+        publish_rates_update(settings.RATES_UPDATES_CHANNEL, snapshot)
+
+
+def publish_rates_update(channel: str, snapshot: RatesSnapshot):
+    """Announces a stored rates version to the subscribed API workers."""
+    message = json.dumps({"version": snapshot.version, "updated": snapshot.updated})
+
+    try:
+        with redis.Redis.from_url(settings.REDIS_URL) as client:
+            client.publish(channel, message)
+    except Exception as e:
+        # Subscribed workers keep the previous rates until the next update
+        logger.error(f"Failed to publish rates update: {e}")
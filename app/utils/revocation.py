@@ -0,0 +1,128 @@
+"""
+Storage of revoked refresh tokens (REVOCATION_BACKEND).
+
+- "sql": rows of the revoked_tokens table, inserted with
+  `ON CONFLICT (jti) DO NOTHING RETURNING id` so concurrent revocations of
+  one token are decided by the unique jti in one round trip; expired rows
+  are deleted by the cleanup_expired_tokens task.
+- "redis": one `SET <prefix><jti> <exp> NX EX <remaining lifetime>` key per
+  token, dropped by Redis itself once the token has expired.
+
+Both are behind the in-process index of app.utils.revoked_tokens, which
+answers most checks without a round trip.
+"""
+
+import datetime
+import math
+import time
+from abc import ABC, abstractmethod
+from typing import AsyncIterator
+
+import redis.asyncio as redis
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.database.models import RevokedToken
+
+settings = get_settings()
+
+SCAN_COUNT = 1_000  # Keys per SCAN / MGET round trip when loading
+
+
+class RevocationBackend(ABC):
+    @abstractmethod
+    async def revoke(self, jti: str, expires_at: float, session: AsyncSession) -> bool:
+        """
+        Revokes the token until its expiration timestamp.
+        False if it was already revoked (by this or another worker).
+        """
+
+    @abstractmethod
+    def revoked(self, session: AsyncSession) -> AsyncIterator[tuple[str, float]]:
+        """(jti, expiration timestamp) of revoked tokens that have not expired."""
+
+
+class SQLRevocationBackend(RevocationBackend):
+    """Rows of revoked_tokens, committed by the caller with its transaction."""
+
+    async def revoke(self, jti: str, expires_at: float, session: AsyncSession) -> bool:
+        # One statement: a concurrent insert of the same jti waits for the
+        # other transaction and then inserts nothing (no exception, no rollback)
+        query = (
+            insert(RevokedToken)
+            .values(
+                jti=jti,
+                expires_at=datetime.datetime.fromtimestamp(expires_at, tz=datetime.UTC),
+            )
+            .on_conflict_do_nothing(index_elements=[RevokedToken.jti])
+            .returning(RevokedToken.id)
+        )
+
+        return (await session.execute(query)).scalar() is not None
+
+    async def revoked(self, session: AsyncSession) -> AsyncIterator[tuple[str, float]]:
+        now = datetime.datetime.now(datetime.UTC)
+        query = (
+            select(RevokedToken.jti, RevokedToken.expires_at)
+            .where(RevokedToken.expires_at > now)
+            .execution_options(yield_per=10_000)
+        )
+
+        async for jti, expires_at in await session.stream(query):
+            yield jti, expires_at.timestamp()
+
+
+class RedisRevocationBackend(RevocationBackend):
+    """Keys with the token's remaining lifetime as TTL: no cleanup needed."""
+
+    def __init__(self, client: redis.Redis, prefix: str):
+        self.client = client
+        self.prefix = prefix
+
+    async def revoke(self, jti: str, expires_at: float, session: AsyncSession) -> bool:
+        ttl = max(1, math.ceil(expires_at - time.time()))
+        created = await self.client.set(
+            self.prefix + jti, repr(expires_at), nx=True, ex=ttl
+        )
+        return bool(created)
+
+    async def revoked(self, session: AsyncSession) -> AsyncIterator[tuple[str, float]]:
+        keys = []
+
+        async for key in self.client.scan_iter(
+            match=f"{self.prefix}*", count=SCAN_COUNT
+        ):
+            keys.append(key)
+
+            if len(keys) >= SCAN_COUNT:
+                async for token in self._load(keys):
+                    yield token
+                keys = []
+
+        async for token in self._load(keys):
+            yield token
+
+    async def _load(self, keys: list) -> AsyncIterator[tuple[str, float]]:
+        if not keys:
+            return
+
+        prefix = len(self.prefix)
+
+        # Keys expired since the SCAN come back as None
+        for key, value in zip(keys, await self.client.mget(keys)):
+            if value is not None:
+                key = key.decode("utf-8") if isinstance(key, bytes) else key
+                yield key[prefix:], float(value)
+
+
+def get_revocation_backend() -> RevocationBackend:
+    if settings.REVOCATION_BACKEND == "redis":
+        return RedisRevocationBackend(
+            redis.from_url(settings.REDIS_URL), settings.REVOCATION_REDIS_PREFIX
+        )
+    return SQLRevocationBackend()
+
+
+revocation_backend = get_revocation_backend()
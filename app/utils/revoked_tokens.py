@@ -0,0 +1,146 @@
+"""
+In-process index of revoked, not yet expired refresh token JTIs.
+
+A Bloom filter answers "definitely not revoked" without touching the exact
+set; positives are confirmed by the set. Entries are dropped once their
+token expires (an expired token is rejected by its signature check anyway)
+and the filter is rebuilt when enough of them are gone.
+
+The index only knows revocations made by this worker and those loaded at
+startup: the unique jti constraint of revoked_tokens stays the final check.
+"""
+
+import hashlib
+import heapq
+import math
+import threading
+import time
+from typing import Iterable
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        # Double hashing: h1 + i * h2 for the i-th hash function
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        bits = self._bits
+        return all(
+            bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(key)
+        )
+
+
+class RevokedTokenIndex:
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._filter = BloomFilter(capacity, error_rate)
+        self._expires: dict[str, float] = {}  # {jti: expiration timestamp}
+        self._heap: list[tuple[float, str]] = []  # (expiration, jti)
+        self._added = 0  # Keys in the filter, including pruned ones
+        self._lock = threading.Lock()
+        self.filter_negatives = 0
+        self.false_positives = 0
+
+    def add(self, jti: str, expires_at: float):
+        with self._lock:
+            self._prune(time.time())
+
+            if jti in self._expires:
+                return
+
+            self._expires[jti] = expires_at
+            heapq.heappush(self._heap, (expires_at, jti))
+
+            if self._added >= self._filter.capacity:
+                self._rebuild()
+            else:
+                self._filter.add(jti)
+                self._added += 1
+
+    def load(self, tokens: Iterable[tuple[str, float]]):
+        """Adds (jti, expiration timestamp) pairs, e.g. from the table at startup."""
+        for jti, expires_at in tokens:
+            self.add(jti, expires_at)
+
+    def is_revoked(self, jti: str) -> bool:
+        """
+        True if this worker knows the token as revoked. False needs
+        no lookup when the filter rules the token out.
+        """
+        if jti not in self._filter:
+            self.filter_negatives += 1
+            return False
+
+        with self._lock:
+            expires_at = self._expires.get(jti)
+
+        if expires_at is None:
+            self.false_positives += 1
+            return False
+
+        return expires_at > time.time()
+
+    def _prune(self, now: float):
+        heap = self._heap
+        pruned = 0
+
+        while heap and heap[0][0] <= now:
+            _, jti = heapq.heappop(heap)
+            del self._expires[jti]
+            pruned += 1
+
+        # Bits of pruned keys stay set: rebuild once they are the majority
+        if pruned and self._added > 2 * len(self._expires) + 1024:
+            self._rebuild()
+
+    def _rebuild(self):
+        capacity = max(self.capacity, 2 * len(self._expires))
+        self._filter = BloomFilter(capacity, self.error_rate)
+
+        for jti in self._expires:
+            self._filter.add(jti)
+        self._added = len(self._expires)
+
+    def clear(self):
+        with self._lock:
+            self._filter = BloomFilter(self.capacity, self.error_rate)
+            self._expires.clear()
+            self._heap.clear()
+            self._added = 0
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._expires),
+            "filter_capacity": self._filter.capacity,
+            "filter_negatives": self.filter_negatives,
+            "false_positives": self.false_positives,
+        }
+
+
+revoked_tokens = RevokedTokenIndex(
+    capacity=settings.REVOKED_TOKENS_FILTER_CAPACITY,
+    error_rate=settings.REVOKED_TOKENS_FILTER_ERROR_RATE,
+)
@@ -0,0 +1,203 @@
+"""
+Fixed-layout memory-mapped rates segment shared by the Celery writer
+and every API worker on the host.
+
+Layout (little-endian):
+    header  | magic 8s | layout u32 | capacity u32 | seq u64 | updated i64 |
+            | count u32 | reserved (up to HEADER_SIZE bytes)
+    codes   | capacity x CODE_SIZE bytes, ASCII, NUL-padded
+    values  | capacity x float64
+
+Publication uses a seqlock: the writer makes `seq` odd, writes the body and
+makes it even again. Readers copy the body between two reads of `seq` and
+keep their previous copy if a write was in progress, so they never block
+and never see torn data. The body is copied only when `seq` changes.
+
+If the segment file is deleted and recreated (redeploy, cleanup), readers
+notice the new inode on their next version miss or inode check (at most
+every INODE_CHECK_INTERVAL seconds) and map the new file.
+"""
+
+import fcntl
+import mmap
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+from loguru import logger
+
+MAGIC = b"CCRATES\x00"
+LAYOUT_VERSION = 1
+CAPACITY = 512  # Maximum number of currencies
+CODE_SIZE = 8  # Bytes per currency code
+
+HEADER = struct.Struct("<8sIIQqI")
+HEADER_SIZE = 64
+SEQ = struct.Struct("<Q")
+SEQ_OFFSET = 16
+CODES_OFFSET = HEADER_SIZE
+VALUES_OFFSET = CODES_OFFSET + CAPACITY * CODE_SIZE
+SEGMENT_SIZE = VALUES_OFFSET + CAPACITY * 8
+
+READ_ATTEMPTS = 3
+INODE_CHECK_INTERVAL = 1.0  # Seconds between checks for a recreated segment file
+
+current_path = Path(__file__).parent
+segment_path = current_path / ".." / "json" / "rates.shm"
+
+
+class SharedRates(NamedTuple):
+    seq: int  # Publication counter, changes with every write
+    updated: int
+    codes: tuple[str, ...]
+    values: np.ndarray  # Private read-only copy
+
+
+class SharedRatesWriter:
+    """Publishes rates into the segment (one writer at a time, via flock)."""
+
+    def __init__(self, path: Path = segment_path):
+        self.path = path
+
+    def publish(self, updated: int, codes: tuple[str, ...], values: np.ndarray):
+        count = len(codes)
+        if count > CAPACITY:
+            raise ValueError(f"Too many currencies for the segment: {count}")
+
+        codes_table = b"".join(
+            code.encode("ascii").ljust(CODE_SIZE, b"\x00")[:CODE_SIZE] for code in codes
+        )
+        values_table = np.ascontiguousarray(values, dtype="<f8").tobytes()
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            if os.fstat(fd).st_size < SEGMENT_SIZE:
+                os.ftruncate(fd, SEGMENT_SIZE)
+
+            with mmap.mmap(fd, SEGMENT_SIZE) as mm:
+                magic, _, _, seq, _, _ = HEADER.unpack_from(mm, 0)
+                if magic != MAGIC:
+                    seq = 0
+                # An interrupted write leaves seq odd: start the next one from even
+                seq += seq % 2
+
+                SEQ.pack_into(mm, SEQ_OFFSET, seq + 1)  # Write in progress
+                mm[CODES_OFFSET : CODES_OFFSET + len(codes_table)] = codes_table
+                mm[VALUES_OFFSET : VALUES_OFFSET + len(values_table)] = values_table
+                HEADER.pack_into(
+                    mm, 0, MAGIC, LAYOUT_VERSION, CAPACITY, seq + 1, updated, count
+                )
+                SEQ.pack_into(mm, SEQ_OFFSET, seq + 2)  # Published
+        finally:
+            os.close(fd)
+
+
+class SharedRatesReader:
+    """
+    Lock-free reader of the segment. Returns the same SharedRates object
+    until the writer publishes a new version.
+    """
+
+    def __init__(self, path: Path = segment_path):
+        self.path = path
+        self._mm: mmap.mmap | None = None
+        self._inode: int | None = None  # Inode of the mapped file
+        self._next_check = 0.0  # time.monotonic() of the next inode check
+        self._current: SharedRates | None = None
+        self._lock = threading.Lock()
+
+    def _map(self) -> mmap.mmap | None:
+        if self._mm is None:
+            try:
+                with open(self.path, "rb") as f:
+                    stat = os.fstat(f.fileno())
+                    if stat.st_size < SEGMENT_SIZE:
+                        return None
+                    self._mm = mmap.mmap(
+                        f.fileno(), SEGMENT_SIZE, access=mmap.ACCESS_READ
+                    )
+                    self._inode = stat.st_ino
+            except FileNotFoundError:
+                return None
+        return self._mm
+
+    def _remap_if_replaced(self) -> mmap.mmap | None:
+        """Maps the file again if it was recreated (called under the lock)."""
+        self._next_check = time.monotonic() + INODE_CHECK_INTERVAL
+
+        try:
+            inode = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            return self._mm  # Deleted: keep the last published rates
+
+        if inode != self._inode:
+            # The old mapping is dropped, not closed: other threads may be
+            # reading it right now. Its sequence numbers mean nothing here.
+            self._mm = None
+            self._current = None
+            logger.info(f"Rates segment {self.path} was recreated, remapping")
+
+        return self._map()
+
+    def read(self) -> SharedRates | None:
+        mm = self._map()
+        if mm is None:
+            return None
+
+        seq = SEQ.unpack_from(mm, SEQ_OFFSET)[0]
+        current = self._current
+        if (
+            current is not None
+            and current.seq == seq
+            and time.monotonic() < self._next_check
+        ):
+            return current
+
+        with self._lock:
+            mm = self._remap_if_replaced()
+            if mm is None:
+                return self._current
+
+            current = self._current
+            if (
+                current is not None
+                and current.seq == SEQ.unpack_from(mm, SEQ_OFFSET)[0]
+            ):
+                return current
+
+            for _ in range(READ_ATTEMPTS):
+                seq = SEQ.unpack_from(mm, SEQ_OFFSET)[0]
+                if seq % 2:
+                    continue  # Write in progress
+
+                header = HEADER.unpack_from(mm, 0)
+                codes_table = mm[CODES_OFFSET:VALUES_OFFSET]
+                values_table = mm[VALUES_OFFSET:SEGMENT_SIZE]
+
+                if SEQ.unpack_from(mm, SEQ_OFFSET)[0] != seq:
+                    continue  # Overwritten while copying
+
+                magic, layout, capacity, _, updated, count = header
+                if magic != MAGIC or layout != LAYOUT_VERSION or capacity != CAPACITY:
+                    if magic.strip(b"\x00"):  # Not just a freshly created file
+                        logger.error(f"Unknown rates segment layout in {self.path}")
+                    return self._current
+
+                codes = tuple(
+                    codes_table[i * CODE_SIZE : (i + 1) * CODE_SIZE]
+                    .rstrip(b"\x00")
+                    .decode("ascii")
+                    for i in range(count)
+                )
+                values = np.frombuffer(values_table, dtype="<f8", count=count).copy()
+                values.flags.writeable = False
+
+                self._current = SharedRates(seq, updated, codes, values)
+                break
+
+        return self._current
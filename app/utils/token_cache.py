@@ -0,0 +1,97 @@
+"""
+Cache of verified JWT payloads.
+
+Clients send the same access token with every request for its whole
+lifetime, so the HMAC check and JSON parsing are done once per token:
+entries are keyed by the signature segment, bounded in size (LRU) and
+dropped at the token's `exp`. A hit also compares the whole token, so
+a known signature with another header or payload is verified as usual.
+
+Revocation checks run after decoding and are not affected by the cache;
+UserCache.discard() additionally drops the payloads of a changed user.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+class TokenCache:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        # {signature: (token, exp, payload)}
+        self._entries: OrderedDict[str, tuple[str, float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> dict | None:
+        """Payload of a token verified before and not expired yet."""
+        signature = token.rpartition(".")[2]
+
+        with self._lock:
+            entry = self._entries.get(signature)
+
+            if entry is None or entry[0] != token:
+                self.misses += 1
+                return None
+
+            if entry[1] <= time.time():
+                # Decoded again, to raise the expiration error
+                del self._entries[signature]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(signature)
+            self.hits += 1
+
+        return dict(entry[2])
+
+    def set(self, token: str, payload: dict):
+        """Stores a verified payload until its exp (tokens without exp are skipped)."""
+        exp = payload.get("exp")
+
+        if self.maxsize <= 0 or not isinstance(exp, (int, float)):
+            return
+
+        signature = token.rpartition(".")[2]
+
+        with self._lock:
+            self._entries[signature] = (token, exp, dict(payload))
+            self._entries.move_to_end(signature)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard_subject(self, sub: str):
+        """Drops the payloads of every token of the subject (revocation hook)."""
+        with self._lock:
+            signatures = [
+                signature
+                for signature, (_, _, payload) in self._entries.items()
+                if payload.get("sub") == sub
+            ]
+            for signature in signatures:
+                del self._entries[signature]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._entries)
+
+        return {
+            "size": size,
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+decoded_tokens = TokenCache(maxsize=settings.JWT_CACHE_SIZE)
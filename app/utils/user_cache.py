@@ -0,0 +1,237 @@
+"""
+Cache of authenticated users in front of the users table.
+
+Entries are keyed by the token subject (username), bounded in size (LRU)
+and in age (TTL). Unknown usernames are cached too, for a shorter time.
+Changes to a user invalidate its entry explicitly; with
+USER_CACHE_INVALIDATION_CHANNEL set, invalidations are also published
+through Redis so every worker drops the entry; a publish that keeps
+failing is reported to the caller rather than left to the TTL.
+
+The cache also knows the minimal accepted token version of users whose
+access tokens were invalidated (see ACCESS_TOKEN_CLAIMS).
+"""
+
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+import redis.asyncio as redis
+from loguru import logger
+
+from app.core.config import get_settings
+from app.database.models import User
+from app.exceptions.users import CacheInvalidationException
+from app.utils.token_cache import decoded_tokens
+
+settings = get_settings()
+
+REVOKED = 2**62  # Token version of deleted users: no token is accepted
+RECONNECT_DELAY = 1.0  # Seconds before the channel is subscribed again
+
+
+@dataclass(frozen=True)
+class AuthenticatedUser:
+    """Immutable copy of the user row fields needed by protected endpoints."""
+
+    id: int
+    username: str
+    is_admin: bool
+
+    @classmethod
+    def from_model(cls, user: User) -> "AuthenticatedUser":
+        return cls(id=user.id, username=user.username, is_admin=user.is_admin)
+
+
+class UserCache:
+    def __init__(self, maxsize: int, ttl: float, negative_ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        # {username: (expires at (monotonic), user or None for unknown users)}
+        self._entries: OrderedDict[str, tuple[float, AuthenticatedUser | None]] = (
+            OrderedDict()
+        )
+        self._epoch = 0  # Incremented by every invalidation
+        # {user id: minimal accepted token version}, only for changed users
+        self._token_versions: dict[int, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+    @property
+    def epoch(self) -> int:
+        """Read before a database lookup, passed back to set()."""
+        return self._epoch
+
+    def get(self, username: str) -> tuple[bool, AuthenticatedUser | None]:
+        """(found, user): found with user None means a cached unknown user."""
+        with self._lock:
+            entry = self._entries.get(username)
+
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[username]
+                self.misses += 1
+                return False, None
+
+            self._entries.move_to_end(username)
+
+            if entry[1] is None:
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+
+            return True, entry[1]
+
+    def set(self, username: str, user: AuthenticatedUser | None, epoch: int):
+        """
+        Stores a lookup result. Skipped if an invalidation happened since
+        `epoch` was read: the result may predate it.
+        """
+        if self.maxsize <= 0:
+            return
+
+        ttl = self.ttl if user is not None else self.negative_ttl
+
+        with self._lock:
+            if epoch != self._epoch:
+                return
+
+            self._entries[username] = (time.monotonic() + ttl, user)
+            self._entries.move_to_end(username)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(
+        self,
+        username: str,
+        user_id: int | None = None,
+        token_version: int | None = None,
+    ):
+        """Drops the entry (and older access tokens) in this process only."""
+        decoded_tokens.discard_subject(username)
+
+        with self._lock:
+            self._epoch += 1
+            self._entries.pop(username, None)
+
+            if user_id is not None and token_version is not None:
+                current = self._token_versions.get(user_id, 0)
+                self._token_versions[user_id] = max(current, token_version)
+
+    def token_version_ok(self, user_id: int, token_version: int) -> bool:
+        """False for access tokens issued before the user was changed."""
+        return token_version >= self._token_versions.get(user_id, 0)
+
+    def load_token_versions(self, versions: dict[int, int]):
+        """Token versions of changed users, read from the database."""
+        with self._lock:
+            for user_id, token_version in versions.items():
+                current = self._token_versions.get(user_id, 0)
+                self._token_versions[user_id] = max(current, token_version)
+
+    def clear(self, token_versions: bool = False):
+        """Drops all entries (token versions too only if asked)."""
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+
+            if token_versions:
+                self._token_versions.clear()
+
+    async def invalidate(
+        self,
+        username: str,
+        user_id: int | None = None,
+        token_version: int | None = None,
+    ):
+        """
+        Drops the entry here and, if configured, in every other worker.
+        With a token version, access tokens of older versions are rejected.
+        """
+        self.discard(username, user_id, token_version)
+
+        channel = settings.USER_CACHE_INVALIDATION_CHANNEL
+        if channel is None:
+            return
+
+        message = json.dumps(
+            {"username": username, "user_id": user_id, "token_version": token_version}
+        )
+
+        attempts = settings.USER_CACHE_PUBLISH_RETRIES + 1
+
+        for attempt in range(attempts):
+            if attempt:
+                await asyncio.sleep(0.1 * 2 ** (attempt - 1))
+
+            try:
+                async with redis.from_url(settings.REDIS_URL) as client:
+                    await client.publish(channel, message)
+                return
+            except Exception as e:
+                logger.warning(
+                    f"User cache invalidation publish attempt "
+                    f"{attempt + 1}/{attempts} failed: {e}"
+                )
+
+        # Other workers would keep the user (and its old tokens) accepted
+        logger.error(f"Failed to publish user cache invalidation for {username}")
+        raise CacheInvalidationException()
+
+    async def listen(
+        self,
+        channel: str,
+        token_versions: Callable[[], Awaitable[dict[int, int]]] | None = None,
+    ):
+        """
+        Applies invalidations published by other workers until cancelled.
+        Messages may have been missed while disconnected, so after every
+        (re)subscription the cache is cleared and, if given, the token
+        versions are reloaded with `token_versions`.
+        """
+        while True:
+            try:
+                async with redis.from_url(settings.REDIS_URL) as client:
+                    async with client.pubsub() as pubsub:
+                        await pubsub.subscribe(channel)
+
+                        # Subscribed first: later changes arrive as messages
+                        if token_versions is not None:
+                            self.load_token_versions(await token_versions())
+                        self.clear()
+
+                        async for message in pubsub.listen():
+                            if message["type"] == "message":
+                                self.discard(**json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"User cache invalidation channel failed: {e}")
+                await asyncio.sleep(RECONNECT_DELAY)
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._entries)
+
+        return {
+            "size": size,
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+        }
+
+
+user_cache = UserCache(
+    maxsize=settings.USER_CACHE_SIZE,
+    ttl=settings.USER_CACHE_TTL,
+    negative_ttl=settings.USER_CACHE_NEGATIVE_TTL,
+)
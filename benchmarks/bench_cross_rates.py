@@ -0,0 +1,92 @@
+"""
+Cross-rate matrix vs dict lookups in the currency converter.
+
+Run from the project root:
+    python -m benchmarks.bench_cross_rates
+"""
+
+import json
+import random
+import timeit
+
+import numpy as np
+
+from app.utils.actual_rates import RatesSnapshot, file_path
+from app.utils.cross_rates import CrossRates
+
+NUMBER = 100_000
+BATCH_SIZE = 10_000
+
+
+def report(name: str, seconds: float, number: int):
+    print(f"{name:<45} {seconds / number * 1e6:>10.3f} us/op")
+
+
+def main():
+    with open(file_path, "r", encoding="utf-8") as f:
+        payload = json.load(f)
+
+    snapshot = RatesSnapshot.from_payload(payload)
+    cross_rates = CrossRates.from_snapshot(snapshot)
+    rates = snapshot.rates
+    codes = list(snapshot.codes)
+
+    random.seed(17)
+    pairs = [(random.choice(codes), random.choice(codes)) for _ in range(BATCH_SIZE)]
+    amounts = [random.uniform(1, 10_000) for _ in range(BATCH_SIZE)]
+    code_1, code_2 = pairs[0]
+
+    print(f"{len(codes)} currencies, matrix {cross_rates.matrix.nbytes} bytes\n")
+
+    # Single conversion
+    def file_dict_path():
+        with open(file_path, "r", encoding="utf-8") as f:
+            data = json.load(f)["rates"]
+        return round(10.5 * (data[code_2] / data[code_1]), 3)
+
+    def dict_path():
+        return round(10.5 * (rates[code_2] / rates[code_1]), 3)
+
+    def matrix_path():
+        return round(10.5 * cross_rates.rate(code_1, code_2), 3)
+
+    report(
+        "single: json.load + dict (pre-snapshot)",
+        timeit.timeit(file_dict_path, number=NUMBER // 100),
+        NUMBER // 100,
+    )
+    report("single: snapshot dict", timeit.timeit(dict_path, number=NUMBER), NUMBER)
+    report(
+        "single: cross-rate matrix", timeit.timeit(matrix_path, number=NUMBER), NUMBER
+    )
+
+    # Batch conversion
+    index = cross_rates.index
+    idx_1 = np.fromiter((index[a] for a, _ in pairs), dtype=np.intp, count=BATCH_SIZE)
+    idx_2 = np.fromiter((index[b] for _, b in pairs), dtype=np.intp, count=BATCH_SIZE)
+    k = np.array(amounts)
+
+    def batch_dict_path():
+        return [k_ * (rates[b] / rates[a]) for (a, b), k_ in zip(pairs, amounts)]
+
+    def batch_matrix_path():
+        return k * cross_rates.ratios(idx_1, idx_2)
+
+    number = 200
+    print()
+    report(
+        f"batch of {BATCH_SIZE}: snapshot dict loop",
+        timeit.timeit(batch_dict_path, number=number),
+        number,
+    )
+    report(
+        f"batch of {BATCH_SIZE}: matrix gather",
+        timeit.timeit(batch_matrix_path, number=number),
+        number,
+    )
+
+    assert np.allclose(batch_dict_path(), batch_matrix_path(), rtol=0, atol=0)
+
+
+if __name__ == "__main__":
+    main()
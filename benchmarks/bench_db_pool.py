@@ -0,0 +1,69 @@
+"""
+Pool saturation: concurrent sessions running a short query against pools
+of several sizes, with the checkout wait histogram and timeouts.
+
+Needs the database of DATABASE_URL. Run from the project root:
+    python -m benchmarks.bench_db_pool
+"""
+
+import asyncio
+import time
+
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.config import get_settings
+from app.database.pool import InstrumentedPool, PoolMetrics
+
+settings = get_settings()
+
+SESSIONS = 200  # Concurrent requests
+QUERY_SECONDS = 0.02
+POOLS = [(5, 0), (5, 10), (20, 10), (50, 0)]  # (pool_size, max_overflow)
+TIMEOUT = 1.0
+
+
+async def run(pool_size: int, max_overflow: int):
+    class Pool(InstrumentedPool):
+        metrics = PoolMetrics()
+
+    engine = create_async_engine(
+        settings.DATABASE_URL,
+        poolclass=Pool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=TIMEOUT,
+    )
+    Pool.metrics.listen(engine)
+
+    async def query():
+        async with AsyncSession(engine) as session:
+            await session.execute(text(f"SELECT pg_sleep({QUERY_SECONDS})"))
+
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(query() for _ in range(SESSIONS)), return_exceptions=True
+    )
+    elapsed = time.perf_counter() - start
+
+    stats = Pool.metrics.stats(engine.sync_engine.pool)
+    await engine.dispose()
+
+    failed = sum(isinstance(result, exc.TimeoutError) for result in results)
+    print(
+        f"pool {pool_size:>3} + {max_overflow:>3}: {elapsed:6.2f} s, "
+        f"{failed} timeouts, avg wait {stats['wait_avg_ms']:8.1f} ms, "
+        f"{stats['connects']} connects, {stats['closes']} closes"
+    )
+    print(f"    waits (cumulative, s): {stats['wait_histogram']}")
+
+
+def main():
+    print(f"{SESSIONS} sessions, SELECT pg_sleep({QUERY_SECONDS}), timeout {TIMEOUT} s")
+
+    for pool_size, max_overflow in POOLS:
+        asyncio.run(run(pool_size, max_overflow))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Exact scaled-integer conversion vs the float path and decimal.Decimal.
+
+Run from the project root:
+    python -m benchmarks.bench_fixed_point
+"""
+
+import json
+import random
+import timeit
+from decimal import ROUND_HALF_EVEN, Decimal, localcontext
+
+import numpy as np
+
+from app.api.schemas.currency import Converter
+from app.services.currency import CurrencyService
+from app.utils.actual_rates import RatesSnapshot, file_path
+from app.utils.cross_rates import get_cross_rates
+from app.utils.fixed_point import format_scaled, get_fixed_point_rates
+
+NUMBER = 100_000
+BATCH_SIZE = 10_000
+QUANTUM = Decimal("0.001")
+
+
+def report(name: str, seconds: float, number: int):
+    print(f"{name:<45} {seconds / number * 1e6:>10.3f} us/op")
+
+
+def main():
+    with open(file_path, "r", encoding="utf-8") as f:
+        payload = json.load(f)
+
+    snapshot = RatesSnapshot.from_payload(payload)
+    rates = snapshot.rates
+    codes = list(snapshot.codes)
+
+    random.seed(17)
+    items = [
+        Converter(
+            code_1=random.choice(codes),
+            code_2=random.choice(codes),
+            k=round(random.uniform(1, 10_000_000), 2),
+        )
+        for _ in range(BATCH_SIZE)
+    ]
+    item = items[0]
+
+    cross_rates = get_cross_rates(snapshot)
+    fixed_point_rates = get_fixed_point_rates(snapshot)
+    decimal_rates = {code: Decimal(repr(rate)) for code, rate in rates.items()}
+
+    # Single conversion
+    def float_path():
+        return round(item.k * cross_rates.rate(item.code_1, item.code_2), 3)
+
+    def exact_path():
+        return fixed_point_rates.convert(item.code_1, item.code_2, item.k)
+
+    def decimal_path():
+        with localcontext() as ctx:
+            ctx.prec = 50
+            return (
+                Decimal(repr(item.k))
+                * decimal_rates[item.code_2]
+                / decimal_rates[item.code_1]
+            ).quantize(QUANTUM, rounding=ROUND_HALF_EVEN)
+
+    report("single: float", timeit.timeit(float_path, number=NUMBER), NUMBER)
+    report(
+        "single: exact (scaled ints)", timeit.timeit(exact_path, number=NUMBER), NUMBER
+    )
+    report(
+        "single: decimal.Decimal", timeit.timeit(decimal_path, number=NUMBER), NUMBER
+    )
+
+    # Batch conversion (codes already resolved to matrix positions)
+    index = snapshot.index
+    idx_1 = np.fromiter((index[i.code_1] for i in items), dtype=np.intp)
+    idx_2 = np.fromiter((index[i.code_2] for i in items), dtype=np.intp)
+    amounts = np.fromiter((i.k for i in items), dtype=np.float64)
+
+    def batch_float():
+        results = amounts * cross_rates.ratios(idx_1, idx_2)
+        return [round(result, 3) for result in results.tolist()]
+
+    def batch_exact():
+        results = fixed_point_rates.convert_many(idx_1, idx_2, amounts)
+        return [format_scaled(result, 3) for result in results]
+
+    def batch_decimal():
+        with localcontext() as ctx:
+            ctx.prec = 50
+            return [
+                (
+                    Decimal(repr(i.k))
+                    * decimal_rates[i.code_2]
+                    / decimal_rates[i.code_1]
+                ).quantize(QUANTUM, rounding=ROUND_HALF_EVEN)
+                for i in items
+            ]
+
+    number = 50
+    print()
+    for name, func in (
+        ("float", batch_float),
+        ("exact (float estimate + int fallback)", batch_exact),
+        ("decimal.Decimal", batch_decimal),
+    ):
+        report(
+            f"batch of {BATCH_SIZE}: {name}",
+            timeit.timeit(func, number=number),
+            number,
+        )
+
+    def batch_endpoint():
+        return CurrencyService.convert_batch(snapshot, items, exact=True)
+
+    report(
+        f"batch of {BATCH_SIZE}: convert_batch(exact=True)",
+        timeit.timeit(batch_endpoint, number=number),
+        number,
+    )
+
+    assert batch_exact() == [str(d) for d in batch_decimal()]
+
+    # Drift of the float path
+    drift = sum(
+        1
+        for f, e in zip(batch_float(), batch_exact())
+        if Decimal(repr(f)).quantize(QUANTUM) != Decimal(e)
+    )
+    print(f"\nfloat results differing from exact: {drift} of {BATCH_SIZE}")
+
+
+if __name__ == "__main__":
+    main()
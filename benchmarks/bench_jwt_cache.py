@@ -0,0 +1,55 @@
+"""
+Access token decoding with and without the decoded-token cache,
+for several numbers of requests per token.
+
+Run from the project root:
+    python -m benchmarks.bench_jwt_cache
+"""
+
+import asyncio
+import random
+import time
+
+from app.core.security import create_access_token, decode_jwt_token
+from app.utils.token_cache import decoded_tokens
+
+REQUESTS = 100_000
+REUSE = [1, 10, 100, 1000]  # Requests per token
+
+
+async def run(tokens: list[str]) -> float:
+    start = time.perf_counter()
+    for token in tokens:
+        await decode_jwt_token(token)
+    return time.perf_counter() - start
+
+
+def main():
+    random.seed(17)
+
+    for reuse in REUSE:
+        pool = [
+            create_access_token({"sub": f"user-{i}"}).decode("utf-8")
+            for i in range(REQUESTS // reuse)
+        ]
+        tokens = pool * reuse
+        random.shuffle(tokens)
+
+        decoded_tokens.maxsize = 0
+        decoded_tokens.clear()
+        uncached = asyncio.run(run(tokens))
+
+        decoded_tokens.maxsize = len(pool)
+        cached = asyncio.run(run(tokens))
+        decoded_tokens.clear()
+
+        print(
+            f"{reuse:>5} requests/token: "
+            f"uncached {uncached / REQUESTS * 1e6:>7.3f} us/op, "
+            f"cached {cached / REQUESTS * 1e6:>7.3f} us/op "
+            f"({uncached / cached:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Binary rates snapshot vs rates.json: file size and load time.
+
+Run from the project root:
+    python -m benchmarks.bench_rates_format
+"""
+
+import json
+import tempfile
+import timeit
+from pathlib import Path
+
+from app.utils import rates_format
+from app.utils.actual_rates import file_path
+
+NUMBER = 5_000
+
+
+def main():
+    with open(file_path, "r", encoding="utf-8") as f:
+        payload = json.load(f)
+
+    with tempfile.TemporaryDirectory() as directory:
+        binary_path = Path(directory) / "rates.bin"
+        rates_format.dump(payload, binary_path)
+
+        json_size = file_path.stat().st_size
+        binary_size = binary_path.stat().st_size
+        print(f"{len(payload['rates'])} currencies")
+        print(f"rates.json: {json_size} bytes, rates.bin: {binary_size} bytes\n")
+
+        def load_json():
+            with open(file_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+
+        def load_binary():
+            return rates_format.load(binary_path)
+
+        def dump_json():
+            return json.dumps(payload, indent=4, ensure_ascii=False)
+
+        def dump_binary():
+            return rates_format.dumps(payload)
+
+        assert load_binary()["rates"] == {
+            code: float(rate) for code, rate in sorted(payload["rates"].items())
+        }
+
+        for name, func in (
+            ("load: json.load", load_json),
+            ("load: binary snapshot", load_binary),
+            ("encode: json.dumps(indent=4)", dump_json),
+            ("encode: binary snapshot", dump_binary),
+        ):
+            seconds = timeit.timeit(func, number=NUMBER)
+            print(f"{name:<35} {seconds / NUMBER * 1e6:>10.3f} us/op")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,9 @@ from app.main import app
 from app.database.database import get_db_connection
 from app.database.models import Base
 from app.core.config import get_settings
+from app.utils.revoked_tokens import revoked_tokens
+from app.utils.token_cache import decoded_tokens
+from app.utils.user_cache import user_cache
 
 settings = get_settings()
 
@@ -51,3 +54,27 @@ async def client(async_session):
         yield ac
 
     app.dependency_overrides.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_user_cache():
+    """Users are added again (and rolled back) by every test."""
+    user_cache.clear(token_versions=True)
+    yield
+    user_cache.clear(token_versions=True)
+
+
+@pytest.fixture(autouse=True)
+def clear_revoked_tokens():
+    """Revoked tokens are rolled back with every test."""
+    revoked_tokens.clear()
+    yield
+    revoked_tokens.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_decoded_tokens():
+    """Tokens are not reused between tests."""
+    decoded_tokens.clear()
+    yield
+    decoded_tokens.clear()
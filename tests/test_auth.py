@@ -1,10 +1,29 @@
-from sqlalchemy import select
+import asyncio
+import datetime
+import threading
+import time
+from unittest.mock import patch
 
-from freezegun import freeze_time
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 
-from app.database.models import User, RevokedToken
-from tests.conftest import client, async_session
-from tests.utils import add_users
+from freezegun import freeze_time
+import pytest
+from pydantic import ValidationError
+
+from app.core.config import Settings
+from app.database.models import DeletedUser, User, RevokedToken
+from tests.conftest import TEST_DATABASE_URL, client, async_session
+from tests.utils import add_users, make_snapshot
+from app.main import app
+from app.database.database import get_db_connection
+from app.dependencies.dependencies import get_claims_user, get_current_user
+from app.services.user import UserService
+from app.utils.password_pool import PasswordPool
+from app.utils.revoked_tokens import revoked_tokens
+from app.utils.token_cache import decoded_tokens
+from app.utils.user_cache import UserCache
 
 import jwt
 from app.core.security import (
@@ -223,3 +242,276 @@ async def test_refresh_token_fail(client, async_session):
 
     assert response.status_code == 400
     assert "Field: ('header', 'x-refresh-token')" in response.text
+
+
+async def test_access_token_claims(client, async_session):
+    """
+    With ACCESS_TOKEN_CLAIMS, access tokens carry uid/adm/ver and currency
+    endpoints authorize from them without a database session. A role change
+    or deletion rejects tokens issued before it.
+    """
+    await add_users(async_session)
+    form_data = {"username": "Darth Vader", "password": "Str0ngP@ssword"}
+
+    with patch("app.services.auth.settings.ACCESS_TOKEN_CLAIMS", True):
+        with patch("app.utils.password_pool.bcrypt.checkpw", return_value=True):
+            response = await client.post("/auth/login", data=form_data)
+
+    access_token = response.json()["access_token"]
+    payload = jwt.decode(access_token, SECRET_KEY, algorithms=[ALGORITHM])
+
+    assert payload["uid"] == 66
+    assert payload["adm"] is False
+    assert payload["ver"] == 0
+
+    async def no_db_connection():
+        raise AssertionError("Database session opened")
+        yield
+
+    headers = {"Authorization": f"Bearer {access_token}"}
+    converter = {"code_1": "EUR", "code_2": "RUB", "k": 100}
+    override_get_db = app.dependency_overrides[get_db_connection]
+
+    with patch(
+        "app.api.endpoints.currency.get_rates_snapshot", return_value=make_snapshot()
+    ):
+        app.dependency_overrides[get_current_user] = get_claims_user
+        app.dependency_overrides[get_db_connection] = no_db_connection
+
+        allowed = await client.post(
+            "/currency/converter", json=converter, headers=headers
+        )
+
+        # A token without claims
+        old_token = create_access_token({"sub": "Darth Vader"}).decode("utf-8")
+        no_claims = await client.post(
+            "/currency/converter",
+            json=converter,
+            headers={"Authorization": f"Bearer {old_token}"},
+        )
+
+        app.dependency_overrides[get_db_connection] = override_get_db
+        await UserService.set_admin(66, True, async_session)
+
+        revoked = await client.post(
+            "/currency/converter", json=converter, headers=headers
+        )
+
+    assert allowed.status_code == 200
+    assert allowed.json() == {"message": "100.0 EUR - 9,058.14 RUB"}
+
+    assert no_claims.status_code == 401
+    assert no_claims.json()["error_code"] == "INVALID_TOKEN"
+
+    assert revoked.status_code == 401
+    assert revoked.json()["error_code"] == "TOKEN_REVOKED"
+
+
+async def test_deleted_user_claims_revocation_persisted(async_session):
+    """
+    A deletion is stored in deleted_users, so other workers and restarts
+    load it at startup and reject the user's claims tokens.
+    """
+    await add_users(async_session)
+    async_session.add(
+        DeletedUser(
+            id=1,
+            deleted_at=datetime.datetime.now(datetime.UTC) - datetime.timedelta(days=1),
+        )
+    )
+    await async_session.commit()
+
+    await UserService.delete_user(66, None, async_session)
+
+    other_worker = UserCache(maxsize=10, ttl=60, negative_ttl=60)
+    other_worker.load_token_versions(
+        await UserService.get_token_versions(async_session)
+    )
+
+    assert not other_worker.token_version_ok(66, 0)
+    assert other_worker.token_version_ok(15, 0)
+
+    # Entries older than the access token lifetime are dropped
+    result = await async_session.execute(select(DeletedUser.id))
+    assert result.scalars().all() == [66]
+
+
+def test_claims_require_invalidation_channel():
+    """Claims without the invalidation channel: the app refuses to start."""
+    with pytest.raises(ValidationError, match="USER_CACHE_INVALIDATION_CHANNEL"):
+        Settings(ACCESS_TOKEN_CLAIMS=True)
+
+    settings = Settings(
+        ACCESS_TOKEN_CLAIMS=True, USER_CACHE_INVALIDATION_CHANNEL="users"
+    )
+    assert settings.ACCESS_TOKEN_CLAIMS
+
+
+async def test_refresh_token_revoked_elsewhere(client, async_session):
+    """
+    A token revoked by another worker (unknown to the in-process index)
+    is rejected by the unique jti of revoked_tokens.
+    """
+    await add_users(async_session)
+
+    refresh_token = create_refresh_token({"sub": "Hermione G."})
+    payload = jwt.decode(refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
+
+    async_session.add(
+        RevokedToken(
+            jti=payload["jti"],
+            expires_at=datetime.datetime.fromtimestamp(payload["exp"], datetime.UTC),
+        )
+    )
+    await async_session.flush()
+
+    headers = {"x-refresh-token": refresh_token}
+    response = await client.post("/auth/refresh", headers=headers)
+
+    assert response.status_code == 401
+    assert response.json()["error_code"] == "TOKEN_REVOKED"
+    assert revoked_tokens.is_revoked(payload["jti"])
+
+
+async def test_password_pool_busy(client, async_session):
+    """
+    Error 429 when every worker is busy and the queue is full.
+    Endpoint POST /auth/login.
+    """
+    await add_users(async_session)
+
+    release = threading.Event()
+    pool = PasswordPool(workers=1, max_queue=1)
+    blocked = [asyncio.ensure_future(pool.run(release.wait)) for _ in range(2)]
+    await asyncio.sleep(0)
+
+    form_data = {"username": "Hermione G.", "password": "Str0ngP@ssword"}
+
+    with patch("app.services.auth.password_pool", pool):
+        response = await client.post("/auth/login", data=form_data)
+
+        assert response.status_code == 429
+        assert response.json()["error_code"] == "TOO_MANY_REQUESTS"
+
+        release.set()
+        await asyncio.gather(*blocked)
+
+        response = await client.post("/auth/login", data=form_data)
+        assert response.status_code == 200
+
+    stats = pool.stats()
+    assert stats["rejected"] == 1
+    assert stats["completed"] == 3
+    assert stats["pending"] == 0
+
+
+async def test_password_pool_keeps_event_loop_free():
+    """Slow hashing runs in the pool while the event loop goes on."""
+    pool = PasswordPool(workers=2, max_queue=0)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    task = asyncio.create_task(ticker())
+    await asyncio.gather(pool.run(time.sleep, 0.2), pool.run(time.sleep, 0.2))
+    task.cancel()
+
+    assert ticks >= 10
+    assert pool.stats()["run_p99_ms"] >= 200
+
+    hashed = await pool.hash("Str0ngP@ssword")
+    assert await pool.check("Str0ngP@ssword", hashed)
+    assert not await pool.check("Str0ngP@sswor", hashed)
+
+
+async def test_decoded_token_cache(client, async_session):
+    """
+    Access tokens are verified once, dropped at exp and on user changes,
+    a cached signature with another payload is still rejected.
+    Endpoint GET /users/user_info.
+    """
+    await add_users(async_session)
+
+    with freeze_time("2026-01-17 12:00:00"):
+        token = create_access_token({"sub": "Hermione G."}).decode("utf-8")
+        headers = {"Authorization": f"Bearer {token}"}
+
+        with patch("app.core.security.jwt.decode", wraps=jwt.decode) as decode:
+            for _ in range(3):
+                response = await client.get("/users/user_info", headers=headers)
+                assert response.status_code == 200
+
+            assert decode.call_count == 1
+
+        # Same signature, forged payload
+        header, _, signature = token.split(".")
+        forged = create_access_token({"sub": "Harry P."}).decode("utf-8")
+        forged = f"{header}.{forged.split('.')[1]}.{signature}"
+
+        response = await client.get(
+            "/users/user_info", headers={"Authorization": f"Bearer {forged}"}
+        )
+        assert response.status_code == 401
+        assert response.json()["error_code"] == "INVALID_TOKEN"
+
+        user = (await async_session.execute(select(User).filter_by(id=15))).scalar_one()
+        await UserService.set_admin(user.id, not user.is_admin, async_session)
+        assert decoded_tokens.get(token) is None
+
+        response = await client.get("/users/user_info", headers=headers)
+        assert response.status_code == 200
+        assert decoded_tokens.get(token) is not None
+
+    with freeze_time("2026-01-17 12:31:00"):
+        response = await client.get("/users/user_info", headers=headers)
+        assert response.status_code == 401
+        assert response.json()["error_code"] == "TOKEN_EXPIRED"
+        assert decoded_tokens.get(token) is None
+
+
+async def test_refresh_token_concurrent_rotation(async_db_engine):
+    """
+    Hundreds of parallel refreshes with one token, each in its own
+    session and transaction: exactly one gets a new pair.
+    Endpoint POST /auth/refresh.
+    """
+    engine = create_async_engine(TEST_DATABASE_URL, pool_size=20, max_overflow=0)
+
+    async def override_get_db():
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            yield session
+
+    app.dependency_overrides[get_db_connection] = override_get_db
+
+    refresh_token = create_refresh_token({"sub": "Hermione G."})
+    jti = jwt.decode(refresh_token, SECRET_KEY, algorithms=[ALGORITHM])["jti"]
+    headers = {"x-refresh-token": refresh_token}
+
+    try:
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as ac:
+            responses = await asyncio.gather(
+                *(ac.post("/auth/refresh", headers=headers) for _ in range(300))
+            )
+    finally:
+        app.dependency_overrides.clear()
+
+        async with engine.begin() as connection:
+            await connection.execute(
+                delete(RevokedToken).where(RevokedToken.jti == jti)
+            )
+        await engine.dispose()
+
+    statuses = [response.status_code for response in responses]
+    assert statuses.count(200) == 1
+    assert statuses.count(401) == 299
+    assert all(
+        response.json()["error_code"] == "TOKEN_REVOKED"
+        for response in responses
+        if response.status_code == 401
+    )
@@ -1,9 +1,33 @@
+import asyncio
+import json
+from decimal import ROUND_HALF_EVEN, Decimal, localcontext
+import os
+import time
 import unittest
-from unittest.mock import patch, mock_open, MagicMock
+from unittest.mock import patch, MagicMock
+
+import fakeredis
+import httpx
+import numpy as np
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
 from app.tasks.exchange_rate_api import get_actual_rates
+from app.tasks.revoked_token_tasks import cleanup_expired_tokens
+from app.tasks.runtime import WorkerRuntime, get_runtime, start_runtime, stop_runtime
 from app.main import app
-from app.core.security import decode_jwt_token
-from tests.conftest import client
+from app.core.security import decode_jwt_token, create_access_token
+from app.api.schemas.currency import Converter
+from app.services.currency import MAX_LINE_BYTES, CurrencyService
+from app.utils.actual_rates import RatesStore
+from app.utils.cross_rates import CrossRates, get_cross_rates
+from app.utils.rates_storage import save_rates
+from app.utils.fixed_point import divide, get_fixed_point_rates, to_scaled
+from app.utils.http_cache import encoded_body
+from app.utils.codes_names import CurrencyRegistry, build_currency_info
+from tests.conftest import TEST_DATABASE_URL, client, async_session
+from tests.utils import add_users, make_snapshot, write_rates
 
 
 class TestCeleryTask(unittest.TestCase):
@@ -12,34 +36,82 @@ class TestCeleryTask(unittest.TestCase):
     and updating the local JSON storage.
     """
 
-    @patch("app.tasks.exchange_rate_api.requests.get")  # API request
-    async def test_get_actual_rates_save_json(self, mock_get: MagicMock):
+    @patch("app.utils.rates_fetcher.get_rates_snapshot", return_value=None)
+    @patch("app.utils.rates_fetcher.save_rates")  # Local storage
+    def test_get_actual_rates_save_json(self, mock_save: MagicMock, _):
         """
         Verify the full cycle of the background task:
-        external API request -> JSON data parsing -> save to local file.
+        external API request -> JSON data parsing -> save to local storage.
         """
         # Fake response from an external API
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {
+        payload = {
             "valid": True,
             "updated": 1768593649,
             "base": "USD",
             "rates": {"USD": 1.0, "EUR": 0.86, "RUB": 77.9},
         }
+        requests = []
 
-        mock_get.return_value = mock_response
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return httpx.Response(200, json=payload)
 
-        # Simulate file operations without touching the filesystem
-        m_open = mock_open()
-        with patch("builtins.open", m_open):
+        runtime = WorkerRuntime(
+            create_async_engine(TEST_DATABASE_URL),
+            httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        )
+
+        with patch("app.tasks.exchange_rate_api.get_runtime", return_value=runtime):
+            get_actual_rates()
             get_actual_rates()
 
-        # Check if the request was sent to API
-        mock_get.assert_called_once()
+        runtime.close()
+
+        # Check if the request was sent to API (the same client both times)
+        self.assertEqual(len(requests), 2)
+        self.assertEqual(requests[0].url.params["base"], "USD")
+
+        # Check if the response was handed over to the storage
+        mock_save.assert_called_with(payload)
+
+        # Failed requests are not saved
+        mock_save.reset_mock()
+        retries = patch("app.utils.rates_fetcher.settings.EXTERNAL_API_RETRIES", 0)
+        runtime = WorkerRuntime(
+            create_async_engine(TEST_DATABASE_URL),
+            httpx.AsyncClient(
+                transport=httpx.MockTransport(lambda request: httpx.Response(500))
+            ),
+        )
+        with (
+            retries,
+            patch("app.tasks.exchange_rate_api.get_runtime", return_value=runtime),
+        ):
+            get_actual_rates()
+        runtime.close()
 
-        # Check if the file was opened for writing and something was written
-        m_open.assert_called_once_with("app/json/rates.json", "w", encoding="utf-8")
+        mock_save.assert_not_called()
+
+    def test_worker_runtime_lifecycle(self):
+        """One runtime per worker process, closed at shutdown."""
+        with patch("app.tasks.runtime.settings.DATABASE_URL", TEST_DATABASE_URL):
+            start_runtime()
+            runtime = get_runtime()
+            self.assertIs(get_runtime(), runtime)
+
+            async def loop_and_query():
+                async with runtime.sessions() as session:
+                    await session.execute(text("SELECT 1"))
+                return asyncio.get_running_loop()
+
+            self.assertIs(runtime.run(loop_and_query()), runtime.loop)
+
+            stop_runtime()
+
+        self.assertTrue(runtime.loop.is_closed())
+        self.assertTrue(runtime.http.is_closed)
+        self.assertEqual(cleanup_expired_tokens.ignore_result, True)
+        self.assertEqual(get_actual_rates.ignore_result, True)
 
 
 class TestConverterApi(unittest.TestCase):
@@ -49,8 +121,8 @@ class TestConverterApi(unittest.TestCase):
     """
 
     @patch(
-        "app.api.endpoints.currency.get_actual_rates_data"
-    )  # Replace JSON reading function
+        "app.api.endpoints.currency.get_rates_snapshot"
+    )  # Replace rates snapshot loading
     async def test_convert_logic_success(self, mock_get_file_data: MagicMock):
 
         # Mock implementation for Dependency (JWT decoding)
@@ -61,7 +133,7 @@ class TestConverterApi(unittest.TestCase):
         # It replaces real 'decode_jwt_token' function with mock for this test
         app.dependency_overrides[decode_jwt_token] = mock_decode_jwt_token
 
-        mock_get_file_data.return_value = {"USD": 1.0, "EUR": 0.86, "RUB": 77.9}
+        mock_get_file_data.return_value = make_snapshot()
 
         payload = {"code_1": "EUR", "code_2": "RUB", "k": 100}
         headers = {"Authorization": "Bearer token"}
@@ -84,7 +156,7 @@ class TestConverterApi(unittest.TestCase):
         # Check if the data reading function was called once
         mock_get_file_data.assert_called_once()
 
-    @patch("app.api.endpoints.currency.get_actual_rates_data")
+    @patch("app.api.endpoints.currency.get_rates_snapshot")
     async def test_convert_invalid_code(self, mock_get_file_data: MagicMock):
 
         def mock_decode_jwt_token():
@@ -92,7 +164,7 @@ class TestConverterApi(unittest.TestCase):
 
         app.dependency_overrides[decode_jwt_token] = mock_decode_jwt_token
 
-        mock_get_file_data.return_value = {"USD": 1.0, "EUR": 0.86, "RUB": 77.9}
+        mock_get_file_data.return_value = make_snapshot()
 
         payload = {"code_1": "EU", "code_2": "RUB", "k": 100}
         headers = {"Authorization": "Bearer token"}
@@ -154,7 +226,7 @@ class TestCurrenciesActualRates(unittest.TestCase):
     Test for getting an actual rates of currencies: POST /currency/actual_rates.
     """
 
-    @patch("app.api.endpoints.currency.get_actual_rates_data")
+    @patch("app.api.endpoints.currency.get_rates_snapshot")
     async def test_get_currencies_list(self, mock_get_file_data: MagicMock):
 
         # Setup dependecy override (JWT auth)
@@ -163,7 +235,7 @@ class TestCurrenciesActualRates(unittest.TestCase):
 
         app.dependency_overrides[decode_jwt_token] = mock_decode_jwt_token
 
-        mock_get_file_data.return_value = {"USD": 1.0, "EUR": 0.86, "RUB": 77.9}
+        mock_get_file_data.return_value = make_snapshot()
 
         headers = {"Authorization": "Bearer token"}
         response = await client.get("/currency/actual_rates", headers=headers)
@@ -191,7 +263,7 @@ class TestSpecificCurrencyRate(unittest.TestCase):
     Another test return Error 400: Invalid code.
     """
 
-    @patch("app.api.endpoints.currency.get_actual_rates_data")
+    @patch("app.api.endpoints.currency.get_rates_snapshot")
     async def test_get_specific_rate_success(self, mock_get_file_data: MagicMock):
 
         # Setup dependecy override (JWT auth)
@@ -200,7 +272,7 @@ class TestSpecificCurrencyRate(unittest.TestCase):
 
         app.dependency_overrides[decode_jwt_token] = mock_decode_jwt_token
 
-        mock_get_file_data.return_value = {"USD": 1.0, "EUR": 0.86, "RUB": 77.9}
+        mock_get_file_data.return_value = make_snapshot()
 
         headers = {"Authorization": "Bearer token"}
         target_codes = ["EUR", "RUB"]
@@ -224,7 +296,7 @@ class TestSpecificCurrencyRate(unittest.TestCase):
 
         mock_get_file_data.assert_called_once()
 
-    @patch("app.api.endpoints.get_actual_rates_data")
+    @patch("app.api.endpoints.currency.get_rates_snapshot")
     async def test_get_specific_rate_invalid_code(self, mock_get_file_data: MagicMock):
 
         # Setup dependecy override (JWT auth)
@@ -233,7 +305,7 @@ class TestSpecificCurrencyRate(unittest.TestCase):
 
         app.dependency_overrides[decode_jwt_token] = mock_decode_jwt_token
 
-        mock_get_file_data.return_value = {"USD": 1.0, "EUR": 0.86, "RUB": 77.9}
+        mock_get_file_data.return_value = make_snapshot()
 
         headers = {"Authorization": "Bearer token"}
         target_code = ["RU"]
@@ -249,3 +321,651 @@ class TestSpecificCurrencyRate(unittest.TestCase):
         result_data = response.json()
 
         self.assertEqual(result_data["error_code"], "INVALID_CODE")
+
+
+def test_rates_store_reloads_only_on_file_change(tmp_path):
+    """
+    The rates file is parsed once and re-read only after it has been rewritten.
+    """
+    rates_file = tmp_path / "rates.json"
+    write_rates(rates_file, {"USD": 1.0, "EUR": 0.86})
+    store = RatesStore(rates_file)
+
+    with patch("app.utils.actual_rates.json.load", wraps=json.load) as load:
+        first = store.get()
+        second = store.get()
+
+        assert first is second
+        assert load.call_count == 1
+
+        write_rates(rates_file, {"USD": 1.0, "EUR": 0.9, "RUB": 77.9}, 1768600000)
+        os.utime(rates_file, ns=(time.time_ns(), time.time_ns() + 1_000_000))
+
+        third = store.get()
+
+        assert load.call_count == 2
+        assert third.rates["EUR"] == 0.9
+        assert third.updated == 1768600000
+
+
+def test_rates_snapshot_is_read_only(tmp_path):
+    """
+    Snapshot readers get read-only views with precomputed MSK time.
+    """
+    rates_file = tmp_path / "rates.json"
+    write_rates(rates_file, {"USD": 1.0, "EUR": 0.86})
+    snapshot = RatesStore(rates_file).get()
+
+    assert snapshot.data["updated"] == "2026-01-16 23:00:49+03:00 (MSK)"
+    assert snapshot.data["EUR"] == 0.86
+    assert "updated" not in snapshot.rates
+
+    with pytest.raises(TypeError):
+        snapshot.rates["EUR"] = 1.0
+
+
+def test_rates_store_keeps_last_snapshot_on_broken_file(tmp_path):
+    """
+    A half-written file does not replace the last valid snapshot.
+    """
+    rates_file = tmp_path / "rates.json"
+    write_rates(rates_file, {"USD": 1.0, "EUR": 0.86})
+    store = RatesStore(rates_file)
+    valid = store.get()
+
+    rates_file.write_text('{"valid": true, "updated": 17', encoding="utf-8")
+
+    assert store.get() is valid
+
+
+async def test_rates_store_push_updates(tmp_path):
+    """
+    The writer replaces the file atomically and announces the version;
+    a subscribed store swaps its snapshot without stat calls per request.
+    """
+    rates_file = tmp_path / "rates.json"
+    write_rates(rates_file, {"USD": 1.0, "EUR": 0.86})
+    store = RatesStore(rates_file)
+    server = fakeredis.FakeServer()
+    payload = {
+        "valid": True,
+        "updated": 1768600000,
+        "base": "USD",
+        "rates": {"USD": 1.0, "EUR": 0.9, "RUB": 77.9},
+    }
+
+    with (
+        patch(
+            "app.utils.actual_rates.redis.from_url",
+            side_effect=lambda url: fakeredis.FakeAsyncRedis(server=server),
+        ),
+        patch(
+            "app.utils.rates_storage.redis.Redis.from_url",
+            side_effect=lambda url: fakeredis.FakeRedis(server=server),
+        ),
+        patch("app.utils.rates_storage.rates_file_path", return_value=rates_file),
+        patch("app.utils.rates_storage.CrossRates.save"),
+        patch("app.utils.rates_storage.settings.RATES_STORAGE_FORMAT", "json"),
+        patch("app.utils.rates_storage.settings.RATES_SHARED_SEGMENT", False),
+        patch("app.utils.rates_storage.settings.RATES_HISTORY_ENABLED", False),
+        patch("app.utils.rates_storage.settings.RATES_UPDATES_CHANNEL", "rates"),
+    ):
+        listener = asyncio.create_task(store.listen("rates"))
+        while not store.subscribed:
+            await asyncio.sleep(0.01)
+
+        with patch("app.utils.actual_rates.os.stat", wraps=os.stat) as stat:
+            first = store.get()
+            assert store.get() is first
+            stat.assert_not_called()
+
+        await asyncio.to_thread(save_rates, payload)
+
+        for _ in range(100):
+            if store.get().updated == payload["updated"]:
+                break
+            await asyncio.sleep(0.01)
+
+        listener.cancel()
+        await asyncio.gather(listener, return_exceptions=True)
+
+    assert store.get().rates["EUR"] == 0.9
+    assert not store.subscribed
+    assert [path.name for path in tmp_path.iterdir()] == ["rates.json"]
+
+
+async def test_convert_with_snapshot(client, async_session):
+    """
+    Endpoint POST /currency/converter reads rates from the shared snapshot.
+    """
+    await add_users(async_session)
+    access_token = create_access_token({"sub": "Hermione G."}).decode("utf-8")
+    headers = {"Authorization": f"Bearer {access_token}"}
+
+    with patch(
+        "app.api.endpoints.currency.get_rates_snapshot", return_value=make_snapshot()
+    ):
+        response = await client.post(
+            "/currency/converter",
+            json={"code_1": "eur", "code_2": "RUB", "k": 100},
+            headers=headers,
+        )
+        rates_response = await client.get(
+            "/currency/actual_rates", params={"code": ["eur"]}, headers=headers
+        )
+
+    assert response.status_code == 200
+    assert response.json()["message"] == "100.0 EUR - 9,058.14 RUB"
+
+    assert rates_response.status_code == 200
+    assert rates_response.json()["rate"]["EUR"] == 0.86
+
+    with patch("app.api.endpoints.currency.get_rates_snapshot", return_value=None):
+        response = await client.post(
+            "/currency/converter",
+            json={"code_1": "EUR", "code_2": "RUB"},
+            headers=headers,
+        )
+
+    assert response.status_code == 503
+    assert response.json()["error_code"] == "RATES_UNAVAILABLE"
+
+
+def test_currency_registry_rebuilds_only_for_new_code_set():
+    """
+    The code -> (flag, name) table is built once per distinct set of codes.
+    """
+    registry = CurrencyRegistry()
+    snapshots = [
+        make_snapshot({"USD": 1.0, "EUR": 0.86, "BTC": 0.00001}),
+        make_snapshot({"USD": 1.0, "EUR": 0.9, "BTC": 0.00002}, updated=1768600000),
+        make_snapshot({"USD": 1.0, "EUR": 0.9, "RUB": 77.9}, updated=1768700000),
+    ]
+
+    with (
+        patch("app.utils.codes_names.get_rates_snapshot") as get_snapshot,
+        patch(
+            "app.utils.codes_names.build_currency_info", wraps=build_currency_info
+        ) as build,
+    ):
+        get_snapshot.return_value = snapshots[0]
+        names = registry.names()
+        assert registry.names() is names
+        assert build.call_count == 3
+
+        # New rates, same codes
+        get_snapshot.return_value = snapshots[1]
+        assert registry.names() is names
+        assert build.call_count == 3
+
+        # New set of codes
+        get_snapshot.return_value = snapshots[2]
+        new_names = registry.names()
+        assert build.call_count == 6
+
+    assert names["BTC"] == "💻 Bitcoin (cryptocurrency)"
+    assert new_names["EUR"] == "🇪🇺 Euro"
+    assert registry.entries()["RUB"].flag == "🇷🇺"
+
+    with pytest.raises(TypeError):
+        new_names["RUB"] = "Ruble"
+
+
+async def test_currencies_list_from_registry(client, async_session):
+    """
+    Endpoint GET /currency/list is a lookup in the currency registry.
+    """
+    await add_users(async_session)
+    access_token = create_access_token({"sub": "Hermione G."}).decode("utf-8")
+    headers = {"Authorization": f"Bearer {access_token}"}
+
+    with patch(
+        "app.api.endpoints.currency.get_rates_snapshot", return_value=make_snapshot()
+    ):
+        response = await client.get("/currency/list", headers=headers)
+        specific = await client.get(
+            "/currency/list", params={"code": ["eur", "RUB"]}, headers=headers
+        )
+        invalid = await client.get(
+            "/currency/list", params={"code": ["RU"]}, headers=headers
+        )
+
+    assert response.status_code == 200
+    assert set(response.json()["currencies"]) == {"USD", "EUR", "RUB"}
+    assert specific.json()["rate"] == {"EUR": "🇪🇺 Euro", "RUB": "🇷🇺 Russian ruble"}
+    assert invalid.status_code == 400
+
+
+async def test_convert_batch(client, async_session):
+    """
+    Endpoint POST /currency/converter/batch: numeric results
+    and per-item errors for invalid codes and overflowing results.
+    """
+    await add_users(async_session)
+    access_token = create_access_token({"sub": "Hermione G."}).decode("utf-8")
+    headers = {"Authorization": f"Bearer {access_token}"}
+
+    payload = {
+        "items": [
+            {"code_1": "EUR", "code_2": "RUB", "k": 100},
+            {"code_1": "eu", "code_2": "RUB", "k": 1},
+            {"code_1": "usd", "code_2": "eur"},
+            {"code_1": "XX", "code_2": "YY", "k": 5},
+            {"code_1": "EUR", "code_2": "RUB", "k": 1e308},
+        ]
+    }
+
+    with patch(
+        "app.api.endpoints.currency.get_rates_snapshot", return_value=make_snapshot()
+    ):
+        response = await client.post(
+            "/currency/converter/batch", json=payload, headers=headers
+        )
+        empty = await client.post(
+            "/currency/converter/batch", json={"items": []}, headers=headers
+        )
+
+    assert response.status_code == 200
+    data = response.json()
+
+    assert data["count"] == 5
+    assert data["results"] == [9058.14, None, 0.86, None, None]
+    assert [e["index"] for e in data["errors"]] == [1, 3, 4]
+    assert data["errors"][0]["message"] == "Invalid currency code provided: EU"
+    assert data["errors"][1]["message"] == "Invalid currency code provided: XX, YY"
+    assert data["errors"][2]["error_code"] == "RESULT_OUT_OF_RANGE"
+
+    assert empty.status_code == 400
+
+
+def test_convert_batch_matches_single_conversion():
+    """
+    Vectorized batch results are equal to per-item conversions.
+    """
+    snapshot = make_snapshot({"USD": 1.0, "EUR": 0.86, "RUB": 77.9, "BCH": 0.0017})
+    codes = list(snapshot.rates)
+    items = [
+        Converter(code_1=c1, code_2=c2, k=k)
+        for c1 in codes
+        for c2 in codes
+        for k in (0.5, 1, 1234.5678)
+    ]
+
+    data = CurrencyService.convert_batch(snapshot, items)
+
+    expected = [
+        round(i.k * (snapshot.rates[i.code_2] / snapshot.rates[i.code_1]), 3)
+        for i in items
+    ]
+    assert data["results"] == expected
+    assert data["errors"] == []
+
+
+def test_cross_rates_matrix(tmp_path):
+    """
+    The cross-rate matrix gives the same ratios as the rates dict
+    and can be shared through a memory-mapped .npy file.
+    """
+    snapshot = make_snapshot()
+    cross_rates = CrossRates.from_snapshot(snapshot)
+
+    assert cross_rates.rate("EUR", "RUB") == 77.9 / 0.86
+    assert cross_rates.rate("USD", "EUR") == 0.86
+    assert cross_rates.against("EUR")["USD"] == 1.0 / 0.86
+
+    cross_rates.save(tmp_path / "cross_rates.npy", tmp_path / "cross_rates.json")
+    loaded = CrossRates.load(
+        tmp_path / "cross_rates.npy", tmp_path / "cross_rates.json"
+    )
+
+    assert isinstance(loaded.matrix, np.memmap)
+    assert loaded.codes == snapshot.codes
+    assert loaded.updated == snapshot.updated
+    assert loaded.version == snapshot.version
+    assert np.array_equal(loaded.matrix, cross_rates.matrix)
+
+    # Rates rewritten under the same `updated`: the saved matrix is stale
+    fixed = make_snapshot({"USD": 1.0, "EUR": 0.87, "RUB": 77.9})
+    assert fixed.updated == snapshot.updated
+
+    with patch("app.utils.cross_rates.CrossRates.load", return_value=loaded):
+        assert get_cross_rates(snapshot) is loaded
+        assert get_cross_rates(fixed).rate("USD", "EUR") == 0.87
+
+
+def test_get_cross_rates_once_per_snapshot():
+    """
+    The matrix is built once per snapshot and reused by every conversion.
+    """
+    snapshot = make_snapshot()
+
+    with patch(
+        "app.utils.cross_rates.CrossRates.from_snapshot",
+        wraps=CrossRates.from_snapshot,
+    ) as build:
+        first = get_cross_rates(snapshot)
+        second = get_cross_rates(snapshot)
+
+    assert first is second
+    assert build.call_count <= 1
+
+
+async def test_actual_rates_against_base(client, async_session):
+    """
+    Endpoint GET /currency/actual_rates?base= reads a row of the matrix.
+    """
+    await add_users(async_session)
+    access_token = create_access_token({"sub": "Hermione G."}).decode("utf-8")
+    headers = {"Authorization": f"Bearer {access_token}"}
+
+    with patch(
+        "app.api.endpoints.currency.get_rates_snapshot", return_value=make_snapshot()
+    ):
+        response = await client.get(
+            "/currency/actual_rates",
+            params={"base": "eur", "code": ["RUB"]},
+            headers=headers,
+        )
+        invalid = await client.get(
+            "/currency/actual_rates", params={"base": "EU"}, headers=headers
+        )
+
+    assert response.status_code == 200
+    assert response.json()["rate"]["RUB"] == 77.9 / 0.86
+    assert "to EUR" in response.json()["message"]
+
+    assert invalid.status_code == 400
+    assert invalid.json()["error_code"] == "INVALID_CODE"
+
+
+async def test_convert_stream(client, async_session):
+    """
+    Endpoint POST /currency/converter/stream: one NDJSON result per input
+    line, per-line errors, 415 for other content types.
+    """
+    await add_users(async_session)
+    access_token = create_access_token({"sub": "Hermione G."}).decode("utf-8")
+    headers = {"Authorization": f"Bearer {access_token}"}
+
+    lines = [
+        {"code_1": "EUR", "code_2": "RUB", "k": 100},
+        {"code_1": "XX", "code_2": "RUB"},
+        {"code_1": "usd"},
+        {"code_1": "usd", "code_2": "eur"},
+        {"code_1": "EUR", "code_2": "RUB", "k": 1e308},
+    ]
+    body = "\n".join(json.dumps(line) for line in lines) + "\n"
+
+    async def chunks():
+        # Lines are split across network chunks
+        for i in range(0, len(body), 7):
+            yield body[i : i + 7].encode("utf-8")
+
+    with patch(
+        "app.api.endpoints.currency.get_rates_snapshot", return_value=make_snapshot()
+    ):
+        response = await client.post(
+            "/currency/converter/stream",
+            content=chunks(),
+            headers=headers | {"Content-Type": "application/x-ndjson"},
+        )
+        wrong_type = await client.post(
+            "/currency/converter/stream", json=lines[0], headers=headers
+        )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+
+    def strict(constant):
+        raise ValueError(f"Not valid JSON: {constant}")
+
+    results = [
+        json.loads(line, parse_constant=strict) for line in response.text.splitlines()
+    ]
+
+    assert [r["line"] for r in results] == [1, 2, 3, 4, 5]
+    assert results[0]["result"] == 9058.14
+    assert results[1]["error_code"] == "INVALID_CODE"
+    assert results[2]["error_code"] == "VALIDATION_ERROR"
+    assert results[3] | {"result": 0.86} == results[3]
+    assert results[4]["error_code"] == "RESULT_OUT_OF_RANGE"
+    assert "result" not in results[4]
+
+    assert wrong_type.status_code == 415
+    assert wrong_type.json()["error_code"] == "UNSUPPORTED_MEDIA_TYPE"
+
+
+async def test_convert_stream_long_line_and_tail():
+    """
+    Oversized lines are reported and skipped, a last line without
+    a trailing newline is still converted.
+    """
+    long_line = b'{"code_1": "' + b"A" * MAX_LINE_BYTES + b'"}\n'
+    body = long_line + b'{"code_1": "EUR", "code_2": "USD", "k": 2}'
+
+    async def chunks():
+        for i in range(0, len(body), 4096):
+            yield body[i : i + 4096]
+
+    output = b"".join(
+        [
+            part
+            async for part in CurrencyService.convert_stream(make_snapshot(), chunks())
+        ]
+    )
+    results = [json.loads(line) for line in output.splitlines()]
+
+    assert results[0] == {
+        "line": 1,
+        "error_code": "LINE_TOO_LONG",
+        "message": f"Line exceeds {MAX_LINE_BYTES} bytes",
+    }
+    assert results[1]["line"] == 2
+    assert results[1]["result"] == round(2 / 0.86, 3)
+
+
+def test_exact_conversion_matches_decimal():
+    """
+    Scaled-integer conversion equals Decimal arithmetic on the rate literals,
+    including large amounts and crypto rates.
+    """
+    rates = {"USD": 1.0, "EUR": 0.86, "RUB": 77.9, "BCH": 0.00177767222}
+    snapshot = make_snapshot(rates)
+
+    with localcontext() as ctx:
+        ctx.prec = 100
+        for code_1, code_2, k in [
+            ("BCH", "RUB", 123456789.123),
+            ("EUR", "BCH", 1e-05),
+            ("RUB", "EUR", 9.99e15),
+        ]:
+            expected = (
+                Decimal(repr(k))
+                * Decimal(repr(rates[code_2]))
+                / Decimal(repr(rates[code_1]))
+            ).quantize(Decimal("0.000001"), rounding=ROUND_HALF_EVEN)
+
+            assert CurrencyService.convert_exact(
+                snapshot, code_1, code_2, k, decimals=6
+            ) == str(expected)
+
+    assert get_fixed_point_rates(snapshot) is get_fixed_point_rates(snapshot)
+    # 0.86 USD -> EUR is exactly 1
+    assert CurrencyService.convert_exact(snapshot, "EUR", "USD", 0.86, 0) == "1"
+
+    with pytest.raises(ValueError, match="non-finite"):
+        to_scaled(float("inf"))
+
+
+def test_rounding_modes():
+    """Integer division rounding with every mode, on ties and both signs."""
+    cases = {
+        "half_even": [2, 4, -2, 2, 3],
+        "half_up": [3, 4, -3, 2, 3],
+        "half_down": [2, 3, -2, 2, 3],
+        "up": [3, 4, -3, 3, 3],
+        "down": [2, 3, -2, 2, 2],
+        "ceiling": [3, 4, -2, 3, 3],
+        "floor": [2, 3, -3, 2, 2],
+    }
+
+    for rounding, expected in cases.items():
+        assert [divide(n, 10, rounding) for n in (25, 35, -25, 21, 27)] == expected
+
+
+def test_exact_float_estimate_matches_integers():
+    """
+    The float64 fast paths give the same results as integer arithmetic,
+    also for exact ties and results right on a rounding boundary.
+    """
+    snapshot = make_snapshot(
+        {"USD": 1.0, "EUR": 0.86, "RUB": 77.9, "BCH": 0.00177767222}
+    )
+    fixed_point_rates = get_fixed_point_rates(snapshot)
+
+    n = len(snapshot.codes)
+    idx_1 = np.repeat(np.arange(n), n * 4)
+    idx_2 = np.tile(np.repeat(np.arange(n), 4), n)
+    amounts = np.tile([0.86, 0.0005, 1234.5678, 1e9], n * n)
+
+    for rounding in ("half_even", "half_up", "half_down", "up", "down"):
+        expected = [
+            fixed_point_rates.exact_index(i_1, i_2, k, 3, rounding)
+            for i_1, i_2, k in zip(idx_1.tolist(), idx_2.tolist(), amounts.tolist())
+        ]
+        single = [
+            fixed_point_rates.convert_index(i_1, i_2, k, 3, rounding)
+            for i_1, i_2, k in zip(idx_1.tolist(), idx_2.tolist(), amounts.tolist())
+        ]
+        many = fixed_point_rates.convert_many(idx_1, idx_2, amounts, 3, rounding)
+
+        assert single == expected
+        assert many == expected
+
+
+async def test_convert_exact_endpoints(client, async_session):
+    """
+    precision=exact in POST /currency/converter and /currency/converter/batch.
+    """
+    await add_users(async_session)
+    access_token = create_access_token({"sub": "Hermione G."}).decode("utf-8")
+    headers = {"Authorization": f"Bearer {access_token}"}
+    params = {"precision": "exact", "decimals": 4, "rounding": "down"}
+
+    with patch(
+        "app.api.endpoints.currency.get_rates_snapshot", return_value=make_snapshot()
+    ):
+        single = await client.post(
+            "/currency/converter",
+            json={"code_1": "EUR", "code_2": "RUB", "k": 1000},
+            params=params,
+            headers=headers,
+        )
+        batch = await client.post(
+            "/currency/converter/batch",
+            json={
+                "items": [
+                    {"code_1": "EUR", "code_2": "RUB", "k": 1000},
+                    {"code_1": "XX", "code_2": "RUB"},
+                ]
+            },
+            params=params,
+            headers=headers,
+        )
+        invalid = await client.post(
+            "/currency/converter",
+            json={"code_1": "EUR", "code_2": "RUB"},
+            params={"precision": "exact", "decimals": 40},
+            headers=headers,
+        )
+        # Non-finite amounts are rejected by the schema, not by the arithmetic
+        infinite = await client.post(
+            "/currency/converter",
+            json={"code_1": "EUR", "code_2": "RUB", "k": "inf"},
+            params=params,
+            headers=headers,
+        )
+        infinite_batch = await client.post(
+            "/currency/converter/batch",
+            json={"items": [{"code_1": "EUR", "code_2": "RUB", "k": "inf"}]},
+            params=params,
+            headers=headers,
+        )
+
+    # 1000 * 77.9 / 0.86 = 90581.395348...
+    assert single.status_code == 200
+    assert single.json() == {"message": "1000.0 EUR - 90,581.3953 RUB"}
+
+    assert batch.status_code == 200
+    assert batch.json()["results"] == ["90581.3953", None]
+
+    assert invalid.status_code == 400
+    assert infinite.status_code == 400
+    assert "finite number" in infinite.text
+    assert infinite_batch.status_code == 400
+
+
+async def test_rates_conditional_requests(client, async_session):
+    """
+    Rates responses carry ETag / Last-Modified, If-None-Match gets 304
+    after the token check but without the user lookup.
+    """
+    await add_users(async_session)
+    access_token = create_access_token({"sub": "Hermione G."}).decode("utf-8")
+    unknown_user_token = create_access_token({"sub": "Ghost"}).decode("utf-8")
+    headers = {"Authorization": f"Bearer {access_token}"}
+    snapshot = make_snapshot()
+
+    with patch("app.api.endpoints.currency.get_rates_snapshot", return_value=snapshot):
+        first = await client.get("/currency/actual_rates", headers=headers)
+        etag = first.headers["etag"]
+
+        not_modified = await client.get(
+            "/currency/actual_rates",
+            headers={
+                "Authorization": f"Bearer {unknown_user_token}",
+                "If-None-Match": f'"other", {etag}',
+            },
+        )
+        since = await client.get(
+            "/currency/list",
+            headers=headers | {"If-Modified-Since": first.headers["last-modified"]},
+        )
+        filtered = await client.get(
+            "/currency/actual_rates",
+            params={"code": "EUR"},
+            headers=headers | {"If-None-Match": '"other"'},
+        )
+        bad_token = await client.get(
+            "/currency/actual_rates",
+            headers={"Authorization": "Bearer bad", "If-None-Match": etag},
+        )
+        second = await client.get("/currency/actual_rates", headers=headers)
+
+    assert first.status_code == 200
+    assert etag == f'"{snapshot.version}"'
+    assert first.headers["last-modified"] == "Fri, 16 Jan 2026 20:00:49 GMT"
+    assert first.json()["rates"]["EUR"] == 0.86
+    assert second.content == first.content
+
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["etag"] == etag
+
+    assert since.status_code == 304
+    assert filtered.status_code == 200
+    assert filtered.headers["etag"] == etag
+    assert bad_token.status_code == 401
+
+
+def test_encoded_body_built_once_per_snapshot():
+    snapshot = make_snapshot()
+    build = MagicMock(return_value={"rates": dict(snapshot.rates)})
+
+    first = encoded_body(snapshot, ("actual_rates", "USD"), build)
+    second = encoded_body(snapshot, ("actual_rates", "USD"), build)
+
+    assert first is second
+    assert json.loads(first) == {"rates": {"USD": 1.0, "EUR": 0.86, "RUB": 77.9}}
+    assert build.call_count == 1
+    assert make_snapshot(updated=1).version != snapshot.version
@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from unittest.mock import patch
+
+from app.core.security import create_access_token
+from app.database.database import AccountedSession, release_connection
+from app.database.pool import InstrumentedPool, PoolMetrics
+from tests.conftest import TEST_DATABASE_URL, async_session, client
+from tests.utils import add_users, make_snapshot
+
+
+async def test_pool_saturation(async_db_engine):
+    """
+    More concurrent sessions than connections: the extra ones wait
+    (and are measured), and time out once the wait exceeds pool_timeout.
+    """
+
+    class Pool(InstrumentedPool):
+        metrics = PoolMetrics()
+
+    engine = create_async_engine(
+        TEST_DATABASE_URL,
+        poolclass=Pool,
+        pool_size=2,
+        max_overflow=1,
+        pool_timeout=1.0,
+    )
+    Pool.metrics.listen(engine)
+
+    async def query(seconds: float):
+        async with AsyncSession(engine) as session:
+            await session.execute(text(f"SELECT pg_sleep({seconds})"))
+
+    try:
+        # 12 queries of 0.1 s over 3 connections: 4 rounds, no timeout
+        await asyncio.gather(*(query(0.1) for _ in range(12)))
+
+        stats = Pool.metrics.stats(engine.sync_engine.pool)
+        assert stats["checkouts"] == stats["checkins"] == 12
+        assert stats["connects"] == 3
+        assert stats["checked_out"] == 0
+        assert stats["idle"] == 2  # The overflow connection is closed
+        assert stats["closes"] == 1
+        assert stats["timeouts"] == 0
+        assert stats["wait_histogram"]["+Inf"] == 12
+        assert stats["wait_histogram"]["0.05"] <= 6  # Most had to wait a round
+
+        # Queries longer than the timeout: the fourth session cannot wait enough
+        with pytest.raises(exc.TimeoutError):
+            await asyncio.gather(*(query(1.5) for _ in range(4)))
+
+        await asyncio.sleep(2)  # The remaining queries finish
+
+        stats = Pool.metrics.stats(engine.sync_engine.pool)
+        assert stats["timeouts"] == 1
+        assert stats["checked_out"] == 0
+    finally:
+        await engine.dispose()
+
+
+async def test_connection_held_only_for_the_unit_of_work(async_db_engine):
+    """Hold time per session and per connection, released before the end."""
+
+    class Pool(InstrumentedPool):
+        metrics = PoolMetrics()
+
+    engine = create_async_engine(TEST_DATABASE_URL, poolclass=Pool)
+    Pool.metrics.listen(engine)
+
+    try:
+        async with AsyncSession(engine, sync_session_class=AccountedSession) as session:
+            # No statement, no connection
+            assert Pool.metrics.stats(engine.sync_engine.pool)["checkouts"] == 0
+
+            await session.execute(text("SELECT pg_sleep(0.05)"))
+            assert Pool.metrics.stats(engine.sync_engine.pool)["checked_out"] == 1
+
+            await release_connection(session)
+            stats = Pool.metrics.stats(engine.sync_engine.pool)
+            assert stats["checked_out"] == 0
+            assert stats["hold_histogram"]["0.05"] == 0
+            assert stats["hold_histogram"]["+Inf"] == 1
+
+            # A later use checks out again
+            await session.execute(text("SELECT 1"))
+
+        assert session.sync_session.info["held"] >= 0.05
+        assert Pool.metrics.stats(engine.sync_engine.pool)["checkins"] == 2
+    finally:
+        await engine.dispose()
+
+
+async def test_user_lookup_releases_connection(client, async_session):
+    """
+    The session used for the user lookup is not kept in a transaction
+    while the endpoint runs.
+    Endpoint POST /currency/converter.
+    """
+    await add_users(async_session)
+    assert async_session.in_transaction()
+
+    access_token = create_access_token({"sub": "Hermione G."}).decode("utf-8")
+    headers = {"Authorization": f"Bearer {access_token}"}
+
+    with patch(
+        "app.api.endpoints.currency.get_rates_snapshot", return_value=make_snapshot()
+    ):
+        response = await client.post(
+            "/currency/converter",
+            json={"code_1": "EUR", "code_2": "RUB", "k": 100},
+            headers=headers,
+        )
+
+    assert response.status_code == 200
+    assert not async_session.in_transaction()
@@ -0,0 +1,148 @@
+import json
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from app.utils.rates_fetcher import RatesFetchError, fetch_rates, update_rates
+from tests.utils import make_snapshot
+
+PAYLOAD = {
+    "valid": True,
+    "updated": 1768600000,
+    "base": "USD",
+    "rates": {"USD": 1.0, "EUR": 0.86, "RUB": 77.9},
+}
+
+
+class StubApi:
+    """Local HTTP server answering with scripted (status, body, delay) responses."""
+
+    def __init__(self):
+        self.responses = []
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests.append(dict(self.headers))
+                status, body, delay = stub.responses.pop(0)
+                time.sleep(delay)
+
+                try:
+                    self.send_response(status)
+                    if body is not None:
+                        self.send_header("Content-Type", "application/json")
+                        self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    if body is not None:
+                        self.wfile.write(body)
+                except ConnectionError:
+                    pass  # The client gave up (timeout tests)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/rates"
+
+    def reply(self, status: int, body: dict | bytes | None = None, delay: float = 0):
+        if isinstance(body, dict):
+            body = json.dumps(body).encode()
+        self.responses.append((status, body, delay))
+
+
+@pytest.fixture
+def stub_api():
+    api = StubApi()
+    thread = threading.Thread(target=api.server.serve_forever, daemon=True)
+    thread.start()
+
+    with (
+        patch("app.utils.rates_fetcher.settings.EXTERNAL_API_URL", api.url),
+        patch("app.utils.rates_fetcher.settings.EXTERNAL_API_BACKOFF", 0.01),
+        patch("app.utils.rates_fetcher.settings.EXTERNAL_API_RETRIES", 2),
+    ):
+        yield api
+
+    api.server.shutdown()
+    api.server.server_close()
+
+
+async def test_retry_then_update(stub_api):
+    """Server errors are retried over the same client, the result is stored."""
+    stub_api.reply(503)
+    stub_api.reply(500)
+    stub_api.reply(200, PAYLOAD)
+
+    async with httpx.AsyncClient() as client:
+        with (
+            patch("app.utils.rates_fetcher.get_rates_snapshot", return_value=None),
+            patch("app.utils.rates_fetcher.save_rates") as mock_save,
+        ):
+            assert await update_rates(client) is True
+
+    mock_save.assert_called_once_with(PAYLOAD)
+    assert len(stub_api.requests) == 3
+    assert "If-Modified-Since" not in stub_api.requests[0]
+
+
+async def test_not_modified_and_unchanged(stub_api):
+    """304 for the stored rates, and the same `updated`: nothing is written."""
+    snapshot = make_snapshot(updated=PAYLOAD["updated"])
+    stub_api.reply(304)
+    stub_api.reply(200, PAYLOAD)
+
+    async with httpx.AsyncClient() as client:
+        with (
+            patch("app.utils.rates_fetcher.get_rates_snapshot", return_value=snapshot),
+            patch("app.utils.rates_fetcher.save_rates") as mock_save,
+        ):
+            assert await update_rates(client) is False
+            assert await update_rates(client) is False
+
+    mock_save.assert_not_called()
+    assert stub_api.requests[0]["If-Modified-Since"] == formatdate(
+        PAYLOAD["updated"], usegmt=True
+    )
+
+
+async def test_invalid_responses(stub_api):
+    """Oversized and malformed bodies are rejected, 4xx is not retried."""
+    stub_api.reply(200, b"x" * 2048)
+    stub_api.reply(200, {"valid": True, "updated": 1, "rates": {"EUR": "a lot"}})
+    stub_api.reply(200, PAYLOAD | {"valid": False})
+    stub_api.reply(401, {"error": "Invalid API key"})
+
+    async with httpx.AsyncClient() as client:
+        with patch("app.utils.rates_fetcher.settings.EXTERNAL_API_MAX_BYTES", 1024):
+            with pytest.raises(RatesFetchError, match="too large"):
+                await fetch_rates(client)
+
+        with pytest.raises(RatesFetchError, match="Invalid rates response"):
+            await fetch_rates(client)
+
+        with pytest.raises(RatesFetchError, match="invalid rates"):
+            await fetch_rates(client)
+
+        with pytest.raises(RatesFetchError, match="401"):
+            await fetch_rates(client)
+
+    assert len(stub_api.requests) == 4
+
+
+async def test_timeout(stub_api):
+    """A slow API is abandoned after the timeout, on every attempt."""
+    for _ in range(3):
+        stub_api.reply(200, PAYLOAD, delay=0.5)
+
+    async with httpx.AsyncClient() as client:
+        with patch("app.utils.rates_fetcher.settings.EXTERNAL_API_TIMEOUT", 0.1):
+            with pytest.raises(RatesFetchError, match="3 attempts"):
+                await fetch_rates(client)
+
+    assert len(stub_api.requests) == 3
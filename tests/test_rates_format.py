@@ -0,0 +1,89 @@
+import json
+
+import pytest
+
+from app.utils import rates_format
+from app.utils.actual_rates import RatesStore
+from app.utils.rates_format import RatesFormatError
+
+PAYLOAD = {
+    "valid": True,
+    "updated": 1771333234,
+    "base": "USD",
+    "rates": {"USD": 1, "EUR": 0.86, "BCH": 0.00177767222, "DASH": 0.0301},
+}
+
+
+def test_binary_snapshot_round_trip():
+    """
+    Encoding keeps every rate exactly and sorts the code table.
+    """
+    data = rates_format.dumps(PAYLOAD)
+    payload = rates_format.loads(data)
+
+    assert list(payload["rates"]) == ["BCH", "DASH", "EUR", "USD"]
+    assert payload["rates"] == PAYLOAD["rates"]
+    assert payload["updated"] == PAYLOAD["updated"]
+    assert payload["base"] == "USD"
+    assert payload["valid"] is True
+
+    assert len(data) < len(json.dumps(PAYLOAD, indent=4, ensure_ascii=False))
+
+
+def test_binary_snapshot_rejects_damaged_data():
+    """
+    Truncated, corrupted or foreign files are rejected.
+    """
+    data = rates_format.dumps(PAYLOAD)
+
+    with pytest.raises(RatesFormatError, match="Truncated"):
+        rates_format.loads(data[:-3])
+
+    corrupted = bytearray(data)
+    corrupted[-1] ^= 0xFF
+    with pytest.raises(RatesFormatError, match="checksum"):
+        rates_format.loads(bytes(corrupted))
+
+    with pytest.raises(RatesFormatError, match="Not a rates snapshot"):
+        rates_format.loads(b"{" + data[1:])
+
+    with pytest.raises(RatesFormatError, match="Invalid currency code"):
+        rates_format.dumps(PAYLOAD | {"rates": {"US D": 1.0}})
+
+
+def test_binary_snapshot_cli(tmp_path):
+    """
+    The CLI converts JSON -> binary -> JSON without losing data.
+    """
+    json_path = tmp_path / "rates.json"
+    json_path.write_text(json.dumps(PAYLOAD), encoding="utf-8")
+
+    rates_format.main(["from-json", str(json_path), str(tmp_path / "rates.bin")])
+    rates_format.main(
+        ["to-json", str(tmp_path / "rates.bin"), str(tmp_path / "export.json")]
+    )
+
+    exported = json.loads((tmp_path / "export.json").read_text(encoding="utf-8"))
+    assert exported == PAYLOAD
+
+    # Binary files are served by the rates store as well
+    snapshot = RatesStore(tmp_path / "rates.bin").get()
+    assert snapshot.rates["BCH"] == 0.00177767222
+    assert snapshot.updated == PAYLOAD["updated"]
+
+
+def test_binary_store_falls_back_to_json(tmp_path):
+    """
+    Before the first binary snapshot is written, the JSON file is served.
+    """
+    json_path = tmp_path / "rates.json"
+    json_path.write_text(json.dumps(PAYLOAD), encoding="utf-8")
+    store = RatesStore(tmp_path / "rates.bin", fallback=json_path)
+
+    assert store.get().rates["EUR"] == 0.86
+
+    rates_format.dump(
+        PAYLOAD | {"rates": {"USD": 1, "EUR": 0.9}}, tmp_path / "rates.bin"
+    )
+
+    assert store.get().rates["EUR"] == 0.9
@@ -0,0 +1,101 @@
+from unittest.mock import patch
+
+from app.core.security import create_access_token
+from app.utils import rates_history as history_module
+from app.utils.rates_history import RatesHistory
+from tests.conftest import client, async_session
+from tests.utils import add_users, make_snapshot
+
+
+def test_history_point_in_time_lookup(tmp_path):
+    """
+    Lookups return the last snapshot taken at or before the timestamp.
+    """
+    history = RatesHistory(tmp_path)
+
+    assert history.at(1768593649) is None
+
+    for rate, updated in ((0.8, 1000), (0.81, 2000), (0.82, 3000)):
+        appended = history.append(
+            make_snapshot({"USD": 1.0, "EUR": rate}, updated=updated)
+        )
+        assert appended is True
+
+    # Older or repeated snapshots are skipped
+    assert history.append(make_snapshot({"USD": 1.0}, updated=2500)) is False
+
+    assert history.at(999) is None
+    assert history.at(1000).rates["EUR"] == 0.8
+    assert history.at(2999).rates["EUR"] == 0.81
+    assert history.at(2999).updated == 2000
+    assert history.at(10**10).rates["EUR"] == 0.82
+
+
+def test_history_chunks_and_new_codes(tmp_path, monkeypatch):
+    """
+    Snapshots are spread over chunks; a new currency starts a wider chunk
+    and is missing from older snapshots.
+    """
+    monkeypatch.setattr(history_module, "CHUNK_SIZE", 4)
+    history = RatesHistory(tmp_path)
+
+    for updated in range(1, 11):
+        history.append(make_snapshot({"USD": 1.0, "EUR": updated}, updated=updated))
+
+    history.append(make_snapshot({"USD": 1.0, "EUR": 11, "RUB": 77.9}, updated=11))
+
+    assert len(list(tmp_path.glob("chunk_*.ts"))) == 4
+
+    for updated in range(1, 12):
+        assert history.locate(updated) is not None
+        assert history.at(updated).rates["EUR"] == updated
+
+    assert "RUB" not in history.at(10).rates
+    assert history.at(11).rates["RUB"] == 77.9
+
+
+async def test_converter_at_timestamp(client, async_session):
+    """
+    Endpoint POST /currency/converter?at= converts with historical rates.
+    """
+    await add_users(async_session)
+    access_token = create_access_token({"sub": "Hermione G."}).decode("utf-8")
+    headers = {"Authorization": f"Bearer {access_token}"}
+
+    current = make_snapshot({"USD": 1.0, "EUR": 0.9}, updated=1768600000)
+    historical = make_snapshot({"USD": 1.0, "EUR": 0.5}, updated=1768500000)
+    payload = {"code_1": "USD", "code_2": "EUR", "k": 10}
+
+    with (
+        patch("app.api.endpoints.currency.get_rates_snapshot", return_value=current),
+        patch(
+            "app.api.endpoints.currency.get_history_snapshot",
+            side_effect=lambda ts: historical if ts >= historical.updated else None,
+        ),
+    ):
+        old = await client.post(
+            "/currency/converter",
+            json=payload,
+            params={"at": "2026-01-15T18:00:00Z"},
+            headers=headers,
+        )
+        latest = await client.post(
+            "/currency/converter",
+            json=payload,
+            params={"at": 1768600001},
+            headers=headers,
+        )
+        missing = await client.get(
+            "/currency/actual_rates",
+            params={"at": "2020-01-01T00:00:00"},
+            headers=headers,
+        )
+
+    assert old.status_code == 200
+    assert old.json()["message"] == "10.0 USD - 5.0 EUR"
+    assert old.json()["updated"] == historical.updated_msk
+
+    assert latest.json()["message"] == "10.0 USD - 9.0 EUR"
+
+    assert missing.status_code == 404
+    assert missing.json()["error_code"] == "RATES_NOT_FOUND"
@@ -0,0 +1,152 @@
+import datetime
+import time
+from contextlib import asynccontextmanager
+
+import jwt
+from fakeredis import FakeAsyncRedis
+from freezegun import freeze_time
+from sqlalchemy import func, select
+from unittest.mock import patch
+
+from app.database.models import RevokedToken
+from app.core.security import ALGORITHM, SECRET_KEY
+from app.services.auth import AuthService
+from app.tasks.revoked_token_tasks import delete_expired_batch, sql_request
+from app.utils.revocation import RedisRevocationBackend
+from app.utils.revoked_tokens import BloomFilter, RevokedTokenIndex, revoked_tokens
+from tests.conftest import async_session, client
+from tests.utils import add_users
+
+
+def test_bloom_filter():
+    """No false negatives, false positives close to the configured rate."""
+    bloom = BloomFilter(capacity=10_000, error_rate=0.01)
+    keys = [f"jti-{i}" for i in range(10_000)]
+
+    for key in keys:
+        bloom.add(key)
+
+    assert all(key in bloom for key in keys)
+
+    false_positives = sum(f"other-{i}" in bloom for i in range(10_000))
+    assert false_positives < 300
+
+
+def test_revoked_token_index_expiry():
+    """Expired tokens are pruned and the filter is rebuilt without them."""
+    index = RevokedTokenIndex(capacity=100, error_rate=0.01)
+    now = time.time()
+
+    index.add("valid", now + 3600)
+    index.add("expiring", now + 10)
+
+    assert index.is_revoked("valid")
+    assert index.is_revoked("expiring")
+    assert not index.is_revoked("unknown")
+
+    with freeze_time(datetime.datetime.fromtimestamp(now + 20, datetime.UTC)):
+        assert not index.is_revoked("expiring")
+
+        # Adding prunes; past capacity the filter is rebuilt from live keys
+        for i in range(200):
+            index.add(f"jti-{i}", now + 3600)
+
+    assert index.stats()["size"] == 201
+    assert index.stats()["filter_capacity"] >= 200
+    assert all(index.is_revoked(f"jti-{i}") for i in range(200))
+
+
+async def test_get_revoked_tokens(async_session):
+    """Startup warm-up reads only tokens that have not expired."""
+    now = datetime.datetime.now(datetime.UTC)
+    async_session.add_all(
+        [
+            RevokedToken(jti="old", expires_at=now - datetime.timedelta(days=1)),
+            RevokedToken(jti="new", expires_at=now + datetime.timedelta(days=1)),
+        ]
+    )
+    await async_session.flush()
+
+    tokens = [token async for token in AuthService.get_revoked_tokens(async_session)]
+
+    assert [jti for jti, _ in tokens] == ["new"]
+
+
+async def test_redis_revocation_backend(client, async_session):
+    """
+    Refresh and logout with REVOCATION_BACKEND=redis: one key per token
+    with its remaining lifetime as TTL, no rows in revoked_tokens.
+    """
+    await add_users(async_session)
+    backend = RedisRevocationBackend(FakeAsyncRedis(), "revoked:")
+    form_data = {"username": "Hermione G.", "password": "Str0ngP@ssword"}
+
+    with patch("app.services.auth.revocation_backend", backend):
+        tokens = (await client.post("/auth/login", data=form_data)).json()
+        old_refresh = tokens["refresh_token"]
+        old_payload = jwt.decode(old_refresh, SECRET_KEY, algorithms=[ALGORITHM])
+
+        headers = {"x-refresh-token": old_refresh}
+        response = await client.post("/auth/refresh", headers=headers)
+        assert response.status_code == 200
+
+        key = f"revoked:{old_payload['jti']}"
+        ttl = await backend.client.ttl(key)
+        assert 0 < ttl <= old_payload["exp"] - time.time() + 1
+
+        # Revoked by another worker: unknown to the in-process index
+        revoked_tokens.clear()
+        retry = await client.post("/auth/refresh", headers=headers)
+        assert retry.status_code == 401
+        assert retry.json()["error_code"] == "TOKEN_REVOKED"
+
+        new_refresh = response.json()["refresh_token"]
+        response = await client.post(
+            "/auth/logout", headers={"x-refresh-token": new_refresh}
+        )
+        assert response.status_code == 200
+
+        tokens = [token async for token in AuthService.get_revoked_tokens(None)]
+
+    new_payload = jwt.decode(new_refresh, SECRET_KEY, algorithms=[ALGORITHM])
+    assert sorted(tokens) == sorted(
+        [
+            (old_payload["jti"], float(old_payload["exp"])),
+            (new_payload["jti"], float(new_payload["exp"])),
+        ]
+    )
+
+    rows = await async_session.scalar(select(func.count()).select_from(RevokedToken))
+    assert rows == 0
+
+
+async def test_cleanup_expired_tokens_in_batches(async_session):
+    """The cleanup deletes expired tokens only, in bounded batches."""
+    now = datetime.datetime.now(datetime.UTC)
+    async_session.add_all(
+        [
+            RevokedToken(jti=f"old-{i}", expires_at=now - datetime.timedelta(hours=i))
+            for i in range(1, 26)
+        ]
+        + [
+            RevokedToken(jti=f"new-{i}", expires_at=now + datetime.timedelta(hours=i))
+            for i in range(1, 4)
+        ]
+    )
+    await async_session.flush()
+
+    @asynccontextmanager
+    async def session_factory():
+        yield async_session
+
+    with patch(
+        "app.tasks.revoked_token_tasks.delete_expired_batch",
+        wraps=delete_expired_batch,
+    ) as batch:
+        deleted = await sql_request(session_factory, batch_size=10, pause=0)
+
+    assert deleted == 25
+    assert batch.call_count == 3  # 10 + 10 + 5
+
+    jtis = (await async_session.scalars(select(RevokedToken.jti))).all()
+    assert sorted(jtis) == ["new-1", "new-2", "new-3"]
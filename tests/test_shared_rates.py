@@ -0,0 +1,134 @@
+import multiprocessing
+import os
+import struct
+import time
+from unittest.mock import patch
+
+import numpy as np
+
+from app.utils.actual_rates import RatesStore
+from app.utils.shared_rates import (
+    INODE_CHECK_INTERVAL,
+    SharedRatesReader,
+    SharedRatesWriter,
+    SEQ_OFFSET,
+)
+from tests.utils import write_rates
+
+
+def publish_versions(path, versions: int):
+    writer = SharedRatesWriter(path)
+    codes = tuple(f"C{i:03d}" for i in range(300))
+    for version in range(1, versions + 1):
+        writer.publish(version, codes, np.full(len(codes), float(version)))
+
+
+def test_shared_rates_round_trip(tmp_path):
+    """
+    Published rates are read back; the reader copies only on a new version.
+    """
+    path = tmp_path / "rates.shm"
+    reader = SharedRatesReader(path)
+
+    assert reader.read() is None
+
+    writer = SharedRatesWriter(path)
+    writer.publish(1768593649, ("USD", "EUR", "DASH"), np.array([1.0, 0.86, 0.03]))
+
+    first = reader.read()
+    assert first.updated == 1768593649
+    assert first.codes == ("USD", "EUR", "DASH")
+    assert first.values.tolist() == [1.0, 0.86, 0.03]
+    assert reader.read() is first
+
+    writer.publish(1768600000, ("USD", "EUR"), np.array([1.0, 0.9]))
+
+    second = reader.read()
+    assert second is not first
+    assert second.seq > first.seq
+    assert second.codes == ("USD", "EUR")
+
+
+def test_shared_rates_reader_skips_write_in_progress(tmp_path):
+    """
+    While the sequence number is odd, readers keep their previous copy.
+    """
+    path = tmp_path / "rates.shm"
+    SharedRatesWriter(path).publish(1, ("USD",), np.array([1.0]))
+    reader = SharedRatesReader(path)
+    published = reader.read()
+
+    with open(path, "r+b") as f:
+        f.seek(SEQ_OFFSET)
+        f.write(struct.pack("<Q", published.seq + 1))
+
+    assert reader.read() is published
+
+
+def test_shared_rates_reader_remaps_recreated_file(tmp_path):
+    """
+    A deleted and recreated segment is mapped again, even though the new
+    file starts over with the same sequence number.
+    """
+    path = tmp_path / "rates.shm"
+    SharedRatesWriter(path).publish(1, ("USD", "EUR"), np.array([1.0, 0.86]))
+    reader = SharedRatesReader(path)
+    first = reader.read()
+
+    os.remove(path)
+    assert reader.read() is first  # Deleted: the last rates are kept
+
+    SharedRatesWriter(path).publish(2, ("USD", "EUR"), np.array([1.0, 0.9]))
+    assert reader.read() is first  # Not checked again before the interval
+
+    later = time.monotonic() + INODE_CHECK_INTERVAL
+    with patch("app.utils.shared_rates.time.monotonic", return_value=later):
+        second = reader.read()
+
+    assert second.seq == first.seq
+    assert second.updated == 2
+    assert second.values.tolist() == [1.0, 0.9]
+
+
+def test_shared_rates_no_torn_reads(tmp_path):
+    """
+    A reader never sees a mix of two versions while another process writes.
+    """
+    path = tmp_path / "rates.shm"
+    publish_versions(path, 1)
+    reader = SharedRatesReader(path)
+
+    writer = multiprocessing.get_context("spawn").Process(
+        target=publish_versions, args=(path, 3000)
+    )
+    writer.start()
+
+    seen = set()
+    while writer.is_alive() or len(seen) < 2:
+        rates = reader.read()
+        assert np.all(rates.values == float(rates.updated))
+        seen.add(rates.updated)
+
+    writer.join()
+    assert writer.exitcode == 0
+    assert reader.read().updated == 3000
+
+
+def test_rates_store_prefers_shared_segment(tmp_path):
+    """
+    The rates store serves the shared segment once the writer has published it.
+    """
+    rates_file = tmp_path / "rates.json"
+    write_rates(rates_file, {"USD": 1.0, "EUR": 0.86})
+    store = RatesStore(rates_file, shared=SharedRatesReader(tmp_path / "rates.shm"))
+
+    assert store.get().rates["EUR"] == 0.86
+
+    SharedRatesWriter(tmp_path / "rates.shm").publish(
+        1768600000, ("USD", "EUR"), np.array([1.0, 0.9])
+    )
+
+    snapshot = store.get()
+    assert snapshot.rates["EUR"] == 0.9
+    assert snapshot.updated == 1768600000
+    assert store.get() is snapshot
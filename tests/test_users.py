@@ -1,8 +1,18 @@
 import asyncio
-from sqlalchemy import select
+import json
+from unittest.mock import patch
+
+import bcrypt
+import pytest
+
+from sqlalchemy import select, text
 from app.database.models import User
+from app.exceptions.users import CacheInvalidationException
 from tests.conftest import client, async_session
 from tests.utils import add_users
+from app.services.user import UserService
+from app.utils.password_pool import import_pool
+from app.utils.user_cache import AuthenticatedUser, UserCache, user_cache
 
 from app.core.security import (
     create_access_token,
@@ -116,3 +126,349 @@ async def test_user_info(client, async_session):
 
     assert response.status_code == 404
     assert response.json()["message"] == "User not found"
+
+
+async def test_user_cache(client, async_session):
+    """
+    Protected requests look users up once; deleting a user and changing
+    the admin flag invalidate the cache.
+    """
+    await add_users(async_session)
+
+    admin_token = create_access_token({"sub": "Aragorn II"}).decode("utf-8")
+    user_token = create_access_token({"sub": "Hermione G."}).decode("utf-8")
+    new_user_token = create_access_token({"sub": "Frodo B."}).decode("utf-8")
+    headers_admin = {"Authorization": f"Bearer {admin_token}"}
+    headers_user = {"Authorization": f"Bearer {user_token}"}
+
+    before = user_cache.stats()
+
+    for _ in range(3):
+        response = await client.get("/users/user_info", headers=headers_user)
+        assert response.status_code == 200
+
+    assert user_cache.stats()["misses"] - before["misses"] == 1
+    assert user_cache.stats()["hits"] - before["hits"] == 2
+
+    await client.delete("/users/15", headers=headers_admin)
+    response = await client.get("/users/user_info", headers=headers_user)
+    assert response.status_code == 404
+
+    # Unknown user: cached as unknown
+    headers_new_user = {"Authorization": f"Bearer {new_user_token}"}
+    for _ in range(2):
+        response = await client.get("/users/user_info", headers=headers_new_user)
+        assert response.status_code == 404
+    assert user_cache.stats()["negative_hits"] - before["negative_hits"] == 1
+
+    # Admin flag change
+    vader_token = create_access_token({"sub": "Darth Vader"}).decode("utf-8")
+    headers_vader = {"Authorization": f"Bearer {vader_token}"}
+
+    response = await client.get("/users/list", headers=headers_vader)
+    assert response.status_code == 403
+
+    response = await client.patch(
+        "/users/66/admin", json={"is_admin": True}, headers=headers_vader
+    )
+    assert response.status_code == 403
+
+    response = await client.patch(
+        "/users/66/admin", json={"is_admin": True}, headers=headers_admin
+    )
+    assert response.status_code == 200
+    assert response.json() == {"username": "Darth Vader", "id": 66, "is_admin": True}
+
+    response = await client.get("/users/list", headers=headers_vader)
+    assert response.status_code == 200
+
+    response = await client.patch(
+        "/users/9999/admin", json={"is_admin": True}, headers=headers_admin
+    )
+    assert response.status_code == 404
+
+    # Counters for admins only
+    metrics = await client.get("/metrics", headers=headers_admin)
+    assert metrics.status_code == 200
+    assert metrics.json()["user_cache"]["size"] >= 2
+
+    forbidden = await client.get("/metrics", headers=headers_user)
+    assert forbidden.status_code == 404  # The user was deleted
+
+
+def test_user_cache_lru_ttl_and_epoch():
+    cache = UserCache(maxsize=2, ttl=60, negative_ttl=0)
+    users = {
+        name: AuthenticatedUser(id=i, username=name, is_admin=False)
+        for i, name in enumerate(["a", "b", "c"])
+    }
+
+    cache.set("a", users["a"], cache.epoch)
+    cache.set("b", users["b"], cache.epoch)
+    cache.get("a")  # "b" becomes the least recently used
+    cache.set("c", users["c"], cache.epoch)
+
+    assert cache.get("a") == (True, users["a"])
+    assert cache.get("b") == (False, None)
+
+    # Expired negative entry
+    cache.set("ghost", None, cache.epoch)
+    assert cache.get("ghost") == (False, None)
+
+    # A lookup that raced with an invalidation is not stored
+    epoch = cache.epoch
+    cache.discard("c")
+    cache.set("c", users["c"], epoch)
+    assert cache.get("c") == (False, None)
+
+
+async def test_user_cache_invalidation_channel():
+    """
+    Invalidations are published and applied by the listeners; after a
+    reconnection the cache is cleared and the token versions are reloaded.
+    """
+    published = asyncio.Queue()
+    subscriptions = []
+    db_versions = {1: 2}
+
+    class FakePubSub:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *args):
+            pass
+
+        async def subscribe(self, channel):
+            subscriptions.append(channel)
+
+        async def listen(self):
+            while True:
+                data = await published.get()
+                if data is None:
+                    raise ConnectionError("Connection lost")
+                yield {"type": "message", "data": data}
+
+    class FakeRedis:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *args):
+            pass
+
+        async def publish(self, channel, message):
+            await published.put(message.encode("utf-8"))
+
+        def pubsub(self):
+            return FakePubSub()
+
+    async def token_versions():
+        return dict(db_versions)
+
+    async def settle():
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+    cache = UserCache(maxsize=10, ttl=60, negative_ttl=60)
+    other_worker = UserCache(maxsize=10, ttl=60, negative_ttl=60)
+
+    with (
+        patch("app.utils.user_cache.redis.from_url", return_value=FakeRedis()),
+        patch("app.utils.user_cache.settings.USER_CACHE_INVALIDATION_CHANNEL", "users"),
+        patch("app.utils.user_cache.RECONNECT_DELAY", 0),
+    ):
+        listener = asyncio.create_task(other_worker.listen("users", token_versions))
+        await settle()
+        assert subscriptions == ["users"]
+        assert not other_worker.token_version_ok(1, 1)
+
+        other_worker.set("a", None, other_worker.epoch)
+        await cache.invalidate("a", user_id=1, token_version=3)
+        await settle()
+
+        assert other_worker.get("a") == (False, None)
+        assert not other_worker.token_version_ok(1, 2)
+        assert other_worker.token_version_ok(1, 3)
+
+        # A change missed while the channel was down
+        other_worker.set("b", None, other_worker.epoch)
+        db_versions[2] = 5
+        await published.put(None)
+        await settle()
+
+        listener.cancel()
+
+    assert subscriptions == ["users", "users"]
+    assert other_worker.get("b") == (False, None)
+    assert not other_worker.token_version_ok(2, 4)
+    assert other_worker.token_version_ok(2, 5)
+
+
+async def test_user_cache_publish_failure():
+    """A publish is retried, then the failure is reported to the caller."""
+    attempts = []
+
+    class FailingRedis:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *args):
+            pass
+
+        async def publish(self, channel, message):
+            attempts.append(message)
+            raise ConnectionError("Redis is down")
+
+    cache = UserCache(maxsize=10, ttl=60, negative_ttl=60)
+    cache.set("a", None, cache.epoch)
+
+    with (
+        patch("app.utils.user_cache.redis.from_url", return_value=FailingRedis()),
+        patch("app.utils.user_cache.settings.USER_CACHE_INVALIDATION_CHANNEL", "users"),
+        patch("app.utils.user_cache.settings.USER_CACHE_PUBLISH_RETRIES", 1),
+    ):
+        with pytest.raises(CacheInvalidationException):
+            await cache.invalidate("a", user_id=1, token_version=3)
+
+    assert len(attempts) == 2
+    # Applied in this worker anyway
+    assert cache.get("a") == (False, None)
+    assert not cache.token_version_ok(1, 2)
+
+
+async def test_get_users_pages_and_stream(client, async_session):
+    """
+    Keyset pages of users and the NDJSON stream, ordered by id.
+    Endpoints GET /users/list, GET /users/stream.
+    """
+    await add_users(async_session)
+
+    admin_token = create_access_token({"sub": "Aragorn II"}).decode("utf-8")
+    headers = {"Authorization": f"Bearer {admin_token}"}
+
+    first = await client.get("/users/list?limit=2", headers=headers)
+    assert first.status_code == 200
+    assert [user["id"] for user in first.json()] == [2, 15]
+    assert first.headers["x-next-cursor"] == "15"
+
+    cursor = first.headers["x-next-cursor"]
+    second = await client.get(f"/users/list?limit=2&after_id={cursor}", headers=headers)
+    assert second.json() == [{"username": "Darth Vader", "id": 66, "is_admin": False}]
+    assert "x-next-cursor" not in second.headers
+
+    too_many = await client.get("/users/list?limit=1000000", headers=headers)
+    assert too_many.status_code == 400
+
+    with patch("app.services.user.settings.USERS_STREAM_BATCH", 2):
+        stream = await client.get("/users/stream", headers=headers)
+
+    assert stream.status_code == 200
+    assert stream.headers["content-type"] == "application/x-ndjson"
+
+    lines = [json.loads(line) for line in stream.text.splitlines()]
+    assert lines == first.json() + second.json()
+
+    stream = await client.get("/users/stream?after_id=2", headers=headers)
+    assert [json.loads(line)["id"] for line in stream.text.splitlines()] == [15, 66]
+
+
+async def test_import_users(client, async_session):
+    """
+    Bulk import: created users, invalid, duplicate and existing usernames.
+    Endpoint POST /users/import.
+    """
+    await add_users(async_session)
+    # Past the explicit ids of add_users
+    await async_session.execute(
+        text("SELECT setval(pg_get_serial_sequence('users', 'id'), 1000)")
+    )
+
+    admin_token = create_access_token({"sub": "Aragorn II"}).decode("utf-8")
+    headers = {
+        "Authorization": f"Bearer {admin_token}",
+        "Content-Type": "application/x-ndjson",
+    }
+    password = "Str0ngP@ssword"
+    lines = [
+        json.dumps({"username": "Frodo B.", "password": password}),
+        json.dumps({"username": "Samwise G.", "password": password}),
+        "",
+        json.dumps({"username": "Gollum", "password": "precious"}),
+        json.dumps({"username": "Frodo B.", "password": password}),
+        json.dumps({"username": "Darth Vader", "password": password}),
+        "{not json",
+        *(
+            json.dumps({"username": f"Orc {i}", "password": password})
+            for i in range(20)
+        ),
+    ]
+
+    gensalt = bcrypt.gensalt
+    hash_many = import_pool.hash_many
+    in_transaction = []
+
+    async def hash_passwords(passwords):
+        # The connection of the username lookup is not held meanwhile
+        in_transaction.append(async_session.in_transaction())
+        return await hash_many(passwords)
+
+    with (
+        patch("app.utils.password_pool.bcrypt.gensalt", lambda: gensalt(rounds=4)),
+        patch("app.services.user.settings.USERS_IMPORT_INSERT_BATCH", 8),
+        patch("app.services.user.import_pool.hash_many", hash_passwords),
+    ):
+        response = await client.post(
+            "/users/import", headers=headers, content="\n".join(lines)
+        )
+
+    assert in_transaction == [False]
+
+    assert response.status_code == 200
+    report = response.json()
+    assert report["created"] == 22
+    assert report["failed"] == 4
+
+    results = {result["line"]: result for result in report["results"]}
+    assert sorted(results) == [1, 2, *range(4, 28)]
+    assert results[1]["id"] is not None and results[1]["username"] == "Frodo B."
+    assert results[4]["error_code"] == "VALIDATION_ERROR"
+    assert results[5]["error_code"] == "CONFLICT"
+    assert results[6]["error_code"] == "CONFLICT"
+    assert results[7]["error_code"] == "VALIDATION_ERROR"
+
+    query = select(User).where(User.username == "Samwise G.")
+    user = (await async_session.execute(query)).scalar_one()
+    assert user.id == results[2]["id"]
+    assert bcrypt.checkpw(password.encode(), user.hashed_password.encode())
+
+    headers["Content-Type"] = "application/json"
+    response = await client.post("/users/import", headers=headers, content=lines[0])
+    assert response.status_code == 415
+
+    user_token = create_access_token({"sub": "Darth Vader"}).decode("utf-8")
+    response = await client.post(
+        "/users/import",
+        headers={"Authorization": f"Bearer {user_token}"},
+        content=lines[0],
+    )
+    assert response.status_code == 403
+
+    # The body is read as a stream and abandoned once over the limit
+    sent = []
+
+    async def chunks():
+        for i in range(1000):
+            sent.append(i)
+            yield json.dumps({"username": f"Orc {i}", "password": password}).encode()
+            yield b"\n"
+
+    headers["Content-Type"] = "application/x-ndjson"
+    with patch("app.services.user.settings.USERS_IMPORT_MAX_ROWS", 10):
+        response = await client.post("/users/import", headers=headers, content=chunks())
+
+    assert response.status_code == 413
+    assert response.json()["error_code"] == "PAYLOAD_TOO_LARGE"
+    assert len(sent) < 1000
+
+    long_line = b'{"username": "' + b"x" * 100_000
+    response = await client.post("/users/import", headers=headers, content=long_line)
+    assert response.status_code == 413
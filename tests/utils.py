@@ -1,4 +1,7 @@
+import json
+
 from app.database.models import User
+from app.utils.actual_rates import RatesSnapshot
 
 
 async def add_users(db):
@@ -24,3 +27,20 @@ async def add_users(db):
     ]
     db.add_all(users)
     await db.flush()
+
+
+def make_snapshot(rates: dict | None = None, updated: int = 1768593649):
+    """Rates snapshot in the external API layout for endpoint tests."""
+    if rates is None:
+        rates = {"USD": 1.0, "EUR": 0.86, "RUB": 77.9}
+
+    return RatesSnapshot.from_payload(
+        {"valid": True, "updated": updated, "base": "USD", "rates": rates}
+    )
+
+
+def write_rates(path, rates: dict, updated: int = 1768593649):
+    path.write_text(
+        json.dumps({"valid": True, "updated": updated, "base": "USD", "rates": rates}),
+        encoding="utf-8",
+    )